@@ -0,0 +1,115 @@
+# benchmarks/bench_docx_render.py
+"""
+Бенчмарк рендеринга DOCX на синтетическом реферате (~200 страниц).
+
+Сравнивает python-docx рендерер (create_docx_file) и потоковый
+писатель (stream_docx).
+
+Запуск:
+    python benchmarks/bench_docx_render.py --pages 200 --repeat 3
+    python benchmarks/bench_docx_render.py --writer stream
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from ai_referat.docx_stream_writer import stream_docx
+from ai_referat.docx_writer import create_docx_file
+from ai_referat.models import (Chapter, Conclusion, Essay, EssayMetadata,
+                               EssayPlan, Introduction, PlanChapter,
+                               References, Subchapter)
+
+PARAGRAPH = (
+    "Язык гипертекстовой разметки появился как средство обмена научными "
+    "документами и со временем превратился в основу всего веба. "
+)
+
+
+def make_text(chars: int) -> str:
+    """Текст заданной длины, разбитый на абзацы по ~600 символов."""
+    paragraphs = []
+    total = 0
+    while total < chars:
+        paragraph = PARAGRAPH * 5
+        paragraphs.append(paragraph.strip())
+        total += len(paragraph)
+    return "\n\n".join(paragraphs)
+
+
+def make_essay(pages: int, chars_per_page: int = 1800, chapters: int = 10, subchapters: int = 3) -> Essay:
+    """Синтетический реферат объёмом примерно `pages` страниц."""
+    sections = chapters * (subchapters + 1) + 2
+    section_chars = pages * chars_per_page // sections
+
+    plan_chapters = []
+    essay_chapters = []
+    for i in range(1, chapters + 1):
+        sub_titles = [f"{i}.{j}: Подглава {i}.{j}" for j in range(1, subchapters + 1)]
+        plan_chapters.append(PlanChapter(title=f"Глава {i}: Раздел {i}", subchapters=sub_titles))
+        essay_chapters.append(Chapter(
+            title=f"Глава {i}: Раздел {i}",
+            text=make_text(section_chars),
+            subchapters=[Subchapter(title=t, text=make_text(section_chars)) for t in sub_titles],
+        ))
+
+    return Essay(
+        topic="История HTML",
+        language="русский",
+        plan=EssayPlan(chapters=plan_chapters),
+        introduction=Introduction(text=make_text(section_chars)),
+        chapters=essay_chapters,
+        conclusion=Conclusion(text=make_text(section_chars)),
+        references=References(items=[f"{i}. Автор. Источник {i}. 2020." for i in range(1, 9)]),
+        metadata=EssayMetadata(topic_name="История HTML"),
+    )
+
+
+WRITERS = {
+    "docx": create_docx_file,
+    "stream": stream_docx,
+}
+
+
+def bench_writer(name: str, data: dict, docx_path: str, repeat: int) -> None:
+    writer = WRITERS[name]
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        writer(docx_path=docx_path, json_data=data)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    writer(docx_path=docx_path, json_data=data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    size = os.path.getsize(docx_path)
+
+    print(f"[{name}] размер DOCX: {size / 1024:.0f} KiB")
+    print(f"[{name}] время рендеринга: min {min(timings):.3f} c, avg {sum(timings) / len(timings):.3f} c")
+    print(f"[{name}] пиковая память: {peak / 1024 / 1024:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк рендеринга DOCX")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--writer", choices=[*WRITERS, "all"], default="all")
+    args = parser.parse_args()
+
+    essay = make_essay(args.pages)
+    data = essay.model_dump()
+    names = list(WRITERS) if args.writer == "all" else [args.writer]
+
+    print(f"Страниц: {args.pages}")
+    with tempfile.TemporaryDirectory() as tmp:
+        docx_path = os.path.join(tmp, "bench.docx")
+        for name in names:
+            bench_writer(name, data, docx_path, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_exporters.py
+"""
+Бенчмарк экспортеров на одном дереве документа (~200 страниц).
+
+Дерево EssayDocument строится один раз, затем из него рендерятся
+HTML, Markdown, DOCX (python-docx и потоковый) и PDF.
+
+Запуск:
+    python benchmarks/bench_exporters.py --pages 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from bench_docx_render import make_essay
+
+from ai_referat.docx_stream_writer import stream_docx
+from ai_referat.docx_writer import render_docx
+from ai_referat.document_tree import build_document
+from ai_referat.html_writer import render_html
+from ai_referat.markdown_writer import render_markdown
+from ai_referat.pdf_writer import create_pdf_file
+
+
+def timed(name: str, func) -> None:
+    start = time.perf_counter()
+    func()
+    print(f"{name:<16} {(time.perf_counter() - start) * 1000:8.1f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк экспортеров")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--skip-pdf", action="store_true")
+    args = parser.parse_args()
+
+    essay = make_essay(args.pages)
+    tree = build_document(essay)
+
+    print(f"Страниц: {args.pages}")
+    timed("build_document", lambda: build_document(essay))
+    timed("html", lambda: render_html(tree))
+    timed("markdown", lambda: render_markdown(tree))
+    with tempfile.TemporaryDirectory() as tmp:
+        timed("docx", lambda: render_docx(os.path.join(tmp, "e.docx"), tree))
+        timed("docx (stream)", lambda: stream_docx(os.path.join(tmp, "s.docx"), tree))
+        if not args.skip_pdf:
+            timed("pdf", lambda: create_pdf_file(os.path.join(tmp, "e.pdf"), tree))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_json.py
+"""
+Бенчмарк сохранения и загрузки JSON рефератов.
+
+Сравнивает прежний путь (essay.dict() + json.dumps(indent=4) и
+json.load + Essay(**data)) с save_json/load_json.
+
+Запуск:
+    python benchmarks/bench_json.py --count 10000 --pages 5
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from bench_docx_render import make_essay
+
+from ai_referat.json_writer import dumps_json, load_json, loads_json, save_json
+from ai_referat.models import Essay
+
+
+def legacy_save(essay: Essay, path: str) -> None:
+    data = essay.model_dump()
+    json_str = json.dumps(data, ensure_ascii=False, indent=4)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json_str)
+
+
+def legacy_load(path: str) -> Essay:
+    with open(path, "r", encoding="utf-8") as f:
+        return Essay(**json.load(f))
+
+
+def run(name: str, count: int, directory: str, save, load, suffix: str = ".json") -> None:
+    essays = run.essays
+    paths = [os.path.join(directory, f"{name}-{i}{suffix}") for i in range(count)]
+
+    start = time.perf_counter()
+    for essay, path in zip(essays, paths):
+        save(essay, path)
+    save_time = time.perf_counter() - start
+
+    size = sum(os.path.getsize(p) for p in paths)
+
+    start = time.perf_counter()
+    for path in paths:
+        load(path)
+    load_time = time.perf_counter() - start
+
+    print(f"{name:<14} save {save_time:6.2f} c  load {load_time:6.2f} c  объем {size / 1024 / 1024:7.1f} MiB")
+
+
+def run_in_memory(count: int) -> None:
+    """Только сериализация и разбор, без диска: диск сильно шумит."""
+    essay = run.essays[0]
+    # Как и при чтении файла, строку нужно сначала декодировать из UTF-8
+    legacy = json.dumps(essay.model_dump(), ensure_ascii=False, indent=4).encode("utf-8")
+    current = dumps_json(essay)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        json.dumps(essay.model_dump(), ensure_ascii=False, indent=4)
+    legacy_dump = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(count):
+        dumps_json(essay)
+    dump = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(count):
+        Essay(**json.loads(legacy.decode("utf-8")))
+    legacy_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(count):
+        Essay.model_validate(loads_json(current))
+    load = time.perf_counter() - start
+
+    print(f"{'в памяти':<14} dumps {legacy_dump:6.2f} -> {dump:6.2f} c  loads {legacy_load:6.2f} -> {load:6.2f} c")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк JSON")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--pages", type=int, default=5)
+    args = parser.parse_args()
+
+    essay = make_essay(args.pages, chapters=3, subchapters=2)
+    run.essays = [essay] * args.count
+
+    print(f"Рефератов: {args.count}, страниц в каждом: {args.pages}")
+    run_in_memory(args.count)
+    with tempfile.TemporaryDirectory() as tmp:
+        run("legacy", args.count, tmp, legacy_save, legacy_load)
+        run("pretty", args.count, tmp, lambda e, p: save_json(e, p), load_json)
+        run("compact", args.count, tmp, lambda e, p: save_json(e, p, pretty=False), load_json)
+        run("compact+gzip", args.count, tmp, lambda e, p: save_json(e, p, pretty=False), load_json, ".json.gz")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# benchmarks/bench_load.py
+"""
+Нагрузочный тест настоящего HTTP пути клиентов (openai или g4f) на
+локальной заглушке ai_referat.stub_server: --essays рефератов, из них
+-c одновременно, с задержками и сбоями заглушки.
+
+Отчет: пропускная способность, хвосты задержки реферата (p50/p95/p99),
+исходы запросов на сервере и усиление ошибок — сколько HTTP запросов
+пришлось на один раздел (1.0 — ни одного повтора).
+
+Запуск:
+    python benchmarks/bench_load.py --essays 200 -c 50 --latency 0.3 --rate-limit 0.05
+    python benchmarks/bench_load.py --provider g4f --capacity 32 --retry-after 0.5
+    python benchmarks/bench_load.py --url http://127.0.0.1:8999   # уже запущенная заглушка
+    python benchmarks/bench_load.py --essays 20 --json load.json --max-failed 0   # для CI
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import sys
+import time
+import urllib.request
+from typing import Optional
+
+from ai_referat.concurrency import limiter_stats
+from ai_referat.log import configure_logging
+from ai_referat.router import percentile
+from ai_referat.service import PROVIDERS
+from ai_referat.stub_server import OUTCOMES, add_stub_arguments, config_from_args, run_stub
+
+READY_TIMEOUT = 15.0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def stub_request(url: str, path: str, method: str = "GET") -> dict:
+    request = urllib.request.Request(url + path, method=method, data=b"" if method == "POST" else None)
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def wait_ready(url: str, timeout: float = READY_TIMEOUT) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            stub_request(url, "/stats")
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+async def run_load(args: argparse.Namespace, base_url: str) -> dict:
+    manager_class, client_class = PROVIDERS[args.provider]
+    client_kwargs = {"model": "stub", "api_key": "stub", "base_url": base_url}
+    if args.provider == "openai":
+        client_kwargs["timeout"] = args.client_timeout
+    # Один клиент на все рефераты, как в сервисе: общий пул соединений и ограничитель
+    client = client_class(**client_kwargs)
+    slots = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    sections = 0
+    degraded = 0
+
+    async def one(i: int) -> None:
+        nonlocal sections, degraded
+        async with slots:
+            manager = manager_class(
+                topic=f"Нагрузочная тема {i}", model="stub", api_key="stub", base_url=base_url,
+                max_chapters=args.chapters, max_subchapters=args.subchapters,
+                min_pages=args.pages, max_pages=args.pages, chunk_pages=args.chunk_pages,
+            )
+            manager.client = client
+            start = time.perf_counter()
+            try:
+                essay = await manager.generate_essay()
+            finally:
+                sections += manager._progress_done
+            latencies.append(time.perf_counter() - start)
+            texts = [essay.introduction.text, essay.conclusion.text]
+            for chapter in essay.chapters:
+                texts.append(chapter.text)
+                texts.extend(sub.text for sub in chapter.subchapters)
+            # Раздел, не получивший ответа за MAX_RETRIES попыток
+            degraded += sum(text.startswith("LIMIT:") for text in texts)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(args.essays)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    errors = [repr(e) for e in results if isinstance(e, BaseException)]
+    return {
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "sections": sections,
+        "degraded_sections": degraded,
+        "errors": errors,
+    }
+
+
+def summarize(args: argparse.Namespace, load: dict, server: dict) -> dict:
+    latencies = load["latencies"]
+    ok = len(latencies)
+    summary = {
+        "provider": args.provider,
+        "essays": args.essays,
+        "concurrency": args.concurrency,
+        "ok": ok,
+        "failed": len(load["errors"]),
+        "elapsed": round(load["elapsed"], 3),
+        "essays_per_minute": round(ok / load["elapsed"] * 60, 1) if load["elapsed"] else 0.0,
+        "sections": load["sections"],
+        "degraded_sections": load["degraded_sections"],
+        "sections_per_second": round(load["sections"] / load["elapsed"], 1) if load["elapsed"] else 0.0,
+        "latency": {
+            name: round(percentile(latencies, q), 3) if latencies else None
+            for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+        },
+        "server": server,
+        # HTTP запросов на раздел: 429, таймауты и короткие ответы дают повторы;
+        # с --chunk-pages сюда входят и план раздела с частями
+        "amplification": round(server["requests"] / load["sections"], 3) if load["sections"] else None,
+        "limiters": {key: round(stats.limit, 2) for key, stats in limiter_stats().items()},
+        "first_errors": load["errors"][:5],
+    }
+    return summary
+
+
+def print_summary(summary: dict) -> None:
+    latency = summary["latency"]
+    server = summary["server"]
+    print(f"Провайдер: {summary['provider']}, рефератов: {summary['essays']}, одновременно: {summary['concurrency']}")
+    print(f"Готово: {summary['ok']}, ошибок: {summary['failed']}, разделов без ответа: {summary['degraded_sections']}")
+    print(f"Время: {summary['elapsed']:.2f} c; {summary['essays_per_minute']:.1f} реф/мин, "
+          f"{summary['sections_per_second']:.1f} разделов/с")
+    if latency["p50"] is not None:
+        print(f"Задержка реферата: p50 {latency['p50']:.2f} c, p95 {latency['p95']:.2f} c, "
+              f"p99 {latency['p99']:.2f} c, max {latency['max']:.2f} c")
+    print("Сервер: " + ", ".join(f"{outcome} {server[outcome]}" for outcome in OUTCOMES if server[outcome])
+          + f"; запросов {server['requests']}, одновременно до {server['max_in_flight']}")
+    if summary["amplification"] is not None:
+        print(f"Усиление: {summary['amplification']:.2f} HTTP запроса на раздел")
+    for key, limit in summary["limiters"].items():
+        print(f"Лимит {key}: {limit}")
+    for error in summary["first_errors"]:
+        print(f"Ошибка: {error}", file=sys.stderr)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест клиентов на OpenAI-совместимой заглушке")
+    parser.add_argument("--essays", type=int, default=50, help="Рефератов всего")
+    parser.add_argument("-c", "--concurrency", type=int, default=20, help="Рефератов одновременно")
+    parser.add_argument("--provider", choices=sorted(PROVIDERS), default="openai", help="Клиент модели")
+    parser.add_argument("--url", default=None, help="Адрес запущенной заглушки (без /v1); по умолчанию — своя")
+    parser.add_argument("--client-timeout", type=float, default=5.0, help="Таймаут HTTP запроса клиента openai, с")
+    parser.add_argument("--chapters", type=int, default=3)
+    parser.add_argument("--subchapters", type=int, default=2)
+    parser.add_argument("--pages", type=int, default=1, help="Страниц на главу")
+    parser.add_argument("--chunk-pages", type=float, default=0, help="Страниц на часть длинной главы (0 — не делить)")
+    parser.add_argument("--json", default=None, help="Записать отчет в JSON файл")
+    parser.add_argument("--max-failed", type=int, default=None, help="Код выхода 1, если ошибок больше")
+    parser.add_argument("--log-level", default=None, help="Включить логи клиентов (WARNING, INFO, ...)")
+    add_stub_arguments(parser.add_argument_group("заглушка"))
+    args = parser.parse_args(argv)
+
+    if args.log_level:
+        configure_logging(args.log_level)
+
+    process = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        # Заглушка в своем процессе: ее цикл событий не делит CPU с клиентами
+        process = multiprocessing.Process(target=run_stub, args=("127.0.0.1", port, config_from_args(args)), daemon=True)
+        process.start()
+    try:
+        wait_ready(url)
+        stub_request(url, "/reset", "POST")
+        load = asyncio.run(run_load(args, url + "/v1"))
+        server = stub_request(url, "/stats")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+
+    summary = summarize(args, load, server)
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    if args.max_failed is not None and summary["failed"] > args.max_failed:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+# benchmarks/bench_loading.py
+"""
+Бенчмарк загрузки сохраненных рефератов: полный Essay против LazyEssay,
+когда нужны только заголовок и метаданные. Для каждого способа — время
+и память (tracemalloc; под ним код на Python замедляется, сравнивайте
+способы между собой).
+
+Запуск:
+    python benchmarks/bench_loading.py --count 10000 --pages 5
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+from bench_docx_render import make_essay
+
+from ai_referat.json_writer import load_json, save_json
+from ai_referat.lazy_essay import LazyEssay
+
+
+def measure(name: str, func) -> None:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<28} {elapsed:7.2f} c  пик {peak / 1024 / 1024:8.1f} MiB  держим {current / 1024 / 1024:8.1f} MiB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк загрузки рефератов")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--pages", type=int, default=5)
+    args = parser.parse_args()
+
+    base = make_essay(args.pages, chapters=3, subchapters=2)
+    print(f"Рефератов: {args.count}, страниц в каждом: {args.pages}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.count):
+            base.metadata.author = f"Автор {i % 50}"
+            paths.append(os.path.join(tmp, f"{i}.json"))
+            save_json(base, paths[-1], pretty=False)
+
+        # Все рефераты в памяти (как при аналитике по корпусу)
+        measure("Essay, все в памяти", lambda: [load_json(p) for p in paths])
+
+        # Нужны только метаданные: подсчет рефератов по авторам
+        measure("Essay, только авторы", lambda: Counter(load_json(p).metadata.author for p in paths))
+        measure("lazy, только авторы", lambda: Counter(LazyEssay.from_file(p).metadata.author for p in paths))
+        lazy = [LazyEssay.from_file(p) for p in paths]
+        measure("lazy, заголовки в памяти", lambda: [essay.metadata for essay in lazy])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_markdown.py
+"""
+Бенчмарк разбора Markdown из ответов LLM.
+
+Измеряет скорость iter_blocks на большом тексте и время рендеринга
+главы с разметкой в DOCX обоими писателями.
+
+Запуск:
+    python benchmarks/bench_markdown.py --chars 2000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from ai_referat.docx_stream_writer import stream_docx
+from ai_referat.docx_writer import create_docx_file
+from ai_referat.markdown_parser import parse_markdown
+
+SAMPLE = """## Развитие стандарта
+
+В **1993 году** появился первый черновик спецификации, а *HTML 2.0* стал первым официальным стандартом.
+Браузеры добавляли собственные теги, что привело к __несовместимости__ страниц.
+
+- появление тегов для таблиц;
+- поддержка форм и **полей ввода**;
+- внедрение `<img>` для изображений.
+
+1. HTML 3.2 — 1997 год.
+2. HTML 4.01 — 1999 год.
+3. ***HTML5*** — 2014 год.
+
+"""
+
+
+def make_text(chars: int) -> str:
+    return SAMPLE * (chars // len(SAMPLE) + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк разбора Markdown")
+    parser.add_argument("--chars", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = make_text(args.chars)
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        blocks = parse_markdown(text)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"Текст: {len(text) / 1e6:.1f} млн символов, блоков: {len(blocks)}")
+    print(f"Разбор: {best:.3f} c ({len(text) / best / 1e6:.1f} млн символов/с)")
+
+    # Одна большая глава, как приходит от модели
+    data = {
+        "topic": "История HTML",
+        "plan": {"chapters": [{"title": "Глава 1: Развитие", "subchapters": []}]},
+        "introduction": {"text": SAMPLE},
+        "chapters": [{"title": "Глава 1: Развитие", "text": make_text(args.chars // 10), "subchapters": []}],
+        "conclusion": {"text": SAMPLE},
+        "references": {"items": ["1. Автор. Источник. 2020."]},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        docx_path = os.path.join(tmp, "bench.docx")
+        for name, writer in [("docx", create_docx_file), ("stream", stream_docx)]:
+            start = time.perf_counter()
+            writer(docx_path=docx_path, json_data=data)
+            print(f"[{name}] рендеринг главы {args.chars // 10 / 1e3:.0f} тыс. символов: {time.perf_counter() - start:.3f} c")
+
+
+if __name__ == "__main__":
+    main()
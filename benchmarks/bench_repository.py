@@ -0,0 +1,69 @@
+# benchmarks/bench_repository.py
+"""
+Бенчмарк поиска по рефератам: перебор JSON файлов против EssayRepository
+(SQLite + FTS5).
+
+Запуск:
+    python benchmarks/bench_repository.py --count 5000 --pages 5
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from bench_docx_render import make_essay
+
+from ai_referat.essay_repository import EssayRepository, iter_sections
+from ai_referat.json_writer import load_json, save_json
+
+
+def scan_files(paths, term: str) -> int:
+    """Прежний способ: открыть каждый JSON и искать подстроку."""
+    found = 0
+    for path in paths:
+        essay = load_json(path)
+        if any(term in text.casefold() for _, _, text in iter_sections(essay)):
+            found += 1
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк репозитория рефератов")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--pages", type=int, default=5)
+    args = parser.parse_args()
+
+    base = make_essay(args.pages, chapters=3, subchapters=2)
+    print(f"Рефератов: {args.count}, страниц в каждом: {args.pages}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_dir = os.path.join(tmp, "json")
+        os.makedirs(json_dir)
+        paths = []
+        for i in range(args.count):
+            essay = base.model_copy(deep=True, update={"topic": f"{base.topic} {i}"})
+            essay.chapters[-1].text += f" термин{i}"
+            paths.append(os.path.join(json_dir, f"{i}.json"))
+            save_json(essay, paths[-1], pretty=False)
+
+        term = f"термин{args.count // 2}"
+        start = time.perf_counter()
+        found = scan_files(paths, term)
+        print(f"{'перебор файлов':<16} {time.perf_counter() - start:8.3f} c  найдено {found}")
+
+        with EssayRepository(os.path.join(tmp, "essays.db")) as repo:
+            start = time.perf_counter()
+            repo.import_json_dir(json_dir)
+            print(f"{'импорт':<16} {time.perf_counter() - start:8.3f} c")
+
+            start = time.perf_counter()
+            hits = repo.search(term)
+            print(f"{'FTS5':<16} {time.perf_counter() - start:8.3f} c  найдено {len(hits)}")
+
+            start = time.perf_counter()
+            repo.has_topic(f"{base.topic} {args.count - 1}")
+            print(f"{'поиск темы':<16} {time.perf_counter() - start:8.3f} c")
+
+
+if __name__ == "__main__":
+    main()
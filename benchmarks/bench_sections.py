@@ -0,0 +1,77 @@
+# benchmarks/bench_sections.py
+"""
+Бенчмарк SectionStore: объем хранения версий реферата, в которых при
+перегенерации меняется лишь часть разделов, против отдельных JSON файлов.
+
+Запуск:
+    python benchmarks/bench_sections.py --versions 50 --changed 0.2
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from bench_docx_render import make_essay
+
+from ai_referat.json_writer import save_json
+from ai_referat.section_store import SectionStore
+
+
+def dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def make_versions(versions: int, changed: float, pages: int):
+    """Версии реферата: в каждой доля changed разделов переписана заново."""
+    rnd = random.Random(0)
+    essay = make_essay(pages)
+    # Разные исходные тексты разделов, как у настоящего реферата
+    for i, chapter in enumerate(essay.chapters):
+        chapter.text += f" (глава {i})"
+        for j, sub in enumerate(chapter.subchapters):
+            sub.text += f" (подглава {i}.{j})"
+    result = [essay]
+    for v in range(1, versions):
+        essay = essay.model_copy(deep=True)
+        for i, chapter in enumerate(essay.chapters):
+            if rnd.random() < changed:
+                chapter.text += f" Версия {v}."
+            for sub in chapter.subchapters:
+                if rnd.random() < changed:
+                    sub.text += f" Версия {v}."
+        result.append(essay)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк хранилища разделов")
+    parser.add_argument("--versions", type=int, default=50)
+    parser.add_argument("--changed", type=float, default=0.2, help="доля переписанных разделов в версии")
+    parser.add_argument("--pages", type=int, default=30)
+    args = parser.parse_args()
+
+    essays = make_versions(args.versions, args.changed, args.pages)
+    print(f"Версий: {args.versions}, страниц: {args.pages}, меняется разделов: {args.changed:.0%}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_dir = os.path.join(tmp, "json")
+        os.makedirs(json_dir)
+        start = time.perf_counter()
+        for i, essay in enumerate(essays):
+            save_json(essay, os.path.join(json_dir, f"v{i}.json"))
+        print(f"{'JSON файлы':<14} {dir_size(json_dir) / 1024 / 1024:8.1f} MiB  {time.perf_counter() - start:6.2f} c")
+
+        store = SectionStore(os.path.join(tmp, "sections"))
+        start = time.perf_counter()
+        for i, essay in enumerate(essays):
+            store.save(essay, f"v{i}")
+        print(f"{'SectionStore':<14} {dir_size(store.root) / 1024 / 1024:8.1f} MiB  {time.perf_counter() - start:6.2f} c")
+
+        start = time.perf_counter()
+        changes = store.diff("v0", f"v{args.versions - 1}")
+        print(f"diff первой и последней версии: {len(changes)} разделов за {time.perf_counter() - start:.4f} c")
+
+
+if __name__ == "__main__":
+    main()
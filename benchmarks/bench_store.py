@@ -0,0 +1,78 @@
+# benchmarks/bench_store.py
+"""
+Бенчмарк хранилища рефератов: каталог отдельных JSON файлов против
+EssayStore (шардированный JSONL с индексом).
+
+Запуск:
+    python benchmarks/bench_store.py --count 10000 --pages 5
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from bench_docx_render import make_essay
+
+from ai_referat.essay_store import EssayStore
+from ai_referat.json_writer import load_json, save_json
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк хранилища рефератов")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    base = make_essay(args.pages, chapters=3, subchapters=2)
+    essays = [base.model_copy(update={"topic": f"{base.topic} {i}"}) for i in range(args.count)]
+    sample = random.Random(0).sample(range(args.count), min(args.lookups, args.count))
+    print(f"Рефератов: {args.count}, страниц в каждом: {args.pages}, выборок: {len(sample)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # --- Отдельные файлы ---
+        paths = [os.path.join(tmp, f"essay-{i}.json") for i in range(args.count)]
+        start = time.perf_counter()
+        for essay, path in zip(essays, paths):
+            save_json(essay, path, pretty=False)
+        write_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in sample:
+            load_json(paths[i])
+        lookup_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for path in paths:
+            load_json(path)
+        scan_time = time.perf_counter() - start
+        print(f"{'файлы':<10} запись {write_time:6.2f} c  выборка {lookup_time:6.2f} c  обход {scan_time:6.2f} c")
+
+        # --- EssayStore ---
+        root = os.path.join(tmp, "store")
+        start = time.perf_counter()
+        with EssayStore(root) as store:
+            ids = [store.append(essay) for essay in essays]
+        write_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store = EssayStore(root)
+        open_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in sample:
+            store.get(ids[i])
+        lookup_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in store.iter_essays():
+            pass
+        scan_time = time.perf_counter() - start
+        store.close()
+        print(f"{'store':<10} запись {write_time:6.2f} c  выборка {lookup_time:6.2f} c  обход {scan_time:6.2f} c"
+              f"  открытие {open_time:6.3f} c")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,39 @@ from ai_referat.client_g4f import AIClientAsync as AIClientAsyncFree
 
 from ai_referat.client import AIClientAsync
 from ai_referat.client import AIClientSync
+from ai_referat.concurrency import AIMDLimiter
+from ai_referat.concurrency import get_limiter
+from ai_referat.log import configure_logging
+from ai_referat.log import log_context
 
 # from config import *
 
 from ai_referat.docx_writer import apply_markdown_formatting
 from ai_referat.docx_writer import create_docx_file
 from ai_referat.docx_writer import create_docx_file_for_json
+from ai_referat.docx_writer import render_docx
+from ai_referat.docx_writer import save_default_template
+
+from ai_referat.docx_stream_writer import stream_docx
+
+from ai_referat.html_writer import render_html
+from ai_referat.html_writer import create_html_file
+from ai_referat.markdown_writer import render_markdown
+from ai_referat.markdown_writer import create_markdown_file
+from ai_referat.pdf_writer import create_pdf_file
+
+from ai_referat.document_tree import EssayDocument
+from ai_referat.document_tree import build_document
 
 from ai_referat.json_writer import save_json
+from ai_referat.json_writer import load_json
+from ai_referat.build_manifest import BuildManifest
+
+from ai_referat.essay_store import EssayStore
+from ai_referat.lazy_essay import LazyEssay
+from ai_referat.section_store import SectionStore
+from ai_referat.essay_repository import EssayRepository
+from ai_referat.job_queue import JobQueue
 
 from ai_referat.models import Subchapter
 from ai_referat.models import Chapter
@@ -24,6 +49,19 @@ from ai_referat.models import Essay
 
 from ai_referat.parser import parse_plan
 
+from ai_referat.markdown_parser import parse_markdown
+from ai_referat.markdown_parser import strip_markdown
+
 from ai_referat.rules import RulesManager
+from ai_referat.budget import TokenBudget
+from ai_referat.topic_index import TopicIndex
+from ai_referat.validators import ValidatorChain
+from ai_referat.router import ModelRoute
+from ai_referat.router import ModelRouter
+from ai_referat.events import PlanReady
+from ai_referat.events import SectionStarted
+from ai_referat.events import SectionCompleted
+from ai_referat.events import SectionRetry
+from ai_referat.events import EssayDone
 
 from ai_referat.prompts import EssayPrompts
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+Бюджет токенов для запросов к модели.
+
+Из правил (min_pages, max_pages, chars_per_page) и вида раздела
+считает max_tokens — верхнюю границу ответа с запасом, чтобы модель не
+уходила далеко за нужный объем, — и min_length: минимальную длину
+ответа в символах, ниже которой запрос повторяется.
+
+Токены оцениваются локально по среднему числу символов в токене для
+языка (без токенизатора). Оценки взяты с запасом вниз, поэтому
+max_tokens скорее завышен, чем обрежет текст.
+"""
+import math
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from ai_referat.config import MAX_OUTPUT_TOKENS
+
+# --- Виды запросов ---
+PLAN = "plan"
+INTRODUCTION = "introduction"
+CHAPTER = "chapter"
+SUBCHAPTER = "subchapter"
+CONCLUSION = "conclusion"
+REFERENCES = "references"
+# План длинного раздела, который пишется по частям (см. chunking)
+OUTLINE = "outline"
+
+# Символов на токен: основа названия языка -> оценка
+CHARS_PER_TOKEN: Dict[str, float] = {
+    "рус": 2.6, "russian": 2.6,
+    "англ": 4.0, "english": 4.0,
+    "кыргыз": 2.2, "киргиз": 2.2, "kyrgyz": 2.2,
+    "казах": 2.2, "kazakh": 2.2,
+    "узбек": 2.6, "uzbek": 2.6,
+    "украин": 2.4, "ukrainian": 2.4,
+    "немец": 3.5, "german": 3.5,
+    "француз": 3.6, "french": 3.6,
+    "испан": 3.8, "spanish": 3.8,
+    "турец": 2.8, "turkish": 2.8,
+    "китай": 1.2, "chinese": 1.2,
+}
+DEFAULT_CHARS_PER_TOKEN = 2.5
+
+# Доля страничной нормы главы для каждого вида раздела
+SECTION_SHARE = {
+    INTRODUCTION: 0.5,
+    CHAPTER: 1.0,
+    SUBCHAPTER: 1.0,
+    CONCLUSION: 0.5,
+}
+
+# План и литература не зависят от страниц: символов на строку
+PLAN_LINE_CHARS = 80
+OUTLINE_POINT_MIN_CHARS = 10
+REFERENCE_CHARS = 120
+REFERENCES_MIN_ITEMS = 5
+REFERENCES_MAX_ITEMS = 8
+
+
+def chars_per_token(language: str) -> float:
+    """Оценка числа символов в токене для языка (по основе названия)."""
+    name = language.casefold()
+    for stem, value in CHARS_PER_TOKEN.items():
+        if stem in name:
+            return value
+    return DEFAULT_CHARS_PER_TOKEN
+
+
+# --- Ограничения одного запроса ---
+class SectionBudget(NamedTuple):
+    max_tokens: int
+    min_length: int
+
+    def as_kwargs(self) -> Dict[str, int]:
+        return {"max_tokens": self.max_tokens, "min_length": self.min_length}
+
+
+class TokenBudget:
+    def __init__(
+        self,
+        language: str = "русский",
+        min_pages: int = 1,
+        max_pages: int = 3,
+        chars_per_page: int = 1800,
+        max_chapters: int = 3,
+        max_subchapters: int = 2,
+        headroom: float = 1.3,
+        min_fill: float = 0.25,
+        max_output_tokens: Optional[int] = MAX_OUTPUT_TOKENS
+    ):
+        """
+        :param headroom: запас max_tokens сверх максимального объема
+        :param min_fill: доля минимального объема, ниже которой ответ считается
+                         слишком коротким и запрос повторяется (невысокая:
+                         правила просят и «не писать слишком много»)
+        :param max_output_tokens: предел ответа модели (None — без предела)
+        """
+        self.language = language
+        self.min_pages = min_pages
+        self.max_pages = max(max_pages, min_pages)
+        self.chars_per_page = chars_per_page
+        self.max_chapters = max_chapters
+        self.max_subchapters = max_subchapters
+        self.headroom = headroom
+        self.min_fill = min_fill
+        self.max_output_tokens = max_output_tokens
+        self.chars_per_token = chars_per_token(language)
+
+    @classmethod
+    def from_rules(cls, rules, **kwargs) -> "TokenBudget":
+        """Бюджет по RulesManager (язык и страничные нормы)."""
+        return cls(
+            language=rules.language,
+            min_pages=rules.min_pages,
+            max_pages=rules.max_pages,
+            chars_per_page=rules.chars_per_page,
+            **kwargs
+        )
+
+    def tokens(self, chars: float) -> int:
+        """Токены на chars символов с запасом headroom."""
+        tokens = math.ceil(chars * self.headroom / self.chars_per_token)
+        if self.max_output_tokens is not None:
+            tokens = min(tokens, self.max_output_tokens)
+        return tokens
+
+    def char_range(self, kind: str, parts: int = 1) -> Tuple[int, int]:
+        """
+        Ожидаемый объем ответа в символах: (минимум, максимум).
+
+        :param parts: раздел пишется по частям — объем одной части; для
+                      OUTLINE — число пунктов плана раздела
+        """
+        if kind == OUTLINE:
+            # Пункт плана раздела — несколько слов
+            return parts * OUTLINE_POINT_MIN_CHARS, parts * PLAN_LINE_CHARS
+        if kind == PLAN:
+            lines = self.max_chapters * (1 + self.max_subchapters) + 3
+            return PLAN_LINE_CHARS, lines * PLAN_LINE_CHARS
+        if kind == REFERENCES:
+            return REFERENCES_MIN_ITEMS * REFERENCE_CHARS // 3, REFERENCES_MAX_ITEMS * REFERENCE_CHARS
+        share = SECTION_SHARE[kind] / parts
+        return (int(self.min_pages * self.chars_per_page * share),
+                int(self.max_pages * self.chars_per_page * share))
+
+    def for_section(self, kind: str, parts: int = 1) -> SectionBudget:
+        low, high = self.char_range(kind, parts)
+        min_length = int(low * self.min_fill) if kind in SECTION_SHARE else low
+        max_tokens = self.tokens(high)
+        # Предел модели не должен делать минимум недостижимым
+        min_length = min(min_length, int(max_tokens * self.chars_per_token * 0.8))
+        return SectionBudget(max_tokens=max_tokens, min_length=min_length)
@@ -0,0 +1,327 @@
+"""
+Манифест инкрементальной сборки JSON и DOCX.
+
+Для каждого выходного файла манифест хранит хеш того, из чего он собран:
+содержимого реферата, метаданных титульного листа и настроек рендера
+(writer, шаблон и его содержимое, шрифт, размер). Если хеш совпадает, а
+сам файл на месте и не менялся с записи (размер и mtime), файл не
+пересобирается. После правки метаданных или одного раздела пересобираются
+только затронутые рефераты.
+
+Хеш DOCX считается по JSON реферата в том же виде, в каком его пишет
+save_json, поэтому DOCX, собранный менеджером, пропускается и при
+выгрузке bulk_export с тем же манифестом и теми же настройками.
+
+Пример:
+    manifest = BuildManifest("results/.build-manifest.json")
+    manager = AIReferatManagerAsync(topic="История HTML", manifest=manifest, ...)
+"""
+import asyncio
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ai_referat.config import DOCX_TEMPLATE as CFG_DOCX_TEMPLATE
+from ai_referat.docx_writer import render_docx, resolve_fonts
+from ai_referat.json_writer import dumps_json, write_atomic
+from ai_referat.log import get_logger, log
+from ai_referat.models import Essay, EssayMetadata
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = ".build-manifest.json"
+MANIFEST_VERSION = 1
+# Увеличить при изменении вывода рендера DOCX: все DOCX соберутся заново
+RENDER_VERSION = 1
+
+_template_digests: Dict[str, tuple] = {}
+
+
+def _digest(*parts: bytes) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        # Длина перед каждой частью: b"ab"+b"c" и b"a"+b"bc" дают разные хеши
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def template_digest(template_path: Optional[str]) -> str:
+    """Хеш содержимого шаблона (кешируется по mtime и размеру)."""
+    if not template_path:
+        return ""
+    stat = os.stat(template_path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _template_digests.get(template_path)
+    if cached is None or cached[0] != key:
+        with open(template_path, "rb") as f:
+            cached = _template_digests[template_path] = (key, _digest(f.read()))
+    return cached[1]
+
+
+def json_fingerprint(data: bytes) -> str:
+    """Хеш JSON файла — это хеш его байтов."""
+    return _digest(b"json", data)
+
+
+def docx_fingerprint(
+    essay_json: bytes,
+    metadata: Optional[Union[Dict[str, Any], EssayMetadata]] = None,
+    writer: str = "docx",
+    template_path: Optional[str] = CFG_DOCX_TEMPLATE,
+    content_font: Optional[str] = None,
+    content_size: Optional[int] = None
+) -> str:
+    """
+    Хеш DOCX: JSON реферата, метаданные и настройки рендера.
+
+    :param essay_json: реферат в виде JSON (как в файле save_json)
+    :param metadata: метаданные, заменяющие метаданные реферата; None — из JSON
+    :param content_font: шрифт, с которым вызывается рендер (None — не задан)
+    """
+    if isinstance(metadata, EssayMetadata):
+        metadata = metadata.model_dump()
+    settings = {
+        "render": RENDER_VERSION,
+        "writer": writer,
+        "template": template_digest(template_path),
+        "font": content_font,
+        "size": content_size,
+        "metadata": metadata,
+    }
+    return _digest(b"docx", essay_json, json.dumps(settings, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+
+
+class BuildManifest:
+    """
+    Файл манифеста: путь выходного файла -> хеш, размер и mtime.
+
+    Пути хранятся относительно каталога манифеста. Потокобезопасен; при
+    save() изменения сливаются с файлом на диске, поэтому один манифест
+    могут дописывать несколько процессов (при гонке запись теряется, и
+    файл просто соберется еще раз).
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.root = os.path.dirname(self.path)
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._changed: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def in_dir(cls, directory: str) -> "BuildManifest":
+        return cls(os.path.join(directory, MANIFEST_NAME))
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "rb") as f:
+                data = json.loads(f.read())
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            # Испорченный манифест — не ошибка, просто все соберется заново
+            log(logger, logging.WARNING, "Манифест сборки не прочитан", path=self.path, error=str(e))
+            return {}
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return {}
+        entries = data.get("outputs")
+        return entries if isinstance(entries, dict) else {}
+
+    def _entries_locked(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def _key(self, target: str) -> str:
+        target = os.path.abspath(target)
+        try:
+            return os.path.relpath(target, self.root).replace(os.sep, "/")
+        except ValueError:
+            # Другой диск в Windows
+            return target
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries_locked())
+
+    def is_current(self, target: str, fingerprint: str) -> bool:
+        """Файл собран из того же, что и сейчас, и с тех пор не менялся."""
+        with self._lock:
+            entry = self._entries_locked().get(self._key(target))
+        if not entry or entry.get("hash") != fingerprint:
+            return False
+        try:
+            stat = os.stat(target)
+        except OSError:
+            return False
+        return stat.st_size == entry.get("size") and stat.st_mtime_ns == entry.get("mtime_ns")
+
+    def record(self, target: str, fingerprint: str) -> None:
+        """Запоминает хеш только что собранного файла."""
+        stat = os.stat(target)
+        entry = {"hash": fingerprint, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        key = self._key(target)
+        with self._lock:
+            self._entries_locked()[key] = entry
+            self._changed[key] = entry
+
+    def forget(self, target: str) -> None:
+        key = self._key(target)
+        with self._lock:
+            self._entries_locked().pop(key, None)
+            self._changed[key] = None
+
+    def save(self) -> None:
+        """Атомарно записывает манифест, сливая изменения с версией на диске."""
+        with self._lock:
+            if not self._changed:
+                return
+            entries = self._read()
+            for key, entry in self._changed.items():
+                if entry is None:
+                    entries.pop(key, None)
+                else:
+                    entries[key] = entry
+            data = {"version": MANIFEST_VERSION, "outputs": entries}
+            os.makedirs(self.root, exist_ok=True)
+            write_atomic(self.path, json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8"))
+            self._entries = entries
+            self._changed.clear()
+
+
+# ---------------- Запись результатов ----------------
+def essay_docx_fingerprint(
+    essay: Essay,
+    data: bytes,
+    metadata: Optional[EssayMetadata] = None,
+    template_path: Optional[str] = CFG_DOCX_TEMPLATE,
+    content_font: Optional[str] = None,
+    content_size: Optional[int] = None
+) -> str:
+    """Хеш DOCX реферата, собираемого render_docx; data — dumps_json(essay)."""
+    # Метаданные, совпадающие с метаданными реферата, уже учтены в JSON
+    override = metadata if metadata is not None and metadata != essay.metadata else None
+    content_font, content_size = resolve_fonts(template_path, content_font, content_size)
+    return docx_fingerprint(data, override, "docx", template_path, content_font, content_size)
+
+
+def write_json_file(json_path: str, data: bytes) -> None:
+    """Как save_json, но из готовых байтов: .gz — сжатый файл."""
+    write_atomic(json_path, gzip.compress(data, compresslevel=6) if json_path.endswith(".gz") else data)
+
+
+def write_json_output(
+    essay: Essay,
+    json_path: str,
+    manifest: Optional[BuildManifest] = None,
+    data: Optional[bytes] = None
+) -> bool:
+    """
+    Пишет JSON реферата, если он изменился. Возвращает True, если файл записан.
+
+    :param data: уже сериализованный реферат (dumps_json), чтобы не делать это дважды
+    """
+    data = data if data is not None else dumps_json(essay)
+    fingerprint = json_fingerprint(data)
+    if manifest is not None and manifest.is_current(json_path, fingerprint):
+        return False
+    write_json_file(json_path, data)
+    if manifest is not None:
+        manifest.record(json_path, fingerprint)
+    return True
+
+
+def write_docx_output(
+    essay: Essay,
+    docx_path: str,
+    metadata: Optional[EssayMetadata] = None,
+    manifest: Optional[BuildManifest] = None,
+    data: Optional[bytes] = None,
+    template_path: Optional[str] = CFG_DOCX_TEMPLATE,
+    content_font: Optional[str] = None,
+    content_size: Optional[int] = None
+) -> bool:
+    """
+    Собирает DOCX реферата, если изменилось содержимое, метаданные или
+    настройки рендера. Возвращает True, если файл собран.
+
+    Шрифт и размер по умолчанию — из config без шаблона, из самого шаблона с ним.
+    """
+    content_font, content_size = resolve_fonts(template_path, content_font, content_size)
+    if manifest is not None:
+        data = data if data is not None else dumps_json(essay)
+        fingerprint = essay_docx_fingerprint(essay, data, metadata, template_path, content_font, content_size)
+        if manifest.is_current(docx_path, fingerprint):
+            return False
+    render_docx(
+        docx_path=docx_path,
+        json_data=essay,
+        metadata=metadata,
+        template_path=template_path,
+        content_font=content_font,
+        content_size=content_size,
+    )
+    if manifest is not None:
+        manifest.record(docx_path, fingerprint)
+    return True
+
+
+async def save_outputs(
+    essay: Essay,
+    json_path: Optional[str],
+    docx_path: Optional[str],
+    metadata: Optional[EssayMetadata] = None,
+    manifest: Optional[BuildManifest] = None,
+    executor: Optional[Executor] = None
+) -> List[str]:
+    """
+    Пишет JSON и собирает DOCX одновременно в executor, не занимая цикл событий.
+
+    executor — пул потоков (None — пул цикла по умолчанию) или процессов:
+    в него уходят только запись байтов и render_docx, а хеши и манифест
+    остаются в вызывающем процессе. Возвращает записанные пути; если один
+    из файлов не удался, второй все равно дописывается, а ошибка
+    пробрасывается после.
+    """
+    loop = asyncio.get_running_loop()
+    data = dumps_json(essay)
+    content_font, content_size = resolve_fonts(CFG_DOCX_TEMPLATE)
+    jobs: List[Tuple[str, str, Any]] = []
+    if json_path:
+        fingerprint = json_fingerprint(data)
+        if manifest is None or not manifest.is_current(json_path, fingerprint):
+            jobs.append((json_path, fingerprint, loop.run_in_executor(executor, write_json_file, json_path, data)))
+    if docx_path:
+        fingerprint = essay_docx_fingerprint(essay, data, metadata) if manifest is not None else ""
+        if manifest is None or not manifest.is_current(docx_path, fingerprint):
+            render = functools.partial(
+                render_docx,
+                docx_path=docx_path,
+                json_data=essay,
+                metadata=metadata,
+                template_path=CFG_DOCX_TEMPLATE,
+                content_font=content_font,
+                content_size=content_size,
+            )
+            jobs.append((docx_path, fingerprint, loop.run_in_executor(executor, render)))
+
+    results = await asyncio.gather(*(job for _, _, job in jobs), return_exceptions=True)
+    written = []
+    for (target, fingerprint, _), result in zip(jobs, results):
+        if not isinstance(result, BaseException):
+            written.append(target)
+            if manifest is not None:
+                manifest.record(target, fingerprint)
+    if manifest is not None and written:
+        await loop.run_in_executor(None, manifest.save)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return written
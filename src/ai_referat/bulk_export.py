@@ -0,0 +1,264 @@
+"""
+Параллельная выгрузка каталога JSON рефератов в DOCX.
+
+Повторная выгрузка пересобирает только DOCX, у которых изменился JSON,
+метаданные или настройки рендера (манифест сборки в каталоге DOCX).
+
+Пример:
+    python -m ai_referat.bulk_export ./results/json -o ./results/docx -w 8
+    python -m ai_referat.bulk_export "./results/json/referat_*.json" --writer stream
+    python -m ai_referat.bulk_export ./results/json --no-manifest   # по времени изменения файлов
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, List, Optional, Union
+
+from pydantic import BaseModel, Field
+
+from ai_referat.config import DOCX_TEMPLATE as CFG_DOCX_TEMPLATE
+from ai_referat.config import FONT as CFG_FONT
+from ai_referat.config import FONT_SIZE as CFG_FONT_SIZE
+from ai_referat.build_manifest import BuildManifest, docx_fingerprint
+from ai_referat.config import RESULTS_DOCX_DIR, RESULTS_JSON_DIR
+from ai_referat.docx_stream_writer import stream_docx
+from ai_referat.docx_writer import render_docx, resolve_fonts
+from ai_referat.json_writer import read_json_bytes
+
+WRITERS = ("docx", "stream")
+
+
+# --- Результат выгрузки одного файла ---
+class ExportResult(BaseModel):
+    source: str = Field(..., description="Путь к исходному JSON")
+    target: str = Field(..., description="Путь к DOCX")
+    status: str = Field(..., description="ok, skipped или error")
+    error: Optional[str] = Field(None, description="Текст ошибки")
+    seconds: float = Field(0.0, description="Время конвертации")
+
+
+# --- Итог выгрузки ---
+class ExportSummary(BaseModel):
+    results: List[ExportResult] = Field(default_factory=list, description="Результаты по файлам")
+    elapsed: float = Field(0.0, description="Общее время, сек")
+    workers: int = Field(1, description="Число процессов")
+
+    @property
+    def converted(self) -> int:
+        return sum(1 for r in self.results if r.status == "ok")
+
+    @property
+    def skipped(self) -> int:
+        return sum(1 for r in self.results if r.status == "skipped")
+
+    @property
+    def failed(self) -> List[ExportResult]:
+        return [r for r in self.results if r.status == "error"]
+
+    @property
+    def throughput(self) -> float:
+        """Сконвертированных файлов в секунду."""
+        return self.converted / self.elapsed if self.elapsed > 0 else 0.0
+
+    def format(self) -> str:
+        return (
+            f"Всего: {len(self.results)}, сконвертировано: {self.converted}, "
+            f"пропущено: {self.skipped}, ошибок: {len(self.failed)}; "
+            f"{self.elapsed:.2f} c, {self.throughput:.1f} файл/с, процессов: {self.workers}"
+        )
+
+
+def collect_sources(source: str, pattern: str = "*.json") -> List[str]:
+    """Список JSON файлов: каталог (по маске pattern) или glob-шаблон."""
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, pattern))
+    else:
+        paths = glob.glob(source)
+    return sorted(p for p in paths if os.path.isfile(p))
+
+
+def target_path(source: str, output_dir: str) -> str:
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(output_dir, f"{name}.docx")
+
+
+def is_up_to_date(source: str, target: str) -> bool:
+    """DOCX не старше исходного JSON — пересобирать не нужно."""
+    try:
+        return os.path.getmtime(target) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+
+def _export_one(
+    source: str,
+    target: str,
+    writer: str,
+    template_path: Optional[str],
+    content_font: Optional[str],
+    content_size: Optional[int]
+) -> ExportResult:
+    """Конвертирует один файл; выполняется в дочернем процессе."""
+    start = time.perf_counter()
+    try:
+        if writer == "stream":
+            stream_docx(docx_path=target, json_path=source, content_font=content_font, content_size=content_size)
+        else:
+            render_docx(
+                docx_path=target,
+                json_path=source,
+                template_path=template_path,
+                content_font=content_font,
+                content_size=content_size,
+            )
+    except Exception as e:
+        return ExportResult(
+            source=source, target=target, status="error",
+            error=f"{type(e).__name__}: {e}", seconds=time.perf_counter() - start
+        )
+    return ExportResult(source=source, target=target, status="ok", seconds=time.perf_counter() - start)
+
+
+def export_docx_dir(
+    source: str = RESULTS_JSON_DIR,
+    output_dir: str = RESULTS_DOCX_DIR,
+    workers: Optional[int] = None,
+    pattern: str = "*.json",
+    force: bool = False,
+    writer: str = "docx",
+    template_path: Optional[str] = CFG_DOCX_TEMPLATE,
+    content_font: Optional[str] = None,
+    content_size: Optional[int] = None,
+    on_result: Optional[Callable[[ExportResult], None]] = None,
+    manifest: Union[BuildManifest, str, None] = None,
+    use_manifest: bool = True
+) -> ExportSummary:
+    """
+    Конвертирует JSON рефераты из каталога или glob-шаблона в DOCX пулом процессов.
+
+    :param workers: число процессов (по умолчанию — число ядер)
+    :param force: пересобирать даже актуальные DOCX
+    :param writer: "docx" (render_docx) или "stream" (stream_docx)
+    :param content_font: шрифт и размер (content_size) поверх шаблона; None — из
+        config без шаблона, как в самом шаблоне с ним (stream — всегда config)
+    :param on_result: вызывается для каждого файла по мере готовности
+    :param manifest: манифест сборки или путь к нему (по умолчанию в output_dir)
+    :param use_manifest: False — актуальность по времени изменения (is_up_to_date)
+    """
+    if writer not in WRITERS:
+        raise ValueError(f"Неизвестный writer: {writer}, ожидается один из {WRITERS}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    # stream_docx шаблонов не поддерживает, ему шрифт нужен всегда
+    render_template = None if writer == "stream" else template_path
+    content_font, content_size = resolve_fonts(render_template, content_font, content_size)
+    start = time.perf_counter()
+    results: List[ExportResult] = []
+
+    def report(result: ExportResult) -> None:
+        results.append(result)
+        if on_result:
+            on_result(result)
+
+    if not use_manifest:
+        manifest = None
+    elif not isinstance(manifest, BuildManifest):
+        manifest = BuildManifest(manifest) if manifest else BuildManifest.in_dir(output_dir)
+
+    pending = []
+    fingerprints = {}
+    for src in collect_sources(source, pattern):
+        dst = target_path(src, output_dir)
+        if manifest is not None:
+            try:
+                fingerprints[dst] = docx_fingerprint(
+                    read_json_bytes(src), writer=writer, template_path=template_path,
+                    content_font=content_font, content_size=content_size,
+                )
+            except OSError as e:
+                report(ExportResult(source=src, target=dst, status="error", error=f"{type(e).__name__}: {e}"))
+                continue
+            current = manifest.is_current(dst, fingerprints[dst])
+        else:
+            current = is_up_to_date(src, dst)
+        if not force and current:
+            report(ExportResult(source=src, target=dst, status="skipped"))
+        else:
+            pending.append((src, dst))
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_export_one, src, dst, writer, template_path, content_font, content_size): (src, dst)
+                for src, dst in pending
+            }
+            for future in as_completed(futures):
+                src, dst = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Например, дочерний процесс аварийно завершился
+                    result = ExportResult(source=src, target=dst, status="error", error=f"{type(e).__name__}: {e}")
+                if manifest is not None:
+                    if result.status == "ok":
+                        manifest.record(dst, fingerprints[dst])
+                    else:
+                        manifest.forget(dst)
+                report(result)
+
+    if manifest is not None:
+        manifest.save()
+    return ExportSummary(results=results, elapsed=time.perf_counter() - start, workers=workers)
+
+
+def build_arg_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(description="Параллельная выгрузка JSON рефератов в DOCX")
+    parser.add_argument("source", nargs="?", default=RESULTS_JSON_DIR, help="Каталог или glob-шаблон JSON файлов")
+    parser.add_argument("-o", "--output-dir", default=RESULTS_DOCX_DIR, help="Каталог для DOCX")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Число процессов")
+    parser.add_argument("--pattern", default="*.json", help="Маска файлов внутри каталога")
+    parser.add_argument("--force", action="store_true", help="Пересобрать даже актуальные файлы")
+    parser.add_argument("--manifest", default=None, help="Файл манифеста сборки (по умолчанию в каталоге DOCX)")
+    parser.add_argument("--no-manifest", action="store_true",
+                        help="Не вести манифест: актуальность по времени изменения файлов")
+    parser.add_argument("--writer", choices=WRITERS, default="docx")
+    parser.add_argument("--template", default=CFG_DOCX_TEMPLATE, help="Свой .docx шаблон")
+    parser.add_argument("--font", default=None, help=f"Шрифт (по умолчанию {CFG_FONT}; для шаблона — как в нем)")
+    parser.add_argument("--font-size", type=int, default=None,
+                        help=f"Размер шрифта (по умолчанию {CFG_FONT_SIZE}; для шаблона — как в нем)")
+    return parser
+
+
+def run_from_args(args: argparse.Namespace) -> int:
+    def on_result(result: ExportResult) -> None:
+        if result.status == "error":
+            print(f"Ошибка: {result.source}: {result.error}", file=sys.stderr)
+
+    summary = export_docx_dir(
+        source=args.source,
+        output_dir=args.output_dir,
+        workers=args.workers,
+        pattern=args.pattern,
+        force=args.force,
+        writer=args.writer,
+        template_path=args.template,
+        content_font=args.font,
+        content_size=args.font_size,
+        on_result=on_result,
+        manifest=args.manifest,
+        use_manifest=not args.no_manifest,
+    )
+    print(summary.format())
+    return 1 if summary.failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    return run_from_args(build_arg_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Длинные разделы по частям.
+
+Если глава рассчитана на много страниц, один запрос упирается в предел
+max_tokens, идет долго и часто не добирает min_length. Вместо него
+менеджер просит короткий план раздела из K пунктов, пишет K частей
+одновременно (каждая знает соседние пункты) и склеивает их join_parts:
+убирает подписи «Часть 2», заголовок пункта и предложение, повторенное
+на стыке частей.
+
+Пример (50 страниц на главу, по 5 страниц на часть — 10 частей):
+    parts_count(max_pages=50, chunk_pages=5)  # 10
+"""
+import math
+import re
+from typing import List, Optional
+
+from ai_referat.budget import SECTION_SHARE
+
+# Делятся на части разделы, объем которых растет со страницами
+CHUNKED_KINDS = tuple(SECTION_SHARE)
+MAX_PARTS = 12
+LIMIT_PREFIX = "LIMIT: "
+
+_OUTLINE_ITEM = re.compile(r"^\s*(?:\d+[.)]|[-*•—])\s*")
+_PART_LABEL = re.compile(r"^\s*(?:Часть\s+\d+|Продолжение)(?:\s+из\s+\d+)?\s*[.:—-]?\s*", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+def parts_count(max_pages: float, chunk_pages: Optional[float], max_parts: int = MAX_PARTS) -> int:
+    """Число частей раздела: 1 — делить не нужно (chunk_pages не задан или раздел короткий)."""
+    if not chunk_pages or max_pages <= chunk_pages:
+        return 1
+    return min(math.ceil(max_pages / chunk_pages), max_parts)
+
+
+def split_outline(text: str, parts: int) -> List[str]:
+    """Ровно parts пунктов из ответа модели; недостающие — «Часть N»."""
+    points = []
+    if not text.startswith(LIMIT_PREFIX):
+        for line in text.splitlines():
+            point = _OUTLINE_ITEM.sub("", line).strip().strip('"«»')
+            if point:
+                points.append(point)
+    points = points[:parts]
+    points += [f"Часть {i + 1}" for i in range(len(points), parts)]
+    return points
+
+
+def _sentence_key(sentence: str) -> str:
+    return " ".join(sentence.casefold().split()).rstrip(".!?…")
+
+
+def _strip_heading(text: str, point: Optional[str]) -> str:
+    first, _, rest = text.partition("\n")
+    if point and rest and _sentence_key(first.strip("#*: ")) == _sentence_key(point):
+        return rest.lstrip()
+    return text
+
+
+def join_parts(parts: List[str], points: Optional[List[str]] = None) -> str:
+    """
+    Склеивает части раздела по абзацам.
+
+    На стыке убирает подписи частей, повтор заголовка пункта и первое
+    предложение части, если оно повторяет последнее предложение
+    предыдущей. Если хоть одна часть не получена (LIMIT:), результат
+    тоже помечается LIMIT:, как ответ клиента.
+    """
+    joined: List[str] = []
+    limited = False
+    previous_last = ""
+    for i, text in enumerate(parts):
+        if text.startswith(LIMIT_PREFIX):
+            limited = True
+            text = text[len(LIMIT_PREFIX):]
+        text = _strip_heading(_PART_LABEL.sub("", text.strip(), count=1), points[i] if points else None).strip()
+        if not text:
+            continue
+        if previous_last:
+            sentences = _SENTENCE_END.split(text, maxsplit=1)
+            if _sentence_key(sentences[0]) == previous_last:
+                text = sentences[1] if len(sentences) > 1 else ""
+        if text:
+            joined.append(text)
+            previous_last = _sentence_key(_SENTENCE_END.split(text)[-1])
+    result = "\n\n".join(joined)
+    return LIMIT_PREFIX + result if limited else result
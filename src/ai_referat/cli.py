@@ -0,0 +1,293 @@
+"""
+Командная строка ai-referat.
+
+    ai-referat generate "История HTML" --pages 2-5 --author "Иванов И.И."
+    ai-referat batch topics.txt -c 8 --provider g4f
+    ai-referat export-docx ./results/json -o ./results/docx -w 8
+    ai-referat bench docx_render --pages 200
+    ai-referat stub --port 8999 --latency 0.5 --rate-limit 0.05
+    ai-referat bench load --essays 200 -c 50 --capacity 32
+    ai-referat generate "История HTML" --profile sample --profile-output run.folded
+
+--profile (cprofile, tracemalloc, sample) записывает профиль всего
+запуска команды, см. ai_referat.profiling; --log-level и --log-format
+(text, json) управляют логами, см. ai_referat.log.
+"""
+import argparse
+import asyncio
+import os
+import runpy
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ai_referat import bulk_export, pipeline, pipeline_g4f, stub_server
+from ai_referat.build_manifest import BuildManifest
+from ai_referat.config import AI_API_KEY, AI_BASE_URL, AI_MODEL
+from ai_referat.config import CHUNK_PAGES as CFG_CHUNK_PAGES
+from ai_referat.config import LANGUAGE as CFG_LANGUAGE
+from ai_referat.config import MAX_CHAPTERS as CFG_MAX_CHAPTERS
+from ai_referat.config import MAX_CHARS_PER_PAGE as CFG_CHARS_PER_PAGE
+from ai_referat.config import MAX_PAGES as CFG_MAX_PAGES
+from ai_referat.config import MAX_SUBCHAPTERS as CFG_MAX_SUBCHAPTERS
+from ai_referat.config import MIN_PAGES as CFG_MIN_PAGES
+from ai_referat.config import RESULTS_DOCX_DIR, RESULTS_JSON_DIR
+from ai_referat.log import FORMATS as LOG_FORMATS
+from ai_referat.log import configure_logging
+from ai_referat.profiling import PROFILERS, default_output, profiled
+from ai_referat.router import add_router_arguments, router_from_args
+from ai_referat.service import PROVIDERS, write_outputs
+
+# Провайдер -> (синхронный менеджер, асинхронный менеджер)
+MANAGERS = {
+    "openai": (pipeline.AIReferatManagerSync, pipeline.AIReferatManagerAsync),
+    "g4f": (pipeline_g4f.AIReferatManagerSync, pipeline_g4f.AIReferatManagerAsync),
+}
+BENCH_PREFIX = "bench_"
+
+
+def output_paths(topic: str, json_dir: str, docx_dir: Optional[str]) -> Tuple[str, Optional[str]]:
+    """Пути результатов по теме: referat_<тема>.json / .docx."""
+    name = "referat_" + "".join("_" if c in '/\\:*?"<>|' else c for c in topic.strip())
+    json_path = os.path.join(json_dir, f"{name}.json")
+    docx_path = os.path.join(docx_dir, f"{name}.docx") if docx_dir else None
+    return json_path, docx_path
+
+
+def parse_pages(value: str) -> Tuple[int, int]:
+    """«3» или «2-5» -> (минимум, максимум)."""
+    low, _, high = value.partition("-")
+    try:
+        pages = (int(low), int(high or low))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается число или диапазон страниц, например 2-5: {value}")
+    if pages[0] < 1 or pages[1] < pages[0]:
+        raise argparse.ArgumentTypeError(f"неверный диапазон страниц: {value}")
+    return pages
+
+
+# ---------------- Аргументы ----------------
+def _add_essay_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("реферат")
+    group.add_argument("--language", default=CFG_LANGUAGE, help="Язык реферата")
+    group.add_argument("--author", default="Автор")
+    group.add_argument("--group", default="Группа")
+    group.add_argument("--discipline", default="Дисциплина")
+    group.add_argument("--department", default="Кафедра")
+    group.add_argument("--checked-by", default="")
+    group.add_argument("--year", default="2024")
+    group.add_argument("--city", default="Бишкек")
+    group.add_argument("--chapters", type=int, default=CFG_MAX_CHAPTERS, help="Максимум глав")
+    group.add_argument("--subchapters", type=int, default=CFG_MAX_SUBCHAPTERS, help="Максимум подглав в главе")
+    group.add_argument("--pages", type=parse_pages, default=(CFG_MIN_PAGES, CFG_MAX_PAGES),
+                       help=f"Страниц на главу: N или MIN-MAX (по умолчанию {CFG_MIN_PAGES}-{CFG_MAX_PAGES})")
+    group.add_argument("--chars-per-page", type=int, default=CFG_CHARS_PER_PAGE)
+    group.add_argument("--chunk-pages", type=float, default=CFG_CHUNK_PAGES,
+                       help="Писать главы длиннее N страниц частями одновременно (0 — одним запросом)")
+
+    model = parser.add_argument_group("модель")
+    model.add_argument("--provider", choices=sorted(MANAGERS), default="openai", help="Клиент модели")
+    model.add_argument("--model", default=AI_MODEL, help="Модель")
+    add_router_arguments(model)
+
+    output = parser.add_argument_group("результаты")
+    output.add_argument("--json-dir", default=RESULTS_JSON_DIR, help="Каталог JSON")
+    output.add_argument("--docx-dir", default=RESULTS_DOCX_DIR, help="Каталог DOCX")
+    output.add_argument("--no-docx", action="store_true", help="Не создавать DOCX")
+    output.add_argument("--manifest", default=None,
+                        help="Манифест сборки: не перезаписывать JSON и DOCX, которые не изменились")
+
+
+def _manager_kwargs(args: argparse.Namespace) -> Dict[str, Any]:
+    min_pages, max_pages = args.pages
+    return {
+        "language": args.language,
+        "author": args.author,
+        "group": args.group,
+        "discipline": args.discipline,
+        "department": args.department,
+        "checked_by": args.checked_by,
+        "year": args.year,
+        "city": args.city,
+        "max_chapters": args.chapters,
+        "max_subchapters": args.subchapters,
+        "min_pages": min_pages,
+        "max_pages": max_pages,
+        "chars_per_page": args.chars_per_page,
+        "chunk_pages": args.chunk_pages,
+        "manifest": BuildManifest(args.manifest) if args.manifest else None,
+        "model": args.model,
+        # В batch один роутер на все рефераты: p95 по всем запросам
+        "router": router_from_args(args),
+        "api_key": AI_API_KEY or None,
+        "base_url": AI_BASE_URL or None,
+    }
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--profile", choices=PROFILERS, default=None, help="Профилировать запуск")
+    common.add_argument("--profile-output", default=None,
+                        help="Файл профиля (по умолчанию ai-referat-<команда>.prof/.txt/.folded)")
+    common.add_argument("--log-level", default="INFO", help="Уровень логов (DEBUG, INFO, WARNING, ...)")
+    common.add_argument("--log-format", choices=LOG_FORMATS, default="text", help="Формат логов")
+    common.add_argument("--log-file", default=None, help="Писать логи в файл вместо stderr")
+
+    parser = argparse.ArgumentParser(prog="ai-referat", description="Генератор рефератов на основе AI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", parents=[common], help="Сгенерировать один реферат")
+    generate.add_argument("topic", help="Тема реферата")
+    generate.add_argument("--json", default=None, help="Путь к JSON (по умолчанию по теме в --json-dir)")
+    generate.add_argument("--docx", default=None, help="Путь к DOCX (по умолчанию по теме в --docx-dir)")
+    generate.add_argument("--sync", action="store_true", help="Синхронный менеджер (разделы по очереди)")
+    _add_essay_arguments(generate)
+
+    batch = commands.add_parser("batch", parents=[common], help="Сгенерировать рефераты по списку тем")
+    batch.add_argument("topics", help="Файл с темами, по одной на строку")
+    batch.add_argument("-c", "--concurrency", type=int, default=4, help="Рефератов одновременно")
+    _add_essay_arguments(batch)
+
+    export = commands.add_parser("export-docx", parents=[common], help="Выгрузить JSON рефераты в DOCX")
+    bulk_export.build_arg_parser(export)
+
+    stub = commands.add_parser("stub", parents=[common], help="OpenAI-совместимая заглушка для нагрузочных тестов")
+    stub_server.build_arg_parser(stub)
+
+    bench = commands.add_parser("bench", parents=[common], help="Запустить бенчмарк из каталога benchmarks")
+    bench.add_argument("--bench-dir", default=None, help="Каталог бенчмарков")
+    bench.add_argument("name", nargs="?", default=None, help="Имя бенчмарка (без bench_ и .py); без имени — список")
+    bench.add_argument("bench_args", nargs=argparse.REMAINDER, help="Аргументы бенчмарка (опции ai-referat — до имени)")
+    return parser
+
+
+# ---------------- Команды ----------------
+def run_generate(args: argparse.Namespace) -> int:
+    sync_class, async_class = MANAGERS[args.provider]
+    json_path, docx_path = output_paths(args.topic, args.json_dir, None if args.no_docx else args.docx_dir)
+    json_path = args.json or json_path
+    docx_path = None if args.no_docx else (args.docx or docx_path)
+    for path in (json_path, docx_path):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    start = time.perf_counter()
+    if args.sync:
+        manager = sync_class(topic=args.topic, json_path=json_path, docx_path=docx_path, **_manager_kwargs(args))
+        manager.generate_essay()
+    else:
+        manager = async_class(topic=args.topic, json_path=json_path, docx_path=docx_path, **_manager_kwargs(args))
+        asyncio.run(manager.generate_essay())
+    print(f"Готово за {time.perf_counter() - start:.1f} c: {json_path}" + (f", {docx_path}" if docx_path else ""))
+    return 0
+
+
+async def _run_batch(topics: List[str], args: argparse.Namespace) -> int:
+    _, async_class = MANAGERS[args.provider]
+    kwargs = _manager_kwargs(args)
+    # Один клиент на все рефераты: общий пул соединений и AIMD ограничитель
+    client = PROVIDERS[args.provider][1](model=args.model, api_key=kwargs["api_key"], base_url=kwargs["base_url"])
+    slots = asyncio.Semaphore(args.concurrency)
+    loop = asyncio.get_running_loop()
+    # Манифест пишется на диск один раз, после всех рефератов
+    manifest = kwargs.pop("manifest")
+    finished = 0
+
+    async def one(topic: str) -> None:
+        nonlocal finished
+        json_path, docx_path = output_paths(topic, args.json_dir, None if args.no_docx else args.docx_dir)
+        async with slots:
+            start = time.perf_counter()
+            manager = async_class(topic=topic, **kwargs)
+            manager.client = client
+            essay = await manager.generate_essay()
+            # DOCX пишется в потоке, чтобы не останавливать остальные рефераты
+            await loop.run_in_executor(None, write_outputs, essay, json_path, docx_path, manifest)
+            finished += 1
+            print(f"[{finished}/{len(topics)}] {topic}: {time.perf_counter() - start:.1f} c")
+
+    try:
+        results = await asyncio.gather(*(one(topic) for topic in topics), return_exceptions=True)
+    finally:
+        if manifest is not None:
+            manifest.save()
+    failed = [(topic, e) for topic, e in zip(topics, results) if isinstance(e, Exception)]
+    for topic, e in failed:
+        print(f"Ошибка: {topic}: {e}", file=sys.stderr)
+    return len(failed)
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    with open(args.topics, "r", encoding="utf-8") as f:
+        topics = [line.strip() for line in f if line.strip()]
+    os.makedirs(args.json_dir, exist_ok=True)
+    if not args.no_docx:
+        os.makedirs(args.docx_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    failed = asyncio.run(_run_batch(topics, args))
+    elapsed = time.perf_counter() - start
+    print(f"Всего: {len(topics)}, ошибок: {failed}; {elapsed:.1f} c, {len(topics) / elapsed * 60:.1f} реф/мин")
+    return 1 if failed else 0
+
+
+def find_bench_dir(path: Optional[str] = None) -> Optional[str]:
+    """Каталог benchmarks: указанный, в текущем каталоге или рядом с исходниками пакета."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    for candidate in (path, "benchmarks", os.path.join(here, "..", "..", "benchmarks")):
+        if candidate and os.path.isdir(candidate):
+            return os.path.abspath(candidate)
+    return None
+
+
+def run_bench(args: argparse.Namespace) -> int:
+    bench_dir = find_bench_dir(args.bench_dir)
+    if bench_dir is None:
+        print("Каталог benchmarks не найден, укажите --bench-dir", file=sys.stderr)
+        return 2
+    names = sorted(
+        name[len(BENCH_PREFIX):-len(".py")] for name in os.listdir(bench_dir)
+        if name.startswith(BENCH_PREFIX) and name.endswith(".py")
+    )
+    if args.name is None:
+        print("\n".join(names))
+        return 0
+    if args.name not in names:
+        print(f"Нет бенчмарка {args.name}; доступны: {', '.join(names)}", file=sys.stderr)
+        return 2
+
+    path = os.path.join(bench_dir, f"{BENCH_PREFIX}{args.name}.py")
+    # Бенчмарки импортируют друг друга (from bench_docx_render import ...)
+    saved_argv, saved_path = sys.argv, list(sys.path)
+    sys.argv = [path] + args.bench_args
+    sys.path.insert(0, bench_dir)
+    try:
+        runpy.run_path(path, run_name="__main__")
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 0
+    finally:
+        sys.argv, sys.path[:] = saved_argv, saved_path
+    return 0
+
+
+COMMANDS = {
+    "generate": run_generate,
+    "batch": run_batch,
+    "export-docx": bulk_export.run_from_args,
+    "stub": stub_server.run_from_args,
+    "bench": run_bench,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    configure_logging(args.log_level, fmt=args.log_format, path=args.log_file)
+    output = args.profile_output
+    if args.profile and output is None:
+        output = default_output(args.profile, f"ai-referat-{args.command}")
+    with profiled(args.profile, output):
+        return COMMANDS[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
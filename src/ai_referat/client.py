@@ -1,24 +1,58 @@
 import asyncio
+import hashlib
+import logging
 import time
-from typing import Optional
+from typing import Callable, Optional
 
 import openai
 
+from ai_referat.concurrency import AIMDLimiter, get_limiter, is_overload, retry_after
+from ai_referat.config import REQUEST_TIMEOUT
+from ai_referat.events import RETRY_ERROR, RETRY_OVERLOAD, RETRY_REJECTED, RETRY_SHORT
+from ai_referat.log import get_logger, log
+from ai_referat.validators import ResponseRejected
+
+logger = get_logger(__name__)
+
+# Предел экспоненциальной паузы после перегрузки: delay * 2 ** OVERLOAD_BACKOFF_STEPS
+OVERLOAD_BACKOFF_STEPS = 4
+
 
 # ------------------ Базовый класс ------------------
 class AIClientBase:
-    def __init__(self, model: str = "gpt-4", api_key: Optional[str] = None, base_url: Optional[str] = None):
+    def __init__(self, model: str = "gpt-4", api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 timeout: float = REQUEST_TIMEOUT):
         self.model = model
         self.api_key = api_key
         self.base_url = base_url
+        self.timeout = timeout
         self.content = ""
         self.rules = ""
         self.history = [{"role": "user", "content": f"{self.content}\n{self.rules}"}]
+        self._client = None
 
+    def _client_kwargs(self) -> dict:
+        # base_url: можно указать OpenAI Enterprise / прокси / OpenRouter.
+        # Повторы SDK отключены: их делает цикл клиента, а ошибки нужны ограничителю
+        kwargs = {"max_retries": 0, "timeout": self.timeout}
         if self.api_key:
-            openai.api_key = self.api_key
+            kwargs["api_key"] = self.api_key
         if self.base_url:
-            openai.api_base = self.base_url  # можно указать OpenAI Enterprise / прокси / OpenRouter
+            kwargs["base_url"] = self.base_url
+        return kwargs
+
+    @property
+    def limiter_key(self) -> str:
+        """Ключ ограничителя: адрес API и отпечаток ключа (сам ключ не храним)."""
+        fingerprint = hashlib.sha256((self.api_key or "").encode("utf-8")).hexdigest()[:12]
+        return f"openai:{self.base_url or 'default'}:{fingerprint}"
+
+    @property
+    def limiter(self) -> AIMDLimiter:
+        return get_limiter(self.limiter_key)
+
+    def _log_fields(self, section: Optional[str], model: Optional[str] = None) -> dict:
+        return {"section": section, "provider": self.base_url or "openai", "model": model or self.model}
 
     # ---------------- Методы состояния ----------------
     def clear_content(self):
@@ -53,62 +87,136 @@ class AIClientBase:
         self.set_rules(rules)
         self.update_history()
 
+    def _request_kwargs(self, max_tokens: Optional[int], model: Optional[str] = None,
+                        provider: Optional[str] = None) -> dict:
+        kwargs = {"model": model or self.model, "messages": self.history}
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        if provider:
+            # Агрегаторы вроде OpenRouter: предпочтительный провайдер модели
+            kwargs["extra_body"] = {"provider": {"order": [provider]}}
+        return kwargs
+
 
 # ===================== СИНХРОННЫЙ КЛАСС =====================
 class AIClientSync(AIClientBase):
-    def __init__(self, model: str = "gpt-4", api_key: Optional[str] = None, base_url: Optional[str] = None):
-        super().__init__(model=model, api_key=api_key, base_url=base_url)
+    def __init__(self, model: str = "gpt-4", api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 timeout: float = REQUEST_TIMEOUT):
+        super().__init__(model=model, api_key=api_key, base_url=base_url, timeout=timeout)
+
+    @property
+    def client(self) -> openai.OpenAI:
+        # Создается при первом запросе: без ключа в окружении конструктор SDK падает
+        if self._client is None:
+            self._client = openai.OpenAI(**self._client_kwargs())
+        return self._client
 
     def get_response_sync(
         self, content: str, rules: str, min_length: int = 500,
-        max_retries: int = 5, delay: float = 2.0
+        max_retries: int = 5, delay: float = 2.0, max_tokens: Optional[int] = None,
+        validator: Optional[Callable[[str], str]] = None, section: Optional[str] = None,
+        model: Optional[str] = None, provider: Optional[str] = None
     ) -> str:
         self._prepare(content, rules)
+        request = self._request_kwargs(max_tokens, model, provider)
+        fields = self._log_fields(section, model)
         last_text = ""
 
         for attempt in range(max_retries):
+            wait = delay
+            start = time.perf_counter()
             try:
-                response = openai.ChatCompletion.create(
-                    model=self.model,
-                    messages=self.history
-                )
-                text = response.choices[0].message["content"]
+                response = self.client.chat.completions.create(**request)
+                text = response.choices[0].message.content or ""
+                # Проверки ответа: очищают текст или отклоняют его
+                if validator is not None:
+                    text = validator(text)
                 last_text = text
+                latency = round(time.perf_counter() - start, 3)
                 if len(text) >= min_length:
+                    log(logger, logging.INFO, "Ответ получен", attempt=attempt + 1, latency=latency, chars=len(text), **fields)
                     return text
+                log(logger, logging.WARNING, "Ответ короче минимума", attempt=attempt + 1, latency=latency,
+                    chars=len(text), min_length=min_length, **fields)
+            except ResponseRejected as e:
+                log(logger, logging.WARNING, "Ответ отклонен", attempt=attempt + 1, reason=str(e), **fields)
             except Exception as e:
-                print(f"Ошибка: {e}")
+                log(logger, logging.ERROR, "Ошибка запроса", attempt=attempt + 1, error=str(e),
+                    error_type=type(e).__name__, **fields)
+                # Сервер сам говорит, сколько ждать после 429
+                wait = max(wait, retry_after(e) or 0)
 
-            time.sleep(delay)
+            time.sleep(wait)
 
+        log(logger, logging.ERROR, "Попытки исчерпаны", attempts=max_retries, **fields)
         return "LIMIT: " + last_text
 
 
 # ===================== АСИНХРОННЫЙ КЛАСС =====================
 class AIClientAsync(AIClientBase):
-    def __init__(self, model: str = "gpt-4", api_key: Optional[str] = None, base_url: Optional[str] = None):
-        super().__init__(model=model, api_key=api_key, base_url=base_url)
+    def __init__(self, model: str = "gpt-4", api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 timeout: float = REQUEST_TIMEOUT):
+        super().__init__(model=model, api_key=api_key, base_url=base_url, timeout=timeout)
+
+    @property
+    def client(self) -> openai.AsyncOpenAI:
+        if self._client is None:
+            self._client = openai.AsyncOpenAI(**self._client_kwargs())
+        return self._client
 
     async def get_response_async(
         self, content: str, rules: str, min_length: int = 500,
-        max_retries: int = 5, delay: float = 2.0
+        max_retries: int = 5, delay: float = 2.0, max_tokens: Optional[int] = None,
+        validator: Optional[Callable[[str], str]] = None, section: Optional[str] = None,
+        model: Optional[str] = None, provider: Optional[str] = None,
+        on_retry: Optional[Callable[[int, str], None]] = None
     ) -> str:
+        """
+        :param on_retry: on_retry(номер попытки, причина) перед каждым повтором;
+                         причины — events.RETRY_SHORT, RETRY_REJECTED, ...
+        """
         self._prepare(content, rules)
+        # Запрос собирается до первого await: history общая для параллельных вызовов
+        request = self._request_kwargs(max_tokens, model, provider)
+        fields = self._log_fields(section, model)
         last_text = ""
 
         for attempt in range(max_retries):
+            wait = delay
+            start = time.perf_counter()
             try:
-                response = await openai.ChatCompletion.acreate(
-                    model=self.model,
-                    messages=self.history
-                )
-                text = response.choices[0].message["content"]
+                # Число одновременных запросов к ключу подстраивает AIMD ограничитель
+                async with self.limiter.slot():
+                    response = await self.client.chat.completions.create(**request)
+                text = response.choices[0].message.content or ""
+                # Проверки ответа: очищают текст или отклоняют его
+                if validator is not None:
+                    text = validator(text)
                 last_text = text
+                latency = round(time.perf_counter() - start, 3)
                 if len(text) >= min_length:
+                    log(logger, logging.INFO, "Ответ получен", attempt=attempt + 1, latency=latency, chars=len(text), **fields)
                     return text
+                reason = RETRY_SHORT
+                log(logger, logging.WARNING, "Ответ короче минимума", attempt=attempt + 1, latency=latency,
+                    chars=len(text), min_length=min_length, **fields)
+            except ResponseRejected as e:
+                reason = RETRY_REJECTED
+                log(logger, logging.WARNING, "Ответ отклонен", attempt=attempt + 1, reason=str(e), **fields)
             except Exception as e:
-                print(f"Ошибка: {e}")
-
-            await asyncio.sleep(delay)
-
+                reason = RETRY_OVERLOAD if is_overload(e) else RETRY_ERROR
+                if is_overload(e):
+                    # Лимит уже снижен ограничителем; паузу увеличиваем экспоненциально
+                    wait = max(delay * 2 ** min(attempt, OVERLOAD_BACKOFF_STEPS), retry_after(e) or 0)
+                    log(logger, logging.WARNING, "Провайдер перегружен", attempt=attempt + 1, error=str(e),
+                        backoff=wait, **fields)
+                else:
+                    log(logger, logging.ERROR, "Ошибка запроса", attempt=attempt + 1, error=str(e),
+                        error_type=type(e).__name__, **fields)
+
+            if on_retry is not None and attempt + 1 < max_retries:
+                on_retry(attempt + 1, reason)
+            await asyncio.sleep(wait)
+
+        log(logger, logging.ERROR, "Попытки исчерпаны", attempts=max_retries, **fields)
         return "LIMIT: " + last_text
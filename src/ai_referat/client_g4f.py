@@ -1,9 +1,18 @@
 # client_g4f.py
 import asyncio
+import logging
 import time
 
 from g4f import Provider
 from g4f.client import AsyncClient, Client
+from g4f.Provider.template import OpenaiTemplate
+
+from ai_referat.concurrency import get_limiter, is_overload
+from ai_referat.events import RETRY_ERROR, RETRY_OVERLOAD, RETRY_REJECTED, RETRY_SHORT
+from ai_referat.log import get_logger, log
+from ai_referat.validators import ResponseRejected
+
+logger = get_logger(__name__)
 
 
 class AIClientBase:
@@ -16,7 +25,10 @@ class AIClientBase:
         self.rules = ""
         self.history = [{"role": "user", "content": f"{self.content}\n{self.rules}"}]
 
-        if self.free:
+        if self.base_url:
+            # Свой OpenAI-совместимый адрес (прокси, локальная заглушка): один провайдер
+            self.providers = [OpenaiTemplate]
+        elif self.free:
             # Берём все доступные провайдеры автоматически
             self.providers = [
                 p for p in Provider.__dict__.values() if isinstance(p, type)
@@ -30,33 +42,60 @@ class AIClientBase:
         self.rules = rules
         self.history = [{"role": "user", "content": f"{self.content}\n{self.rules}"}]
 
+    def _request_kwargs(self, max_tokens, model=None):
+        kwargs = {"model": model or self.model, "messages": self.history, "web_search": False}
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        return kwargs
+
+    def _providers_for(self, provider=None):
+        """Провайдеры запроса: все или только заданный по имени класса g4f."""
+        if provider is None:
+            return self.providers
+        selected = [p for p in self.providers if p.__name__ == provider]
+        if not selected:
+            selected = [p for p in Provider.__dict__.values() if isinstance(p, type) and p.__name__ == provider]
+        if not selected:
+            raise ValueError(f"Неизвестный провайдер g4f: {provider}")
+        return selected
+
 # ===================== СИНХРОННЫЙ =====================
 class AIClientSync(AIClientBase):
     def __init__(self, model="gpt-4o-mini", api_key=None, base_url=None, free=True):
         super().__init__(model=model, api_key=api_key, base_url=base_url, free=free)
-        self.client = Client()
+        self.client = Client(api_key=api_key, base_url=base_url)
 
-    def get_response_sync(self, content, rules, min_length=500, max_retries=10, delay=2.0):
+    def get_response_sync(self, content, rules, min_length=500, max_retries=10, delay=2.0, max_tokens=None, validator=None, section=None,
+                          model=None, provider=None):
         self._prepare(content, rules)
+        providers = self._providers_for(provider)
         for attempt in range(max_retries):
-            for provider in self.providers:
+            for provider in providers:
                 self.client.provider = provider
+                fields = {"section": section, "provider": provider.__name__, "model": model or self.model, "attempt": attempt + 1}
+                start = time.perf_counter()
                 try:
                     response = self.client.chat.completions.create(
-                        model=self.model,
-                        messages=self.history,
-                        web_search=False
+                        **self._request_kwargs(max_tokens, model)
                     )
                     text = response.choices[0].message.content
+                    if validator is not None:
+                        text = validator(text)
                     # Если текст подходит, сразу возвращаем
                     if len(text) >= min_length:
+                        log(logger, logging.INFO, "Ответ получен", latency=round(time.perf_counter() - start, 3),
+                            chars=len(text), **fields)
                         return text
+                except ResponseRejected as e:
+                    log(logger, logging.WARNING, "Ответ отклонен", reason=str(e), **fields)
                 except Exception as e:
-                    if "Ratelimit" not in str(e):
-                        print(f"Ошибка у {provider.__name__}: {e}")
+                    # Ошибки отдельных бесплатных провайдеров — обычное дело, поэтому DEBUG
+                    log(logger, logging.DEBUG, "Провайдер перегружен" if is_overload(e) else "Ошибка провайдера",
+                        error=str(e), error_type=type(e).__name__, **fields)
             # Ждём перед следующей попыткой
             time.sleep(delay)
         # Если все попытки и провайдеры не дали результат
+        log(logger, logging.ERROR, "Попытки исчерпаны", section=section, attempts=max_retries, providers=len(providers))
         return "LIMIT: текст не получен или все провайдеры перегружены"
 
 
@@ -64,25 +103,40 @@ class AIClientSync(AIClientBase):
 class AIClientAsync(AIClientBase):
     def __init__(self, model="gpt-4o-mini", api_key=None, base_url=None, free=True):
         super().__init__(model=model, api_key=api_key, base_url=base_url, free=free)
-        self.client = AsyncClient()
+        self.client = AsyncClient(api_key=api_key, base_url=base_url)
 
-    async def get_response_async(self, content, rules, min_length=500, max_retries=10, delay=2.0):
+    async def get_response_async(self, content, rules, min_length=500, max_retries=10, delay=2.0, max_tokens=None, validator=None, section=None,
+                                 model=None, provider=None, on_retry=None):
+        """on_retry(номер попытки, причина) — перед каждым новым кругом по провайдерам."""
         self._prepare(content, rules)
+        # Запрос собирается до первого await: history и client общие для параллельных вызовов
+        request = self._request_kwargs(max_tokens, model)
+        providers = self._providers_for(provider)
         for attempt in range(max_retries):
-            for provider in self.providers:
-                self.client.provider = provider
+            reason = RETRY_SHORT
+            for provider in providers:
+                fields = {"section": section, "provider": provider.__name__, "model": model or self.model, "attempt": attempt + 1}
+                start = time.perf_counter()
                 try:
-                    response = await self.client.chat.completions.create(
-                        model=self.model,
-                        messages=self.history,
-                        web_search=False
-                    )
+                    # У каждого провайдера свой AIMD ограничитель: Ratelimit снижает его лимит
+                    async with get_limiter(f"g4f:{provider.__name__}").slot():
+                        response = await self.client.chat.completions.create(provider=provider, **request)
                     text = response.choices[0].message.content
+                    if validator is not None:
+                        text = validator(text)
                     if len(text) >= min_length:
+                        log(logger, logging.INFO, "Ответ получен", latency=round(time.perf_counter() - start, 3),
+                            chars=len(text), **fields)
                         return text  # сразу возвращаем текст
+                except ResponseRejected as e:
+                    reason = RETRY_REJECTED
+                    log(logger, logging.WARNING, "Ответ отклонен", reason=str(e), **fields)
                 except Exception as e:
-                    if "Ratelimit" not in str(e):
-                        print(f"Ошибка у {provider.__name__}: {e}")
+                    reason = RETRY_OVERLOAD if is_overload(e) else RETRY_ERROR
+                    log(logger, logging.DEBUG, "Провайдер перегружен" if is_overload(e) else "Ошибка провайдера",
+                        error=str(e), error_type=type(e).__name__, **fields)
+            if on_retry is not None and attempt + 1 < max_retries:
+                on_retry(attempt + 1, reason)
             await asyncio.sleep(delay)
+        log(logger, logging.ERROR, "Попытки исчерпаны", section=section, attempts=max_retries, providers=len(providers))
         return "LIMIT: текст не получен или все провайдеры перегружены"
-
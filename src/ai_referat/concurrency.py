@@ -0,0 +1,165 @@
+"""
+Адаптивное ограничение числа одновременных запросов (AIMD).
+
+Как управление окном в TCP: пока запросы проходят, лимит растет
+аддитивно (примерно +1 за каждые limit успешных ответов), а на сигнал
+перегрузки — rate limit или таймаут — лимит умножается на decrease.
+Перегрузки от запросов, начатых до последнего снижения, повторно лимит
+не режут: иначе одна волна отказов обрушила бы его до минимума.
+
+Для каждого провайдера или API ключа свой ограничитель (get_limiter),
+общий для всех клиентов процесса.
+
+Пример:
+    limiter = get_limiter("openai:https://api.openai.com/v1")
+    async with limiter.slot():
+        response = await client.chat.completions.create(...)
+"""
+import asyncio
+from collections import deque
+from typing import Deque, Dict, NamedTuple, Optional
+
+from ai_referat.config import INITIAL_CONCURRENCY, MAX_CONCURRENCY
+
+# Признаки перегрузки в тексте ошибки (g4f и прокси не всегда дают тип)
+OVERLOAD_MARKERS = ("ratelimit", "rate limit", "rate_limit", "too many requests", "429", "overloaded", "timeout",
+                    "timed out")
+OVERLOAD_TYPES = ("RateLimitError", "APITimeoutError", "TimeoutError", "TimeoutException", "ReadTimeout")
+
+
+def is_overload(exc: BaseException) -> bool:
+    """Ошибка говорит о перегрузке провайдера (rate limit, таймаут)."""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+        return True
+    if any(cls.__name__ in OVERLOAD_TYPES for cls in type(exc).__mro__):
+        return True
+    message = str(exc).casefold()
+    return any(marker in message for marker in OVERLOAD_MARKERS)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Пауза из заголовков Retry-After / retry-after-ms ответа 429 (ошибки openai SDK)."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        # Retry-After в виде HTTP даты не разбираем: хватит своей паузы
+        return None
+    return None
+
+
+# --- Состояние ограничителя ---
+class LimiterStats(NamedTuple):
+    limit: float
+    in_flight: int
+    waiting: int
+    successes: int
+    overloads: int
+
+
+class AIMDLimiter:
+    def __init__(
+        self,
+        initial: int = INITIAL_CONCURRENCY,
+        min_limit: int = 1,
+        max_limit: int = MAX_CONCURRENCY,
+        increase: float = 1.0,
+        decrease: float = 0.5
+    ):
+        """
+        :param increase: прирост лимита за «окно» из limit успешных запросов
+        :param decrease: множитель лимита при перегрузке
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.limit = float(min(max(initial, min_limit), max_limit))
+
+        self.in_flight = 0
+        self.successes = 0
+        self.overloads = 0
+        self._epoch = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    # ---------------- Окно ----------------
+    def _capacity(self) -> int:
+        return max(int(self.limit), self.min_limit)
+
+    def _wake(self) -> None:
+        free = self._capacity() - self.in_flight
+        while self._waiters and free > 0:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def acquire(self) -> int:
+        """Ждет свободного места; возвращает эпоху (номер последнего снижения)."""
+        while self.in_flight >= self._capacity():
+            # Futures вместо asyncio.Condition: ограничитель переживает смену event loop
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()  # передаем место следующему
+                raise
+        self.in_flight += 1
+        return self._epoch
+
+    def release(self, epoch: int, exc: Optional[BaseException] = None) -> None:
+        """Освобождает место и подстраивает лимит по исходу запроса."""
+        self.in_flight -= 1
+        if exc is None:
+            self.successes += 1
+            self.limit = min(self.limit + self.increase / self.limit, float(self.max_limit))
+        elif is_overload(exc):
+            self.overloads += 1
+            if epoch == self._epoch:
+                self._epoch += 1
+                self.limit = max(self.limit * self.decrease, float(self.min_limit))
+        self._wake()
+
+    def slot(self) -> "_Slot":
+        """async with limiter.slot(): ... — место на время одного запроса."""
+        return _Slot(self)
+
+    def stats(self) -> LimiterStats:
+        return LimiterStats(self.limit, self.in_flight, len(self._waiters), self.successes, self.overloads)
+
+
+class _Slot:
+    def __init__(self, limiter: AIMDLimiter):
+        self.limiter = limiter
+        self.epoch = 0
+
+    async def __aenter__(self) -> "_Slot":
+        self.epoch = await self.limiter.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        self.limiter.release(self.epoch, exc)
+        return False
+
+
+_limiters: Dict[str, AIMDLimiter] = {}
+
+
+def get_limiter(key: str) -> AIMDLimiter:
+    """Общий ограничитель для провайдера или API ключа."""
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = _limiters[key] = AIMDLimiter()
+    return limiter
+
+
+def limiter_stats() -> Dict[str, LimiterStats]:
+    """Состояние всех ограничителей процесса."""
+    return {key: limiter.stats() for key, limiter in _limiters.items()}
@@ -13,13 +13,28 @@ MAX_PAGES = int(os.getenv("MAX_PAGES", 5))
 MAX_CHAPTERS = int(os.getenv("MAX_CHAPTERS", 3))
 MAX_SUBCHAPTERS = int(os.getenv("MAX_SUBCHAPTERS", 2))
 MAX_CHARS_PER_PAGE = int(os.getenv("MAX_CHARS_PER_PAGE", 1800))
-MIN_LENGTH = int(os.getenv("MIN_LENGTH", 500))
+MIN_LENGTH = int(os.getenv("MIN_LENGTH", 500))  # устарело: min_length теперь считает TokenBudget
+# Предел max_tokens одного ответа модели
+MAX_OUTPUT_TOKENS = int(os.getenv("MAX_OUTPUT_TOKENS", 16384))
+# Порог сходства тем (0..1), начиная с которого план берется из похожей темы
+TOPIC_SIMILARITY = float(os.getenv("TOPIC_SIMILARITY", 0.65))
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", 10))
+# Страниц на часть длинной главы: глава больше — пишется частями одновременно (0 — не делить)
+CHUNK_PAGES = float(os.getenv("CHUNK_PAGES", 0))
+# Одновременные запросы к одному провайдеру/ключу: начальный и предельный лимит AIMD
+INITIAL_CONCURRENCY = int(os.getenv("INITIAL_CONCURRENCY", 4))
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", 32))
+# Таймаут одного HTTP запроса к модели, сек (зависший запрос считается перегрузкой)
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", 600))
 
 
 # === Шрифты для DOCX ===
 FONT = os.getenv("FONT", "Times New Roman")
 FONT_SIZE = int(os.getenv("FONT_SIZE", 14))
+# Путь к своему .docx шаблону титульного листа (пусто — встроенный шаблон)
+DOCX_TEMPLATE = os.getenv("DOCX_TEMPLATE") or None
+# TrueType шрифт с кириллицей для PDF (пусто — поиск в системных каталогах)
+PDF_FONT_PATH = os.getenv("PDF_FONT_PATH") or None
 
 # === API ключи для AIClient ===
 AI_API_KEY = os.getenv("AI_API_KEY", "")
@@ -0,0 +1,156 @@
+"""
+Нейтральное дерево документа реферата.
+
+Модель Essay (или ее словарь) один раз превращается в EssayDocument:
+титульный лист, план, разделы с уже разобранными Markdown блоками и
+список литературы. Экспортеры DOCX, HTML, Markdown и PDF работают с
+этим деревом и не разбирают текст заново.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Union
+
+from ai_referat.json_writer import load_json_dict
+from ai_referat.markdown_parser import Block, clean_text, parse_markdown
+from ai_referat.models import Essay, EssayMetadata
+
+# --- Титульный лист ---
+TITLE_PAGE_HEADER = [
+    "МИНИСТЕРСТВО ОБРАЗОВАНИЯ И НАУКИ КР",
+    "Государственное учреждение высшего профессионального образования",
+    "\n\n\n_________________________________________________",
+]
+TITLE_PAGE_MARK = "СРС"
+
+# Строки с полями EssayMetadata и их выравнивание
+TITLE_PAGE_FIELDS = [
+    ("Дисциплина: {discipline}", "center"),
+    ("Кафедра: {department}", "center"),
+    ("Тема: {topic_name}", "center"),
+    ("Выполнил: {author}", "right"),
+    ("Группа: {group}", "right"),
+    ("Проверил: {checked_by}", "right"),
+    ("{city}, {year}", "center"),
+]
+
+PLAN_TITLE = "План"
+INTRODUCTION_TITLE = "Введение"
+CONCLUSION_TITLE = "Заключение"
+REFERENCES_TITLE = "Литература"
+
+
+# --- Строка титульного листа ---
+class TitleLine(NamedTuple):
+    text: str
+    align: str = "center"
+
+
+# --- Пункт плана ---
+class PlanEntry(NamedTuple):
+    title: str
+    subchapters: List[str]
+
+
+# --- Раздел документа ---
+class Section(NamedTuple):
+    title: str
+    level: int  # 1 — введение/заключение, 2 — глава, 3 — подглава
+    blocks: List[Block]
+    subsections: Sequence["Section"] = ()
+    page_break: bool = True  # раздел начинается с новой страницы
+
+    @property
+    def centered(self) -> bool:
+        return self.level == 1
+
+
+# --- Документ целиком ---
+class EssayDocument(NamedTuple):
+    topic: str
+    metadata: Dict[str, str]
+    plan: List[PlanEntry]
+    sections: List[Section]
+    references: List[Block]
+
+    @property
+    def title_page(self) -> List[TitleLine]:
+        """Строки полей титульного листа, заполненные метаданными."""
+        return [TitleLine(template.format(**self.metadata), align) for template, align in TITLE_PAGE_FIELDS]
+
+
+def load_essay_data(
+    json_data: Optional[Union[Dict[str, Any], Essay]] = None,
+    json_path: Optional[str] = None
+) -> Dict[str, Any]:
+    """Словарь реферата из модели, словаря или JSON файла."""
+    if json_data is None:
+        if json_path is None:
+            raise ValueError("Нужно передать либо json_data, либо json_path")
+        json_data = load_json_dict(json_path)
+
+    # Если передана Pydantic модель, преобразуем в dict
+    if isinstance(json_data, Essay):
+        return json_data.model_dump()
+    return json_data
+
+
+def _metadata_fields(metadata: Optional[Union[Dict[str, Any], EssayMetadata]]) -> Dict[str, str]:
+    if isinstance(metadata, EssayMetadata):
+        metadata = metadata.model_dump()
+    # Незаполненные поля получают значения по умолчанию из EssayMetadata
+    fields = EssayMetadata().model_dump()
+    fields.update(metadata or {})
+    return {key: clean_text(str(value)) for key, value in fields.items()}
+
+
+def build_document(
+    json_data: Optional[Union[Dict[str, Any], Essay, EssayDocument]] = None,
+    json_path: Optional[str] = None,
+    metadata: Optional[Union[Dict[str, Any], EssayMetadata]] = None
+) -> EssayDocument:
+    """
+    Строит дерево документа. Готовое EssayDocument возвращается как есть.
+
+    Из текста, заголовков и метаданных удаляются недопустимые в XML символы,
+    поэтому все экспортеры получают одинаковый, пригодный для DOCX текст.
+
+    :param metadata: метаданные титульного листа; по умолчанию — из реферата
+    """
+    if isinstance(json_data, EssayDocument):
+        if metadata is None:
+            return json_data
+        return json_data._replace(metadata=_metadata_fields(metadata))
+
+    data = load_essay_data(json_data, json_path)
+
+    plan = [
+        PlanEntry(
+            title=clean_text(chapter.get("title", "")),
+            subchapters=[clean_text(title) for title in chapter.get("subchapters", [])]
+        )
+        for chapter in data.get("plan", {}).get("chapters", [])
+    ]
+
+    sections = [
+        Section(INTRODUCTION_TITLE, 1, parse_markdown(data.get("introduction", {}).get("text", "")))
+    ]
+    for chapter in data.get("chapters", []):
+        subsections = []
+        for sub in chapter.get("subchapters", []):
+            sub_title: str = clean_text(sub.get("title", "") if isinstance(sub, dict) else str(sub))
+            sub_text: str = sub.get("text", "") if isinstance(sub, dict) else ""
+            subsections.append(Section(sub_title, 3, parse_markdown(sub_text), page_break=False))
+        sections.append(Section(
+            clean_text(chapter.get("title", "")), 2, parse_markdown(chapter.get("text", "")), subsections
+        ))
+    sections.append(
+        Section(CONCLUSION_TITLE, 1, parse_markdown(data.get("conclusion", {}).get("text", "")))
+    )
+
+    references = parse_markdown("\n".join(data.get("references", {}).get("items", [])))
+
+    return EssayDocument(
+        topic=clean_text(data.get("topic", "Тема")),
+        metadata=_metadata_fields(metadata if metadata is not None else data.get("metadata")),
+        plan=plan,
+        sections=sections,
+        references=references,
+    )
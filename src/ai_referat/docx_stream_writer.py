@@ -0,0 +1,250 @@
+"""
+Потоковая запись DOCX без объектной модели python-docx.
+
+Части OOXML пишутся прямо в zip-контейнер: document.xml формируется
+абзац за абзацем и сразу сжимается, поэтому расход памяти не зависит
+от объема реферата. Разметка повторяет результат render_docx со
+встроенным шаблоном (те же стили, титульный лист, разрывы страниц).
+"""
+import logging
+import zipfile
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+from xml.sax.saxutils import escape
+
+from ai_referat.document_tree import (PLAN_TITLE, REFERENCES_TITLE,
+                                     TITLE_PAGE_HEADER, TITLE_PAGE_MARK,
+                                     EssayDocument, Section, build_document)
+from ai_referat.log import get_logger, log
+from ai_referat.markdown_parser import BULLET, HEADING, NUMBERED, Block
+from ai_referat.models import Essay, EssayMetadata
+
+logger = get_logger(__name__)
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+CONTENT_TYPES_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+<Override PartName="/word/numbering.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.numbering+xml"/>
+</Types>"""
+
+ROOT_RELS_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+DOCUMENT_RELS_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/numbering" Target="numbering.xml"/>
+</Relationships>"""
+
+NUMBERING_XML = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:numbering xmlns:w="{W_NS}">
+<w:abstractNum w:abstractNumId="0">
+<w:multiLevelType w:val="singleLevel"/>
+<w:lvl w:ilvl="0"><w:start w:val="1"/><w:numFmt w:val="bullet"/><w:lvlText w:val="•"/><w:lvlJc w:val="left"/>
+<w:pPr><w:ind w:left="360" w:hanging="360"/></w:pPr>
+<w:rPr><w:rFonts w:ascii="Symbol" w:hAnsi="Symbol" w:hint="default"/></w:rPr></w:lvl>
+</w:abstractNum>
+<w:num w:numId="1"><w:abstractNumId w:val="0"/></w:num>
+</w:numbering>"""
+
+# Параметры страницы как у шаблона python-docx по умолчанию
+SECTION_XML = (
+    '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1440" w:right="1800" w:bottom="1440" w:left="1800" '
+    'w:header="720" w:footer="720" w:gutter="0"/>'
+    '<w:cols w:space="720"/></w:sectPr>'
+)
+
+PAGE_BREAK_XML = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+TITLE_PAGE_MARK_SIZE = 100
+
+# Стили для блоков Markdown — как MARKDOWN_STYLES в docx_writer
+MARKDOWN_STYLES = {
+    HEADING: "Heading3",
+    BULLET: "ListBullet",
+    NUMBERED: "ListContinue",
+}
+
+# Стили заголовков разделов по уровню
+SECTION_STYLES = {1: "Heading1", 2: "Heading2", 3: "Heading3"}
+
+SPAN_PROPS = {
+    (False, False): "",
+    (True, False): "<w:rPr><w:b/></w:rPr>",
+    (False, True): "<w:rPr><w:i/></w:rPr>",
+    (True, True): "<w:rPr><w:b/><w:i/></w:rPr>",
+}
+
+
+def _styles_xml(content_font: str, content_size: int) -> str:
+    """Стили документа: те же имена и параметры, что задает apply_document_styles."""
+    font = escape(content_font, {'"': "&quot;"})
+    body_sz = content_size * 2
+    heading_sz = max(content_size + 3, 17) * 2
+
+    def r_pr(size: int, bold: bool = False) -> str:
+        b = "<w:b/><w:bCs/>" if bold else ""
+        return (
+            f'<w:rPr><w:rFonts w:ascii="{font}" w:hAnsi="{font}" w:eastAsia="{font}" w:cs="{font}"/>'
+            f'{b}<w:color w:val="000000"/><w:sz w:val="{size}"/><w:szCs w:val="{size}"/></w:rPr>'
+        )
+
+    def heading(style_id: str, name: str, level: int, before: int) -> str:
+        return (
+            f'<w:style w:type="paragraph" w:styleId="{style_id}"><w:name w:val="{name}"/>'
+            '<w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+            f'<w:pPr><w:keepNext/><w:keepLines/><w:spacing w:before="{before}" w:after="0"/>'
+            f'<w:outlineLvl w:val="{level}"/></w:pPr>{r_pr(heading_sz, bold=True)}</w:style>'
+        )
+
+    return (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<w:styles xmlns:w="{W_NS}">'
+        '<w:docDefaults><w:rPrDefault><w:rPr><w:sz w:val="22"/><w:szCs w:val="22"/>'
+        '<w:lang w:val="en-US" w:eastAsia="en-US" w:bidi="ar-SA"/></w:rPr></w:rPrDefault>'
+        '<w:pPrDefault><w:pPr><w:spacing w:after="200" w:line="276" w:lineRule="auto"/></w:pPr>'
+        '</w:pPrDefault></w:docDefaults>'
+        '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:qFormat/>'
+        f'{r_pr(body_sz)}</w:style>'
+        '<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/>'
+        '<w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+        '<w:pPr><w:pBdr><w:bottom w:val="single" w:sz="8" w:space="4" w:color="4F81BD"/></w:pBdr>'
+        '<w:spacing w:after="300" w:line="240" w:lineRule="auto"/><w:contextualSpacing/></w:pPr>'
+        f'{r_pr(heading_sz)}</w:style>'
+        + heading("Heading1", "heading 1", 0, 480)
+        + heading("Heading2", "heading 2", 1, 200)
+        + heading("Heading3", "heading 3", 2, 200)
+        + '<w:style w:type="paragraph" w:styleId="ListBullet"><w:name w:val="List Bullet"/>'
+        '<w:basedOn w:val="Normal"/><w:pPr><w:numPr><w:numId w:val="1"/></w:numPr>'
+        f'<w:contextualSpacing/></w:pPr>{r_pr(body_sz)}</w:style>'
+        '<w:style w:type="paragraph" w:styleId="ListContinue"><w:name w:val="List Continue"/>'
+        '<w:basedOn w:val="Normal"/><w:pPr><w:spacing w:after="120"/><w:ind w:left="360"/>'
+        f'<w:contextualSpacing/></w:pPr>{r_pr(body_sz)}</w:style>'
+        '</w:styles>'
+    )
+
+
+def _run(text: str, run_props: str = "") -> str:
+    """Run с текстом; переносы строк и табуляции — как в python-docx."""
+    parts = []
+    for i, line in enumerate(text.split("\n")):
+        if i:
+            parts.append("<w:br/>")
+        for j, chunk in enumerate(line.split("\t")):
+            if j:
+                parts.append("<w:tab/>")
+            if chunk:
+                parts.append(f'<w:t xml:space="preserve">{escape(chunk)}</w:t>')
+    return f"<w:r>{run_props}{''.join(parts)}</w:r>"
+
+
+def _paragraph(text: str = "", style: Optional[str] = None, align: Optional[str] = None, run_props: str = "") -> str:
+    p_pr = ""
+    if style or align:
+        style_xml = f'<w:pStyle w:val="{style}"/>' if style else ""
+        align_xml = f'<w:jc w:val="{align}"/>' if align else ""
+        p_pr = f"<w:pPr>{style_xml}{align_xml}</w:pPr>"
+    run = _run(text, run_props) if text else ""
+    return f"<w:p>{p_pr}{run}</w:p>"
+
+
+def _blocks(blocks: Iterable[Block]) -> Iterator[str]:
+    """Абзацы для Markdown блоков раздела: по одному на блок."""
+    for block in blocks:
+        style = MARKDOWN_STYLES.get(block.kind)
+        p_pr = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+        runs = [_run(f"{block.number}. ")] if block.number is not None else []
+        runs.extend(_run(span.text, SPAN_PROPS[span.bold, span.italic]) for span in block.spans)
+        yield f"<w:p>{p_pr}{''.join(runs)}</w:p>"
+
+
+def _section(section: Section) -> Iterator[str]:
+    if section.page_break:
+        yield PAGE_BREAK_XML
+    yield _paragraph(
+        section.title,
+        style=SECTION_STYLES[section.level],
+        align="center" if section.centered else None
+    )
+    yield from _blocks(section.blocks)
+    for subsection in section.subsections:
+        yield from _section(subsection)
+
+
+def _iter_document_xml(tree: EssayDocument) -> Iterator[str]:
+    """Генерирует document.xml по частям, по одному абзацу за раз."""
+    yield (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<w:document xmlns:w="{W_NS}" xmlns:r="{R_NS}"><w:body>'
+    )
+
+    # --- Шапка ---
+    for line in TITLE_PAGE_HEADER:
+        yield _paragraph(line, align="center")
+    mark_sz = TITLE_PAGE_MARK_SIZE * 2
+    yield _paragraph(
+        TITLE_PAGE_MARK, align="center",
+        run_props=f'<w:rPr><w:b/><w:sz w:val="{mark_sz}"/><w:szCs w:val="{mark_sz}"/></w:rPr>'
+    )
+
+    # --- Метаданные ---
+    for line in tree.title_page:
+        yield _paragraph(line.text, align=line.align)
+
+    yield PAGE_BREAK_XML
+
+    # --- Заголовок темы и план ---
+    yield _paragraph(tree.topic, style="Title", align="center")
+    yield _paragraph(PLAN_TITLE, style="Heading1", align="center")
+    for entry in tree.plan:
+        yield _paragraph(entry.title, style="Heading2")
+        for sub in entry.subchapters:
+            yield _paragraph(sub, style="ListBullet")
+
+    # --- Введение, главы, заключение ---
+    for section in tree.sections:
+        yield from _section(section)
+
+    # --- Литература ---
+    yield PAGE_BREAK_XML
+    yield _paragraph(REFERENCES_TITLE, style="Heading1", align="center")
+    yield from _blocks(tree.references)
+
+    yield f"{SECTION_XML}</w:body></w:document>"
+
+
+def stream_docx(
+    docx_path: str,
+    json_data: Optional[Union[Dict[str, Any], Essay, EssayDocument]] = None,
+    json_path: Optional[str] = None,
+    metadata: Optional[Union[Dict[str, Any], EssayMetadata]] = None,
+    content_font: str = "Aptos",
+    content_size: int = 14
+) -> None:
+    """
+    Создает DOCX файл потоково, минуя python-docx.
+
+    Визуально результат совпадает с render_docx со встроенным шаблоном.
+    Свои .docx шаблоны этот путь не поддерживает.
+    """
+    tree = build_document(json_data, json_path, metadata)
+
+    with zipfile.ZipFile(docx_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", CONTENT_TYPES_XML)
+        zf.writestr("_rels/.rels", ROOT_RELS_XML)
+        zf.writestr("word/_rels/document.xml.rels", DOCUMENT_RELS_XML)
+        zf.writestr("word/styles.xml", _styles_xml(content_font, content_size))
+        zf.writestr("word/numbering.xml", NUMBERING_XML)
+
+        with zf.open("word/document.xml", "w", force_zip64=True) as part:
+            for chunk in _iter_document_xml(tree):
+                part.write(chunk.encode("utf-8"))
+
+    log(logger, logging.INFO, "Документ создан", path=docx_path)
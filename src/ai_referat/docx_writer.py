@@ -1,347 +1,453 @@
-import json
+import io
+import itertools
+import logging
 import re
-from typing import Any, Dict, Optional, Union
+import threading
+from copy import deepcopy
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
 
 from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_BREAK
+from docx.oxml.ns import qn
 from docx.shared import Pt, RGBColor
 
-from ai_referat.models import Essay
+from ai_referat.config import FONT as CFG_FONT
+from ai_referat.config import FONT_SIZE as CFG_FONT_SIZE
+from ai_referat.document_tree import (PLAN_TITLE, REFERENCES_TITLE,
+                                     TITLE_PAGE_FIELDS, TITLE_PAGE_HEADER,
+                                     TITLE_PAGE_MARK, EssayDocument, Section,
+                                     build_document)
+from ai_referat.log import get_logger, log
+from ai_referat.markdown_parser import (BULLET, HEADING, NUMBERED, Block,
+                                       iter_blocks, strip_markdown)
+from ai_referat.models import Essay, EssayMetadata
+
+logger = get_logger(__name__)
 
 
 def apply_markdown_formatting(text: str) -> str:
-    """Простейшее применение Markdown стилей к тексту (жирный, заголовки)."""
-    text = re.sub(r"\*\*(.*?)\*\*", r"**\1**", text)
-    text = re.sub(r"### (.*?)\n", r"### \1\n", text)
-    text = re.sub(r"## (.*?)\n", r"## \1\n", text)
-    text = re.sub(r"# (.*?)\n", r"# \1\n", text)
-    return text
+    """
+    Убирает Markdown разметку из текста.
 
-def create_docx_file(
-    docx_path: str,
-    json_data: Optional[Union[Dict[str, Any], Essay]] = None,
-    json_path: Optional[str] = None,
-    discipline: str = "_______________",
-    department: str = "________________________",
-    topic_name: str = "____________________________________________",
-    author: str = "______________________",
-    group: str = "_____________________________",
-    checked_by: str = "_________________________",
-    year: str = "2024",
-    city: str = "Бишкек",
-    content_font: str = "Aptos",
-    content_size: int = 14
-) -> None:
+    Само форматирование (жирный, курсив, заголовки, списки) теперь
+    выполняет рендерер через add_markdown.
     """
-    Создает DOCX файл на основе данных из модели Essay или словаря.
+    return strip_markdown(text)
+
+
+# Стили, которые использует рендерер: обычный текст и заголовки
+BODY_STYLES = ("Normal", "List Bullet", "List Continue")
+HEADING_STYLES = ("Title", "Heading 1", "Heading 2", "Heading 3")
+
+ALIGNMENTS = {
+    "center": WD_ALIGN_PARAGRAPH.CENTER,
+    "right": WD_ALIGN_PARAGRAPH.RIGHT,
+    "left": WD_ALIGN_PARAGRAPH.LEFT,
+}
+
+# Стили заголовков разделов по уровню
+SECTION_STYLES = {1: "Heading 1", 2: "Heading 2", 3: "Heading 3"}
+
+BLACK = RGBColor(0, 0, 0)
+TITLE_PAGE_MARK_SIZE = Pt(100)
+
+# Стили для блоков Markdown внутри разделов
+MARKDOWN_STYLES = {
+    HEADING: "Heading 3",
+    BULLET: "List Bullet",
+    NUMBERED: "List Continue",
+}
+
+# Поля титульного листа: {discipline}, {author} и т.д. из EssayMetadata
+PLACEHOLDER_PATTERN = re.compile(r"\{(" + "|".join(EssayMetadata.model_fields) + r")\}")
+
+
+def _set_style_font(style, name: Optional[str], size: Optional[Pt]) -> None:
+    """Задает шрифт, размер и цвет стиля (без тематических шрифтов Word); None — не менять."""
+    font = style.font
+    if size is not None:
+        font.size = size
+    font.color.rgb = BLACK
+    if name is None:
+        return
+    font.name = name
+    # Тематические атрибуты (asciiTheme и т.п.) имеют приоритет над w:ascii,
+    # поэтому их нужно убрать, иначе Word проигнорирует заданный шрифт.
+    r_fonts = style.element.rPr.rFonts
+    for attr in ("w:asciiTheme", "w:hAnsiTheme", "w:eastAsiaTheme", "w:cstheme"):
+        r_fonts.attrib.pop(qn(attr), None)
+    r_fonts.set(qn("w:eastAsia"), name)
+    r_fonts.set(qn("w:cs"), name)
+
+
+def ensure_styles(doc) -> None:
     """
-    if json_data is None:
-        if json_path is None:
-            raise ValueError("Нужно передать либо json_data, либо json_path")
-        with open(json_path, "r", encoding="utf-8") as f:
-            json_data = json.load(f)
-
-    # Если передана Pydantic модель, преобразуем в dict
-    if hasattr(json_data, "dict"):
-        data: Dict[str, Any] = json_data.dict()
-    else:
-        data = json_data  # type: ignore
+    Создает стили рендерера, которых нет в своем шаблоне (на основе Normal).
 
+    Шаблон, сохраненный не из Word по умолчанию, может не содержать
+    «List Continue» или «Heading 3»; без них doc.styles[name] бросает KeyError.
+    """
+    styles = doc.styles
+    base = styles["Normal"] if "Normal" in styles else None
+    names = BODY_STYLES + HEADING_STYLES + tuple(SECTION_STYLES.values()) + tuple(MARKDOWN_STYLES.values())
+    for name in dict.fromkeys(names):
+        if name in styles:
+            continue
+        style = styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+        style.base_style = base
+        if name in HEADING_STYLES:
+            style.font.bold = True
+
+
+def apply_document_styles(doc, content_font: Optional[str] = "Aptos", content_size: Optional[int] = 14) -> None:
+    """
+    Один раз настраивает именованные стили документа.
+
+    Обычный текст получает размер content_size, заголовки — не меньше 17pt.
+    Весь текст черный. После этого обходить абзацы и runs уже не нужно.
+    None оставляет шрифт (или размер) стилей как есть.
+    """
+    body_size = Pt(content_size) if content_size is not None else None
+    heading_size = Pt(max(content_size + 3, 17)) if content_size is not None else None
+
+    for name in BODY_STYLES:
+        _set_style_font(doc.styles[name], content_font, body_size)
+    for name in HEADING_STYLES:
+        _set_style_font(doc.styles[name], content_font, heading_size)
+
+
+# -------------------------------------------------------
+# Шаблон документа
+# -------------------------------------------------------
+def build_default_template(content_font: str = "Aptos", content_size: int = 14) -> Any:
+    """
+    Строит встроенный шаблон: настроенные стили и титульный лист
+    с полями-заполнителями вида {author}, которые заменяются на EssayMetadata.
+    """
     doc = Document()
+    apply_document_styles(doc, content_font=content_font, content_size=content_size)
 
     # --- Шапка ---
-    for line in [
-        "МИНИСТЕРСТВО ОБРАЗОВАНИЯ И НАУКИ КР",
-        "Государственное учреждение высшего профессионального образования",
-        "\n\n\n_________________________________________________",
-        "СРС"
-    ]:
+    for line in TITLE_PAGE_HEADER:
         p = doc.add_paragraph(line)
         p.alignment = WD_ALIGN_PARAGRAPH.CENTER
 
-    last_paragraph = doc.paragraphs[-1]
-    if last_paragraph.runs:
-        run = last_paragraph.runs[0]
-        run.font.size = Pt(100)
-        run.font.bold = True
-
-    # Метаданные
-    for text, alignment in [
-        (f"Дисциплина: {discipline}", WD_ALIGN_PARAGRAPH.CENTER),
-        (f"Кафедра: {department}", WD_ALIGN_PARAGRAPH.CENTER),
-        (f"Тема: {topic_name}", WD_ALIGN_PARAGRAPH.CENTER),
-        (f"Выполнил: {author}", WD_ALIGN_PARAGRAPH.RIGHT),
-        (f"Группа: {group}", WD_ALIGN_PARAGRAPH.RIGHT),
-        (f"Проверил: {checked_by}", WD_ALIGN_PARAGRAPH.RIGHT),
-        (f"{city}, {year}", WD_ALIGN_PARAGRAPH.CENTER)
-    ]:
-        p = doc.add_paragraph(text)
-        p.alignment = alignment
+    mark_paragraph = doc.add_paragraph()
+    mark_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    mark = mark_paragraph.add_run(TITLE_PAGE_MARK)
+    mark.font.size = TITLE_PAGE_MARK_SIZE
+    mark.font.bold = True
 
-    doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
-
-    # --- Заголовок темы ---
-    title = doc.add_heading(data.get("topic", "Тема"), 0)
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+    # --- Метаданные ---
+    for text, align in TITLE_PAGE_FIELDS:
+        p = doc.add_paragraph(text)
+        p.alignment = ALIGNMENTS[align]
 
-    # --- План ---
-    plan_heading = doc.add_heading("План", level=1)
-    plan_heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    for chapter in data.get("plan", {}).get("chapters", []):
-        chap_paragraph = doc.add_paragraph(chapter.get("title", ""), style="Heading 2")
-        chap_paragraph.style.font.size = Pt(content_size)
-        chap_paragraph.style.font.name = content_font
-        for sub in chapter.get("subchapters", []):
-            doc.add_paragraph(sub, style="List Bullet")
-            
     doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+    return doc
 
-    # --- Введение ---
-    intro_heading = doc.add_heading("Введение", level=1)
-    intro_heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    intro_text: str = data.get("introduction", {}).get("text", "")
-    intro_paragraph = doc.add_paragraph(apply_markdown_formatting(intro_text))
-    for run in intro_paragraph.runs:
-        run.font.size = Pt(content_size)
-        run.font.name = content_font
-
-    # --- Главы ---
-    for chapter in data.get("chapters", []):
-        chap_title: str = chapter.get("title", "")
-        chap_text: str = chapter.get("text", "")
-        subchapters: list = chapter.get("subchapters", [])
-
-        # Разрыв страницы перед каждой новой главой
-        doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
-
-        # Заголовок главы
-        doc.add_paragraph(chap_title, style="Heading 2")
-
-        # Текст главы
-        if chap_text:
-            doc.add_paragraph(apply_markdown_formatting(chap_text))
-
-        for sub in subchapters:
-            sub_title: str = sub.get("title", "") if isinstance(sub, dict) else str(sub)
-            sub_text: str = sub.get("text", "") if isinstance(sub, dict) else ""
-
-            # Заголовок подглавы
-            doc.add_paragraph(sub_title, style="Heading 3")
-
-            # Текст подглавы с размером шрифта 14pt
-            if sub_text:
-                para = doc.add_paragraph()
-                run = para.add_run(sub_text)
-                run.font.size = Pt(14)
-                
-    doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
 
-    # --- Заключение ---
-    concl_heading = doc.add_heading("Заключение", level=1)
-    concl_heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    concl_text: str = data.get("conclusion", {}).get("text", "")
-    concl_paragraph = doc.add_paragraph(apply_markdown_formatting(concl_text))
-    for run in concl_paragraph.runs:
-        run.font.size = Pt(content_size)
-        run.font.name = content_font
-        
-        
-    doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+def save_default_template(path: str, content_font: str = "Aptos", content_size: int = 14) -> None:
+    """Сохраняет встроенный шаблон в файл, чтобы его можно было отредактировать в Word."""
+    build_default_template(content_font=content_font, content_size=content_size).save(path)
 
-    # --- Литература ---
-    refs_heading = doc.add_heading("Литература", level=1)
-    refs_heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    refs_items: list = data.get("references", {}).get("items", [])
-    refs_text: str = "\n".join(refs_items)
-    refs_paragraph = doc.add_paragraph(apply_markdown_formatting(refs_text))
-    for run in refs_paragraph.runs:
-        run.font.size = Pt(content_size)
-        run.font.name = content_font
-
-    # --- Цвет текста ---
-    for paragraph in doc.paragraphs:
-        for run in paragraph.runs:
-            run.font.color.rgb = RGBColor(0, 0, 0)
-            
-    # --- Принудительно установить шрифт для всех параграфов ---
-    for paragraph in doc.paragraphs:
-        for run in paragraph.runs:
-            style_name = paragraph.style.name.lower()
-            
-            if "heading" in style_name:
-                run.font.size = Pt(max(content_size + 3, 17))  # заголовки — не меньше 17pt
-            else:
-                run.font.size = Pt(content_size)  # обычный текст — content_size (по умолч. 14pt)
 
+def resolve_fonts(
+    template_path: Optional[str],
+    content_font: Optional[str] = None,
+    content_size: Optional[int] = None
+) -> Tuple[Optional[str], Optional[int]]:
+    """
+    Шрифт и размер для render_docx с учетом config.
 
-    doc.save(docx_path)
-    print(f"Документ успешно создан: {docx_path}")
+    Без шаблона незаданные значения берутся из FONT/FONT_SIZE. Свой шаблон
+    сам задает оформление, поэтому для него остаются только явно
+    переданные значения.
+    """
+    if template_path is None:
+        return content_font or CFG_FONT, content_size or CFG_FONT_SIZE
+    return content_font, content_size
+
+
+@lru_cache(maxsize=16)
+def _load_template_blob(
+    template_path: Optional[str],
+    content_font: Optional[str],
+    content_size: Optional[int]
+) -> bytes:
+    """Читает (или строит) шаблон один раз на процесс и возвращает его байты."""
+    if template_path is None:
+        doc = build_default_template(content_font=content_font or "Aptos", content_size=content_size or 14)
+    else:
+        doc = Document(template_path)
+        ensure_styles(doc)
+        if content_font is not None or content_size is not None:
+            # Явно заданные шрифт или размер; остальное остается как в шаблоне
+            apply_document_styles(doc, content_font=content_font, content_size=content_size)
 
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
 
 
-def create_docx_file_for_json(
-    docx_path: str,
-    json_data: Optional[Union[Dict[str, Any], Essay]] = None,
-    json_path: Optional[str] = None,
-    content_font: str = "Aptos",
-    content_size: int = 14
-) -> None:
+class _TemplateDocument:
     """
-    Создает DOCX файл на основе данных из модели Essay или словаря.
-    Метаданные (дисциплина, автор, год и т.п.) берутся из ключа "metadata" в JSON.
+    Разобранный шаблон, который переиспользуется между рефератами.
+
+    Пакет DOCX (стили, нумерация, тема) разбирается один раз, а для каждого
+    реферата тело документа восстанавливается из копии тела шаблона.
     """
-    if json_data is None:
-        if json_path is None:
-            raise ValueError("Нужно передать либо json_data, либо json_path")
-        with open(json_path, "r", encoding="utf-8") as f:
-            json_data = json.load(f)
-
-    if hasattr(json_data, "dict"):
-        data: Dict[str, Any] = json_data.dict()
-    else:
-        data = json_data  # type: ignore
-
-    # --- Извлечение метаданных из JSON ---
-    metadata = data.get("metadata", {})
-    discipline = metadata.get("discipline", "_______________")
-    department = metadata.get("department", "________________________")
-    topic_name = metadata.get("topic_name", "____________________________________________")
-    author = metadata.get("author", "______________________")
-    group = metadata.get("group", "_____________________________")
-    checked_by = metadata.get("checked_by", "_________________________")
-    year = metadata.get("year", "2024")
-    city = metadata.get("city", "Бишкек")
 
-    doc = Document()
+    def __init__(self, blob: bytes):
+        self.doc = Document(io.BytesIO(blob))
+        # Колонтитулы — отдельные части пакета: поля в них заполняются
+        # на месте, поэтому их тоже нужно восстанавливать для каждого реферата
+        self._elements = [self.doc.element.body] + [part._element for part in _header_footer_parts(self.doc)]
+        self._children = [[deepcopy(child) for child in element] for element in self._elements]
+
+    def clone(self):
+        for element, children in zip(self._elements, self._children):
+            for child in list(element):
+                element.remove(child)
+            for child in children:
+                element.append(deepcopy(child))
+        return self.doc
+
+
+# Document не потокобезопасен, поэтому у каждого потока свои экземпляры шаблонов
+_thread_templates = threading.local()
+
+
+def _get_template_document(
+    template_path: Optional[str],
+    content_font: Optional[str],
+    content_size: Optional[int]
+):
+    cache: Dict[tuple, _TemplateDocument] = getattr(_thread_templates, "cache", None)
+    if cache is None:
+        cache = _thread_templates.cache = {}
+
+    key = (template_path, content_font, content_size)
+    template = cache.get(key)
+    if template is None:
+        template = cache[key] = _TemplateDocument(_load_template_blob(*key))
+    return template.clone()
+
+
+def _header_footer_parts(doc) -> Iterator[Any]:
+    """Колонтитулы со своим содержимым (связанные с предыдущим раздел — пропускаются)."""
+    seen = set()
+    for section in doc.sections:
+        for part in (section.header, section.first_page_header, section.even_page_header,
+                     section.footer, section.first_page_footer, section.even_page_footer):
+            # is_linked_to_previous проверяется до _element: иначе python-docx создаст пустой колонтитул
+            if part.is_linked_to_previous or part._element in seen:
+                continue
+            seen.add(part._element)
+            yield part
+
+
+def _iter_paragraphs(container) -> Iterator[Any]:
+    """Абзацы контейнера (тело, ячейка, колонтитул), включая вложенные таблицы."""
+    yield from container.paragraphs
+    for table in container.tables:
+        seen = set()
+        for row in table.rows:
+            for cell in row.cells:
+                # Объединенная ячейка повторяется в row.cells
+                if cell._tc in seen:
+                    continue
+                seen.add(cell._tc)
+                yield from _iter_paragraphs(cell)
+
+
+def _fill_placeholders(doc, metadata: Dict[str, Any]) -> None:
+    """Подставляет значения метаданных в поля {name} шаблона: в тексте, таблицах и колонтитулах."""
+    def replace(match: re.Match) -> str:
+        return str(metadata.get(match.group(1), ""))
+
+    paragraphs = itertools.chain(
+        _iter_paragraphs(doc), *(_iter_paragraphs(part) for part in _header_footer_parts(doc))
+    )
+    for paragraph in paragraphs:
+        if "{" not in paragraph.text:
+            continue
+        runs = paragraph.runs
+        # Сначала пробуем заменить внутри отдельных runs, чтобы сохранить их форматирование
+        for run in runs:
+            if "{" in run.text:
+                run.text = PLACEHOLDER_PATTERN.sub(replace, run.text)
+        # Поле могло оказаться разбитым Word на несколько runs
+        if runs and PLACEHOLDER_PATTERN.search(paragraph.text):
+            runs[0].text = PLACEHOLDER_PATTERN.sub(replace, paragraph.text)
+            for run in runs[1:]:
+                run.text = ""
+
+
+# -------------------------------------------------------
+# Рендеринг реферата
+# -------------------------------------------------------
+def add_blocks(doc, blocks: Iterable[Block]) -> None:
+    """Добавляет разобранные Markdown блоки: абзац на блок, runs по начертанию."""
+    # python-docx ищет стиль по имени перебором всех стилей на каждый абзац,
+    # поэтому идентификаторы стилей определяются один раз и ставятся напрямую.
+    style_ids = {kind: doc.styles[name].style_id for kind, name in MARKDOWN_STYLES.items()}
+    for block in blocks:
+        paragraph = doc.add_paragraph()
+        style_id = style_ids.get(block.kind)
+        if style_id:
+            paragraph._p.style = style_id
+        if block.number is not None:
+            paragraph.add_run(f"{block.number}. ")
+        for span in block.spans:
+            run = paragraph.add_run(span.text)
+            if span.bold:
+                run.bold = True
+            if span.italic:
+                run.italic = True
+
+
+def add_markdown(doc, text: str) -> None:
+    """Добавляет Markdown текст в документ."""
+    add_blocks(doc, iter_blocks(text))
+
+
+def _add_page_break(doc) -> None:
+    doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
 
-    # --- Шапка ---
-    for line in [
-        "МИНИСТЕРСТВО ОБРАЗОВАНИЯ И НАУКИ КР",
-        "Государственное учреждение высшего профессионального образования",
-        "\n\n\n_________________________________________________",
-        "СРС"
-    ]:
-        p = doc.add_paragraph(line)
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
 
-    last_paragraph = doc.paragraphs[-1]
-    if last_paragraph.runs:
-        run = last_paragraph.runs[0]
-        run.font.size = Pt(100)
-        run.font.bold = True
+def _add_section(doc, section: Section) -> None:
+    if section.page_break:
+        _add_page_break(doc)
 
-    # --- Метаданные ---
-    for text, alignment in [
-        (f"Дисциплина: {discipline}", WD_ALIGN_PARAGRAPH.CENTER),
-        (f"Кафедра: {department}", WD_ALIGN_PARAGRAPH.CENTER),
-        (f"Тема: {topic_name}", WD_ALIGN_PARAGRAPH.CENTER),
-        (f"Выполнил: {author}", WD_ALIGN_PARAGRAPH.RIGHT),
-        (f"Группа: {group}", WD_ALIGN_PARAGRAPH.RIGHT),
-        (f"Проверил: {checked_by}", WD_ALIGN_PARAGRAPH.RIGHT),
-        (f"{city}, {year}", WD_ALIGN_PARAGRAPH.CENTER)
-    ]:
-        p = doc.add_paragraph(text)
-        p.alignment = alignment
+    heading = doc.add_paragraph(section.title, style=SECTION_STYLES[section.level])
+    if section.centered:
+        heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    add_blocks(doc, section.blocks)
+    for subsection in section.subsections:
+        _add_section(doc, subsection)
 
-    doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
 
+def _render_body(doc, tree: EssayDocument) -> None:
+    """Добавляет в документ тему, план и все разделы реферата."""
     # --- Заголовок темы ---
-    title = doc.add_heading(data.get("topic", "Тема"), 0)
+    title = doc.add_heading(tree.topic, 0)
     title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
 
     # --- План ---
-    plan_heading = doc.add_heading("План", level=1)
+    plan_heading = doc.add_heading(PLAN_TITLE, level=1)
     plan_heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    for chapter in data.get("plan", {}).get("chapters", []):
-        chap_paragraph = doc.add_paragraph(chapter.get("title", ""), style="Heading 2")
-        chap_paragraph.style.font.size = Pt(content_size)
-        chap_paragraph.style.font.name = content_font
-        for sub in chapter.get("subchapters", []):
+    for entry in tree.plan:
+        doc.add_paragraph(entry.title, style="Heading 2")
+        for sub in entry.subchapters:
             doc.add_paragraph(sub, style="List Bullet")
-            
-    doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
 
-    # --- Введение ---
-    intro_heading = doc.add_heading("Введение", level=1)
-    intro_heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    intro_text: str = data.get("introduction", {}).get("text", "")
-    intro_paragraph = doc.add_paragraph(apply_markdown_formatting(intro_text))
-    for run in intro_paragraph.runs:
-        run.font.size = Pt(content_size)
-        run.font.name = content_font
-
-    # --- Главы ---
-    for chapter in data.get("chapters", []):
-        chap_title: str = chapter.get("title", "")
-        chap_text: str = chapter.get("text", "")
-        subchapters: list = chapter.get("subchapters", [])
-
-        # Разрыв страницы перед каждой новой главой
-        doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
-
-        # Заголовок главы
-        doc.add_paragraph(chap_title, style="Heading 2")
-
-        # Текст главы
-        if chap_text:
-            doc.add_paragraph(apply_markdown_formatting(chap_text))
-
-        for sub in subchapters:
-            sub_title: str = sub.get("title", "") if isinstance(sub, dict) else str(sub)
-            sub_text: str = sub.get("text", "") if isinstance(sub, dict) else ""
-
-            # Заголовок подглавы
-            doc.add_paragraph(sub_title, style="Heading 3")
-
-            # Текст подглавы с размером шрифта 14pt
-            if sub_text:
-                para = doc.add_paragraph()
-                run = para.add_run(sub_text)
-                run.font.size = Pt(14)
-                
-    doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
-
-    # --- Заключение ---
-    concl_heading = doc.add_heading("Заключение", level=1)
-    concl_heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    concl_text: str = data.get("conclusion", {}).get("text", "")
-    concl_paragraph = doc.add_paragraph(apply_markdown_formatting(concl_text))
-    for run in concl_paragraph.runs:
-        run.font.size = Pt(content_size)
-        run.font.name = content_font
-        
-        
-    doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+    # --- Введение, главы, заключение ---
+    for section in tree.sections:
+        _add_section(doc, section)
 
     # --- Литература ---
-    refs_heading = doc.add_heading("Литература", level=1)
+    _add_page_break(doc)
+    refs_heading = doc.add_heading(REFERENCES_TITLE, level=1)
     refs_heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    refs_items: list = data.get("references", {}).get("items", [])
-    refs_text: str = "\n".join(refs_items)
-    refs_paragraph = doc.add_paragraph(apply_markdown_formatting(refs_text))
-    for run in refs_paragraph.runs:
-        run.font.size = Pt(content_size)
-        run.font.name = content_font
-
-    # --- Цвет текста ---
-    for paragraph in doc.paragraphs:
-        for run in paragraph.runs:
-            run.font.color.rgb = RGBColor(0, 0, 0)
-            
-    # --- Принудительно установить шрифт для всех параграфов ---
-    for paragraph in doc.paragraphs:
-        for run in paragraph.runs:
-            style_name = paragraph.style.name.lower()
-            
-            if "heading" in style_name:
-                run.font.size = Pt(max(content_size + 3, 17))  # заголовки — не меньше 17pt
-            else:
-                run.font.size = Pt(content_size)  # обычный текст — content_size (по умолч. 14pt)
+    add_blocks(doc, tree.references)
 
 
+def render_docx(
+    docx_path: str,
+    json_data: Optional[Union[Dict[str, Any], Essay, EssayDocument]] = None,
+    json_path: Optional[str] = None,
+    metadata: Optional[Union[Dict[str, Any], EssayMetadata]] = None,
+    template_path: Optional[str] = None,
+    content_font: Optional[str] = None,
+    content_size: Optional[int] = None
+) -> None:
+    """
+    Создает DOCX файл по шаблону на основе модели Essay, словаря
+    или готового дерева EssayDocument.
+
+    Шаблон (template_path или встроенный) разбирается один раз на процесс и
+    клонируется для каждого реферата. Поля титульного листа ({author},
+    {group} и т.д.) заполняются из metadata, а если она не передана —
+    из ключа "metadata" реферата.
+
+    Для своего шаблона content_font/content_size по умолчанию не меняют его
+    стили; если их передать, стили шаблона будут переопределены.
+    """
+    tree = build_document(json_data, json_path, metadata)
+
+    doc = _get_template_document(template_path, content_font, content_size)
+    _fill_placeholders(doc, tree.metadata)
+    _render_body(doc, tree)
+
     doc.save(docx_path)
-    print(f"Документ успешно создан: {docx_path}")
+    log(logger, logging.INFO, "Документ создан", path=docx_path)
+
+
+def create_docx_file(
+    docx_path: str,
+    json_data: Optional[Union[Dict[str, Any], Essay]] = None,
+    json_path: Optional[str] = None,
+    discipline: str = "_______________",
+    department: str = "________________________",
+    topic_name: str = "____________________________________________",
+    author: str = "______________________",
+    group: str = "_____________________________",
+    checked_by: str = "_________________________",
+    year: str = "2024",
+    city: str = "Бишкек",
+    content_font: Optional[str] = None,
+    content_size: Optional[int] = None,
+    template_path: Optional[str] = None
+) -> None:
+    """
+    Создает DOCX файл на основе данных из модели Essay или словаря.
+    Метаданные титульного листа передаются аргументами.
+
+    content_font/content_size — как в render_docx: без шаблона по умолчанию
+    Aptos 14pt, стили своего шаблона меняются, только если их передать.
+    """
+    render_docx(
+        docx_path=docx_path,
+        json_data=json_data,
+        json_path=json_path,
+        metadata=EssayMetadata(
+            discipline=discipline,
+            department=department,
+            topic_name=topic_name,
+            author=author,
+            group=group,
+            checked_by=checked_by,
+            year=year,
+            city=city,
+        ),
+        template_path=template_path,
+        content_font=content_font,
+        content_size=content_size,
+    )
+
+
+def create_docx_file_for_json(
+    docx_path: str,
+    json_data: Optional[Union[Dict[str, Any], Essay]] = None,
+    json_path: Optional[str] = None,
+    content_font: Optional[str] = None,
+    content_size: Optional[int] = None,
+    template_path: Optional[str] = None
+) -> None:
+    """
+    Создает DOCX файл на основе данных из модели Essay или словаря.
+    Метаданные (дисциплина, автор, год и т.п.) берутся из ключа "metadata" в JSON.
+    Шрифт и размер — как в create_docx_file.
+    """
+    render_docx(
+        docx_path=docx_path,
+        json_data=json_data,
+        json_path=json_path,
+        template_path=template_path,
+        content_font=content_font,
+        content_size=content_size,
+    )
@@ -0,0 +1,266 @@
+"""
+Репозиторий рефератов в SQLite с полнотекстовым поиском (FTS5).
+
+Каждый Essay хранится целиком (компактный JSON) вместе с метаданными
+для выборок по теме, автору и группе; тексты введения, глав, подглав и
+заключения дополнительно раскладываются по строкам таблицы sections и
+индексируются FTS5.
+
+Пример:
+    with EssayRepository("./results/essays.db") as repo:
+        repo.import_json_dir("./results/json")
+        repo.has_topic("История HTML")
+        for hit in repo.search("гипертекст"):
+            print(hit.topic, hit.section, hit.snippet)
+"""
+import glob
+import os
+import sqlite3
+import threading
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from ai_referat.essay_store import normalize_topic
+from ai_referat.json_writer import dumps_json, load_json, loads_json
+from ai_referat.models import Essay
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS essays (
+    id INTEGER PRIMARY KEY,
+    topic TEXT NOT NULL,
+    topic_key TEXT NOT NULL,
+    language TEXT NOT NULL,
+    author TEXT NOT NULL,
+    author_key TEXT NOT NULL,
+    group_name TEXT NOT NULL,
+    group_key TEXT NOT NULL,
+    discipline TEXT NOT NULL,
+    year TEXT NOT NULL,
+    source TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS essays_topic ON essays(topic_key);
+CREATE INDEX IF NOT EXISTS essays_author ON essays(author_key);
+CREATE INDEX IF NOT EXISTS essays_group ON essays(group_key);
+CREATE UNIQUE INDEX IF NOT EXISTS essays_source ON essays(source);
+
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    essay_id INTEGER NOT NULL REFERENCES essays(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sections_essay ON sections(essay_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS sections_fts USING fts5(
+    title, text, content='sections', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+# Виды разделов в таблице sections
+INTRODUCTION = "introduction"
+CHAPTER = "chapter"
+SUBCHAPTER = "subchapter"
+CONCLUSION = "conclusion"
+REFERENCES = "references"
+
+
+# --- Запись реферата в выборке ---
+class EssayRow(NamedTuple):
+    id: int
+    topic: str
+    language: str
+    author: str
+    group: str
+    discipline: str
+    year: str
+    source: Optional[str]
+
+
+# --- Найденный раздел ---
+class SearchHit(NamedTuple):
+    essay_id: int
+    topic: str
+    kind: str
+    section: str
+    snippet: str
+    rank: float
+
+
+def iter_sections(essay: Essay) -> Iterator[Tuple[str, str, str]]:
+    """Разделы реферата в порядке документа: (вид, заголовок, текст)."""
+    yield INTRODUCTION, essay.plan.introduction, essay.introduction.text
+    for chapter in essay.chapters:
+        yield CHAPTER, chapter.title, chapter.text
+        for sub in chapter.subchapters:
+            yield SUBCHAPTER, sub.title, sub.text
+    yield CONCLUSION, essay.plan.conclusion, essay.conclusion.text
+    if essay.references.items:
+        yield REFERENCES, essay.plan.references, "\n".join(essay.references.items)
+
+
+def fts_query(query: str) -> str:
+    """Экранирует пользовательский запрос: каждое слово — фраза FTS5, все слова обязательны."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+class EssayRepository:
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        try:
+            self._conn.executescript(SCHEMA)
+        except sqlite3.OperationalError as e:
+            self._conn.close()
+            raise RuntimeError(f"SQLite без поддержки FTS5: {e}") from e
+
+    # ---------------- Запись ----------------
+    def _insert(self, essay: Essay, source: Optional[str]) -> int:
+        meta = essay.metadata
+        if source is not None:
+            # Повторный импорт того же файла заменяет прежнюю запись
+            self._conn.execute(
+                "DELETE FROM sections_fts WHERE rowid IN "
+                "(SELECT s.id FROM sections s JOIN essays e ON e.id = s.essay_id WHERE e.source = ?)",
+                (source,)
+            )
+            self._conn.execute("DELETE FROM essays WHERE source = ?", (source,))
+
+        cur = self._conn.execute(
+            "INSERT INTO essays (topic, topic_key, language, author, author_key, group_name, group_key, "
+            "discipline, year, source, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (essay.topic, normalize_topic(essay.topic), essay.language,
+             meta.author, normalize_topic(meta.author), meta.group, normalize_topic(meta.group),
+             meta.discipline, meta.year, source, dumps_json(essay, pretty=False).decode("utf-8"))
+        )
+        essay_id = cur.lastrowid
+
+        rows = [(essay_id, kind, position, title, text)
+                for position, (kind, title, text) in enumerate(iter_sections(essay))]
+        self._conn.executemany(
+            "INSERT INTO sections (essay_id, kind, position, title, text) VALUES (?, ?, ?, ?, ?)", rows
+        )
+        self._conn.execute(
+            "INSERT INTO sections_fts (rowid, title, text) "
+            "SELECT id, title, text FROM sections WHERE essay_id = ?",
+            (essay_id,)
+        )
+        return essay_id
+
+    def add(self, essay: Essay, source: Optional[str] = None) -> int:
+        """Сохраняет реферат и возвращает его id."""
+        return self.add_many([essay], [source])[0]
+
+    def add_many(self, essays: Iterable[Essay], sources: Optional[Iterable[Optional[str]]] = None) -> List[int]:
+        """Сохраняет рефераты одной транзакцией."""
+        essays = list(essays)
+        sources = list(sources) if sources is not None else [None] * len(essays)
+        with self._lock, self._conn:
+            return [self._insert(essay, source) for essay, source in zip(essays, sources)]
+
+    def import_json_files(self, paths: Iterable[str], batch_size: int = 500) -> int:
+        """
+        Импортирует рефераты из JSON файлов пачками по batch_size.
+        Путь к файлу сохраняется как source: повторный импорт не создает дублей.
+        """
+        count = 0
+        batch: List[Tuple[Essay, str]] = []
+        for path in paths:
+            batch.append((load_json(path), os.path.abspath(path)))
+            if len(batch) >= batch_size:
+                count += len(self.add_many(*zip(*batch)))
+                batch = []
+        if batch:
+            count += len(self.add_many(*zip(*batch)))
+        return count
+
+    def import_json_dir(self, directory: str, pattern: str = "*.json") -> int:
+        """Импортирует все JSON рефераты каталога."""
+        return self.import_json_files(sorted(glob.glob(os.path.join(directory, pattern))))
+
+    def delete(self, essay_id: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM sections_fts WHERE rowid IN (SELECT id FROM sections WHERE essay_id = ?)",
+                (essay_id,)
+            )
+            self._conn.execute("DELETE FROM essays WHERE id = ?", (essay_id,))
+
+    # ---------------- Чтение ----------------
+    def _rows(self, where: str, params: Tuple, limit: Optional[int]) -> List[EssayRow]:
+        sql = (
+            "SELECT id, topic, language, author, group_name, discipline, year, source "
+            f"FROM essays WHERE {where} ORDER BY id DESC"
+        )
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return [EssayRow(*row) for row in self._conn.execute(sql, params)]
+
+    def get(self, essay_id: int) -> Essay:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM essays WHERE id = ?", (essay_id,)).fetchone()
+        if row is None:
+            raise KeyError(essay_id)
+        return Essay.model_validate(loads_json(row[0]))
+
+    def has_topic(self, topic: str) -> bool:
+        """Был ли уже сгенерирован реферат на эту тему."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM essays WHERE topic_key = ? LIMIT 1", (normalize_topic(topic),)
+            ).fetchone()
+        return row is not None
+
+    def find_by_topic(self, topic: str, limit: Optional[int] = None) -> List[EssayRow]:
+        return self._rows("topic_key = ?", (normalize_topic(topic),), limit)
+
+    def find_by_author(self, author: str, limit: Optional[int] = None) -> List[EssayRow]:
+        return self._rows("author_key = ?", (normalize_topic(author),), limit)
+
+    def find_by_group(self, group: str, limit: Optional[int] = None) -> List[EssayRow]:
+        return self._rows("group_key = ?", (normalize_topic(group),), limit)
+
+    def search(self, query: str, limit: int = 20, raw: bool = False) -> List[SearchHit]:
+        """
+        Полнотекстовый поиск по заголовкам и текстам разделов.
+
+        :param query: слова для поиска (все должны встретиться в разделе)
+        :param raw: передать query в FTS5 как есть (AND/OR/NEAR, префиксы "слово*")
+        """
+        match = query if raw else fts_query(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.essay_id, e.topic, s.kind, s.title, "
+                "snippet(sections_fts, 1, '[', ']', '…', 16), bm25(sections_fts) AS rank "
+                "FROM sections_fts JOIN sections s ON s.id = sections_fts.rowid "
+                "JOIN essays e ON e.id = s.essay_id "
+                "WHERE sections_fts MATCH ? ORDER BY rank LIMIT ?",
+                (match, limit)
+            ).fetchall()
+        return [SearchHit(*row) for row in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM essays").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,242 @@
+"""
+Хранилище рефератов в шардированных JSONL файлах.
+
+Каждый реферат — одна строка вида {"id": ..., "essay": {...}} в
+файле shard-NNNNN.jsonl; файлы только дописываются. Индекс
+index.jsonl хранит для каждой записи шард, смещение и длину, поэтому
+один реферат читается через mmap без просмотра остальных, а весь
+корпус можно обойти потоково.
+
+Пример:
+    store = EssayStore("./results/store")
+    essay_id = store.append(essay)
+    store.get(essay_id)            # по id
+    store.get("История HTML")      # последний реферат по теме
+    for essay in store.iter_essays():
+        ...
+"""
+import mmap
+import os
+import threading
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from ai_referat.json_writer import dumps_json, load_json, loads_json
+from ai_referat.lazy_essay import LazyEssay
+from ai_referat.models import Essay
+
+SHARD_TEMPLATE = "shard-{:05d}.jsonl"
+INDEX_FILE = "index.jsonl"
+DEFAULT_SHARD_SIZE = 256 * 1024 * 1024
+
+
+def normalize_topic(topic: str) -> str:
+    """Ключ темы: без лишних пробелов и без учета регистра."""
+    return " ".join(topic.split()).casefold()
+
+
+# --- Положение записи в шарде ---
+class RecordRef(NamedTuple):
+    shard: int
+    offset: int
+    length: int
+
+
+class EssayStore:
+    def __init__(self, root: str, shard_size: int = DEFAULT_SHARD_SIZE):
+        self.root = root
+        self.shard_size = shard_size
+        os.makedirs(root, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._refs: Dict[str, RecordRef] = {}
+        self._topics: Dict[str, str] = {}
+        self._maps: Dict[int, Tuple[mmap.mmap, int]] = {}
+        self._shard = 0
+        self._writer = None
+        self._index = None
+
+        self._load_index()
+        self._recover_tail()
+
+    # ---------------- Служебные методы ----------------
+    def _shard_path(self, shard: int) -> str:
+        return os.path.join(self.root, SHARD_TEMPLATE.format(shard))
+
+    def _remember(self, essay_id: str, topic: str, ref: RecordRef) -> None:
+        self._refs[essay_id] = ref
+        self._topics[normalize_topic(topic)] = essay_id
+        self._shard = max(self._shard, ref.shard)
+
+    def _load_index(self) -> None:
+        path = os.path.join(self.root, INDEX_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # недописанная строка после сбоя
+                entry = loads_json(line)
+                self._remember(entry["id"], entry["topic"], RecordRef(entry["shard"], entry["offset"], entry["length"]))
+
+    def _indexed_end(self, shard: int) -> int:
+        ends = [ref.offset + ref.length for ref in self._refs.values() if ref.shard == shard]
+        return max(ends, default=0)
+
+    def _recover_tail(self) -> None:
+        """
+        Дочитывает записи шардов, которые не успели попасть в индекс,
+        и обрезает недописанную строку после сбоя.
+        """
+        shard = self._shard
+        while os.path.exists(self._shard_path(shard)):
+            offset = self._indexed_end(shard)
+            recovered: List[Tuple[str, str, RecordRef]] = []
+            with open(self._shard_path(shard), "rb+") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    record = loads_json(line)
+                    recovered.append((record["id"], record["essay"]["topic"], RecordRef(shard, offset, len(line))))
+                    offset += len(line)
+                f.truncate(offset)
+
+            for essay_id, topic, ref in recovered:
+                self._remember(essay_id, topic, ref)
+                self._write_index(essay_id, topic, ref)
+            shard += 1
+
+    def _write_index(self, essay_id: str, topic: str, ref: RecordRef) -> None:
+        if self._index is None:
+            self._index = open(os.path.join(self.root, INDEX_FILE), "ab")
+        entry = {"id": essay_id, "topic": topic, "shard": ref.shard, "offset": ref.offset, "length": ref.length}
+        self._index.write(dumps_json(entry, pretty=False) + b"\n")
+        self._index.flush()
+
+    def _open_writer(self, size: int):
+        if self._writer is None:
+            self._writer = open(self._shard_path(self._shard), "ab")
+        # Новый шард, если текущий переполнится (пустой шард принимает любую запись)
+        if self._writer.tell() and self._writer.tell() + size > self.shard_size:
+            self._writer.close()
+            self._shard += 1
+            self._writer = open(self._shard_path(self._shard), "ab")
+        return self._writer
+
+    def _map(self, ref: RecordRef) -> mmap.mmap:
+        mapped = self._maps.get(ref.shard)
+        # Шард мог дорасти после отображения — переотображаем
+        if mapped is None or mapped[1] < ref.offset + ref.length:
+            if mapped is not None:
+                mapped[0].close()
+            with open(self._shard_path(ref.shard), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                mapped = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), size)
+            self._maps[ref.shard] = mapped
+        return mapped[0]
+
+    # ---------------- Запись ----------------
+    def append(self, essay: Essay, essay_id: Optional[str] = None) -> str:
+        """Дописывает реферат и возвращает его id."""
+        essay_id = essay_id or uuid.uuid4().hex
+        line = b'{"id":' + dumps_json(essay_id, pretty=False) + b',"essay":' + dumps_json(essay, pretty=False) + b"}\n"
+
+        with self._lock:
+            writer = self._open_writer(len(line))
+            ref = RecordRef(self._shard, writer.tell(), len(line))
+            writer.write(line)
+            writer.flush()
+            self._write_index(essay_id, essay.topic, ref)
+            self._remember(essay_id, essay.topic, ref)
+        return essay_id
+
+    def import_json_files(self, paths: Iterable[str]) -> List[str]:
+        """Переносит рефераты из отдельных JSON файлов в хранилище."""
+        return [self.append(load_json(path)) for path in paths]
+
+    # ---------------- Чтение ----------------
+    def resolve(self, key: str) -> Optional[str]:
+        """id реферата по id или по теме (последний с этой темой)."""
+        if key in self._refs:
+            return key
+        return self._topics.get(normalize_topic(key))
+
+    def get_raw(self, key: str) -> bytes:
+        """Строка записи (JSON) по id или теме."""
+        essay_id = self.resolve(key)
+        if essay_id is None:
+            raise KeyError(key)
+        ref = self._refs[essay_id]
+        with self._lock:
+            mapped = self._map(ref)
+            return mapped[ref.offset:ref.offset + ref.length]
+
+    def get_essay_raw(self, key: str) -> bytes:
+        """JSON самого реферата, без обертки записи {"id": ..., "essay": ...}."""
+        raw = self.get_raw(key)
+        return raw[raw.index(b'"essay":') + len(b'"essay":'):raw.rindex(b"}")]
+
+    def get(self, key: str) -> Essay:
+        """Реферат по id или теме."""
+        return Essay.model_validate(loads_json(self.get_raw(key))["essay"])
+
+    def get_lazy(self, key: str) -> LazyEssay:
+        """Ленивый реферат: тексты разделов читаются только при обращении."""
+        essay_id = self.resolve(key)
+        if essay_id is None:
+            raise KeyError(key)
+        return LazyEssay(lambda: self.get_essay_raw(essay_id))
+
+    def __contains__(self, key: str) -> bool:
+        return self.resolve(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def ids(self) -> List[str]:
+        return list(self._refs)
+
+    def topics(self) -> List[str]:
+        return list(self._topics)
+
+    def iter_records(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Потоково обходит все записи: (id, словарь реферата)."""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.flush()
+        shard = 0
+        while os.path.exists(self._shard_path(shard)):
+            with open(self._shard_path(shard), "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    record = loads_json(line)
+                    yield record["id"], record["essay"]
+            shard += 1
+
+    def iter_lazy(self) -> Iterator[LazyEssay]:
+        """Ленивые рефераты в порядке добавления — для выборок по заголовкам."""
+        for essay_id in self.ids():
+            yield self.get_lazy(essay_id)
+
+    def iter_essays(self) -> Iterator[Essay]:
+        """Потоково обходит весь корпус."""
+        for _, data in self.iter_records():
+            yield Essay.model_validate(data)
+
+    def close(self) -> None:
+        with self._lock:
+            for mapped, _ in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+            for f in (self._writer, self._index):
+                if f is not None:
+                    f.close()
+            self._writer = self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,85 @@
+"""
+События генерации реферата для AIReferatManagerAsync.generate_essay_stream.
+
+Поле type различает события при разборе JSON (например, в UI через SSE):
+
+    async for event in manager.generate_essay_stream():
+        if event.type == SECTION_COMPLETED:
+            show(event.title, event.text)
+        elif event.type == ESSAY_DONE:
+            save(event.essay)
+"""
+from contextvars import ContextVar
+from typing import Callable, Literal, Optional, Union
+
+from pydantic import BaseModel, Field
+
+from ai_referat.models import Essay, EssayPlan
+
+PLAN_READY = "plan_ready"
+SECTION_STARTED = "section_started"
+SECTION_COMPLETED = "section_completed"
+SECTION_RETRY = "section_retry"
+ESSAY_DONE = "essay_done"
+
+# Причины повтора запроса (SectionRetry.reason)
+RETRY_SHORT = "short"
+RETRY_REJECTED = "rejected"
+RETRY_OVERLOAD = "overload"
+RETRY_ERROR = "error"
+
+
+# --- План готов ---
+class PlanReady(BaseModel):
+    type: Literal["plan_ready"] = PLAN_READY
+    plan: EssayPlan = Field(..., description="План реферата")
+    total: int = Field(..., description="Разделов всего, включая план")
+    reused: bool = Field(False, description="План взят у похожей темы")
+
+# --- Раздел начат ---
+class SectionStarted(BaseModel):
+    type: Literal["section_started"] = SECTION_STARTED
+    kind: str = Field(..., description="Вид раздела (budget.INTRODUCTION, CHAPTER, ...)")
+    title: Optional[str] = Field(None, description="Название раздела")
+
+# --- Раздел готов ---
+class SectionCompleted(BaseModel):
+    type: Literal["section_completed"] = SECTION_COMPLETED
+    kind: str = Field(..., description="Вид раздела")
+    title: Optional[str] = Field(None, description="Название раздела")
+    text: str = Field(..., description="Текст раздела (LIMIT: — ответ не получен)")
+    done: int = Field(..., description="Готово разделов")
+    total: int = Field(..., description="Разделов всего")
+
+# --- Повтор запроса раздела ---
+class SectionRetry(BaseModel):
+    type: Literal["section_retry"] = SECTION_RETRY
+    kind: str = Field(..., description="Вид запроса (для частей длинного раздела — вид раздела или outline)")
+    title: Optional[str] = Field(None, description="Название раздела или пункта части")
+    attempt: int = Field(..., description="Номер неудавшейся попытки")
+    reason: str = Field(..., description="short, rejected, overload или error")
+
+# --- Реферат готов ---
+class EssayDone(BaseModel):
+    type: Literal["essay_done"] = ESSAY_DONE
+    essay: Essay = Field(..., description="Готовый реферат")
+    seconds: float = Field(..., description="Время генерации")
+
+
+EssayEvent = Union[PlanReady, SectionStarted, SectionCompleted, SectionRetry, EssayDone]
+
+# Получатель событий текущей генерации. Задается внутри задачи
+# generate_essay_stream и наследуется ее подзадачами (asyncio.gather), поэтому
+# параллельные генерации одного менеджера не видят событий друг друга
+event_sink: ContextVar[Optional[Callable[[EssayEvent], None]]] = ContextVar("ai_referat_event_sink", default=None)
+
+
+def listening() -> bool:
+    """Есть ли получатель событий в текущем контексте (иначе события не создаются)."""
+    return event_sink.get() is not None
+
+
+def emit(event: EssayEvent) -> None:
+    sink = event_sink.get()
+    if sink is not None:
+        sink(event)
@@ -0,0 +1,143 @@
+"""
+HTML экспорт реферата для быстрого предпросмотра.
+
+Строится из EssayDocument простой конкатенацией строк, без DOM и
+шаблонизаторов, поэтому реферат в сотни страниц рендерится за миллисекунды.
+"""
+from html import escape
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from ai_referat.config import FONT as CFG_FONT
+from ai_referat.config import FONT_SIZE as CFG_FONT_SIZE
+from ai_referat.document_tree import (PLAN_TITLE, REFERENCES_TITLE,
+                                     TITLE_PAGE_HEADER, TITLE_PAGE_MARK,
+                                     EssayDocument, Section, build_document)
+from ai_referat.markdown_parser import BULLET, HEADING, NUMBERED, Block, Span
+from ai_referat.models import Essay, EssayMetadata
+
+STYLE = """
+body {{ font-family: "{font}", serif; font-size: {size}pt; color: #000; max-width: 48em; margin: 2em auto; }}
+h1, h2, h3, h4 {{ font-size: {heading_size}pt; }}
+.center {{ text-align: center; }}
+.right {{ text-align: right; }}
+.title-mark {{ font-size: 100pt; font-weight: bold; text-align: center; margin: 0; }}
+.page {{ break-before: page; }}
+"""
+
+
+def _spans(spans: Iterable[Span]) -> str:
+    parts = []
+    for span in spans:
+        text = escape(span.text)
+        if span.italic:
+            text = f"<em>{text}</em>"
+        if span.bold:
+            text = f"<strong>{text}</strong>"
+        parts.append(text)
+    return "".join(parts)
+
+
+def _blocks(blocks: Iterable[Block], out: List[str]) -> None:
+    """Абзацы, заголовки и списки; соседние пункты собираются в один список."""
+    open_list: Optional[str] = None
+    for block in blocks:
+        tag = "ul" if block.kind == BULLET else "ol" if block.kind == NUMBERED else None
+        if tag != open_list:
+            if open_list:
+                out.append(f"</{open_list}>")
+            if tag:
+                out.append(f"<{tag}>")
+            open_list = tag
+
+        if block.kind == BULLET:
+            out.append(f"<li>{_spans(block.spans)}</li>")
+        elif block.kind == NUMBERED:
+            out.append(f'<li value="{block.number}">{_spans(block.spans)}</li>')
+        elif block.kind == HEADING:
+            out.append(f"<h4>{_spans(block.spans)}</h4>")
+        else:
+            out.append(f"<p>{_spans(block.spans)}</p>")
+    if open_list:
+        out.append(f"</{open_list}>")
+
+
+def _section(section: Section, out: List[str]) -> None:
+    attrs = ' class="page"' if section.page_break else ""
+    out.append(f"<section{attrs}>")
+    css = ' class="center"' if section.centered else ""
+    out.append(f"<h{section.level + 1}{css}>{escape(section.title)}</h{section.level + 1}>")
+    _blocks(section.blocks, out)
+    for subsection in section.subsections:
+        _section(subsection, out)
+    out.append("</section>")
+
+
+def render_html(
+    json_data: Optional[Union[Dict[str, Any], Essay, EssayDocument]] = None,
+    json_path: Optional[str] = None,
+    metadata: Optional[Union[Dict[str, Any], EssayMetadata]] = None,
+    standalone: bool = True,
+    content_font: str = CFG_FONT,
+    content_size: int = CFG_FONT_SIZE
+) -> str:
+    """
+    Возвращает HTML реферата.
+
+    :param standalone: полная страница со стилями; False — только содержимое <body>
+    """
+    tree = build_document(json_data, json_path, metadata)
+    out: List[str] = []
+
+    if standalone:
+        style = STYLE.format(font=escape(content_font), size=content_size, heading_size=max(content_size + 3, 17))
+        out.append(
+            f'<!DOCTYPE html>\n<html lang="ru"><head><meta charset="utf-8">'
+            f"<title>{escape(tree.topic)}</title><style>{style}</style></head><body>"
+        )
+
+    # --- Титульный лист ---
+    out.append('<section class="title-page">')
+    for line in TITLE_PAGE_HEADER:
+        out.append(f'<p class="center">{escape(line.strip())}</p>')
+    out.append(f'<p class="title-mark">{escape(TITLE_PAGE_MARK)}</p>')
+    for line in tree.title_page:
+        out.append(f'<p class="{line.align}">{escape(line.text)}</p>')
+    out.append("</section>")
+
+    # --- Тема и план ---
+    out.append('<section class="page">')
+    out.append(f'<h1 class="center">{escape(tree.topic)}</h1>')
+    out.append(f'<h2 class="center">{escape(PLAN_TITLE)}</h2>')
+    for entry in tree.plan:
+        out.append(f"<h3>{escape(entry.title)}</h3>")
+        if entry.subchapters:
+            out.append("<ul>" + "".join(f"<li>{escape(sub)}</li>" for sub in entry.subchapters) + "</ul>")
+    out.append("</section>")
+
+    # --- Введение, главы, заключение ---
+    for section in tree.sections:
+        _section(section, out)
+
+    # --- Литература ---
+    out.append('<section class="page">')
+    out.append(f'<h2 class="center">{escape(REFERENCES_TITLE)}</h2>')
+    _blocks(tree.references, out)
+    out.append("</section>")
+
+    if standalone:
+        out.append("</body></html>")
+    return "\n".join(out)
+
+
+def create_html_file(
+    html_path: str,
+    json_data: Optional[Union[Dict[str, Any], Essay, EssayDocument]] = None,
+    json_path: Optional[str] = None,
+    metadata: Optional[Union[Dict[str, Any], EssayMetadata]] = None,
+    content_font: str = CFG_FONT,
+    content_size: int = CFG_FONT_SIZE
+) -> None:
+    """Сохраняет реферат в HTML файл."""
+    html = render_html(json_data, json_path, metadata, content_font=content_font, content_size=content_size)
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(html)
@@ -0,0 +1,231 @@
+"""
+Надежная локальная очередь заданий в SQLite.
+
+Задание, попавшее в очередь, не теряется: воркер берет его в аренду
+(lease) на lease_seconds и продлевает аренду heartbeat'ом, пока работает.
+Если воркер упал, аренда истекает, и задание снова выдается следующему
+воркеру. После max_attempts неудачных попыток задание получает статус
+failed.
+
+Пример:
+    queue = JobQueue("./results/queue.db")
+    job_id = queue.put({"topic": "История HTML"})
+    job = queue.claim("worker-1")
+    queue.heartbeat(job.id, "worker-1")
+    queue.complete(job.id, "worker-1", {"json_path": "..."})
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_until REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created);
+"""
+
+# --- Статусы задания ---
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+
+
+# --- Выданное воркеру задание ---
+class QueuedJob(NamedTuple):
+    id: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+
+
+# --- Состояние задания ---
+class JobRecord(NamedTuple):
+    id: str
+    status: str
+    attempts: int
+    max_attempts: int
+    lease_owner: Optional[str]
+    lease_until: Optional[float]
+    created: float
+    updated: float
+    result: Optional[Dict[str, Any]]
+    error: Optional[str]
+
+
+class JobQueue:
+    def __init__(self, path: str, lease_seconds: float = 120.0, max_attempts: int = 3, busy_timeout: float = 30.0):
+        """
+        :param lease_seconds: срок аренды без heartbeat, после которого задание выдается снова
+        :param max_attempts: попыток на задание по умолчанию
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        # isolation_level=None: транзакции открываются явно (BEGIN IMMEDIATE)
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    # ---------------- Постановка ----------------
+    def put(self, payload: Dict[str, Any], job_id: Optional[str] = None, max_attempts: Optional[int] = None) -> str:
+        return self.put_many([payload], max_attempts=max_attempts, job_ids=[job_id] if job_id else None)[0]
+
+    def put_many(
+        self,
+        payloads: Iterable[Dict[str, Any]],
+        max_attempts: Optional[int] = None,
+        job_ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """Ставит задания в очередь одной транзакцией."""
+        payloads = list(payloads)
+        job_ids = job_ids or [uuid.uuid4().hex for _ in payloads]
+        attempts = max_attempts or self.max_attempts
+        now = time.time()
+        rows = [
+            (job_id, json.dumps(payload, ensure_ascii=False), QUEUED, attempts, now, now)
+            for job_id, payload in zip(job_ids, payloads)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO jobs (id, payload, status, max_attempts, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return job_ids
+
+    # ---------------- Аренда ----------------
+    def claim(self, worker_id: str) -> Optional[QueuedJob]:
+        """
+        Выдает воркеру следующее задание: из очереди или с истекшей арендой.
+        Задания с истекшей арендой и исчерпанными попытками помечаются failed.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Брошенные упавшими воркерами задания без оставшихся попыток
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, updated = ? "
+                    "WHERE status = ? AND lease_until < ? AND attempts >= max_attempts",
+                    (FAILED, "аренда истекла, попытки исчерпаны", now, RUNNING, now)
+                )
+                row = self._conn.execute(
+                    "SELECT id, payload, attempts, max_attempts FROM jobs "
+                    "WHERE status = ? OR (status = ? AND lease_until < ?) ORDER BY created LIMIT 1",
+                    (QUEUED, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                job_id, payload, attempts, max_attempts = row
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_until = ?, "
+                    "updated = ? WHERE id = ?",
+                    (RUNNING, worker_id, now + self.lease_seconds, now, job_id)
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return QueuedJob(job_id, json.loads(payload), attempts + 1, max_attempts)
+
+    def _update_owned(self, sql: str, params: tuple, job_id: str, worker_id: str) -> bool:
+        # Меняем задание, только пока аренда у этого воркера
+        with self._lock:
+            cur = self._conn.execute(
+                sql + " WHERE id = ? AND status = ? AND lease_owner = ?",
+                params + (job_id, RUNNING, worker_id)
+            )
+        return cur.rowcount == 1
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Продлевает аренду; False — аренда потеряна (задание отдано другому воркеру)."""
+        now = time.time()
+        return self._update_owned(
+            "UPDATE jobs SET lease_until = ?, updated = ?", (now + self.lease_seconds, now), job_id, worker_id
+        )
+
+    def complete(self, job_id: str, worker_id: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        return self._update_owned(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_owner = NULL, lease_until = NULL, "
+            "updated = ?",
+            (DONE, json.dumps(result or {}, ensure_ascii=False), time.time()), job_id, worker_id
+        )
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """Ошибка попытки: задание возвращается в очередь, пока есть попытки."""
+        return self._update_owned(
+            "UPDATE jobs SET status = CASE WHEN ? AND attempts < max_attempts THEN ? ELSE ? END, "
+            "error = ?, lease_owner = NULL, lease_until = NULL, updated = ?",
+            (int(retry), QUEUED, FAILED, error, time.time()), job_id, worker_id
+        )
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        """Возвращает задание в очередь без траты попытки (остановка воркера)."""
+        return self._update_owned(
+            "UPDATE jobs SET status = ?, attempts = attempts - 1, lease_owner = NULL, lease_until = NULL, "
+            "updated = ?",
+            (QUEUED, time.time()), job_id, worker_id
+        )
+
+    # ---------------- Чтение ----------------
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, attempts, max_attempts, lease_owner, lease_until, created, updated, result, error "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return JobRecord(*row[:8], json.loads(row[8]) if row[8] else None, row[9])
+
+    def counts(self) -> Dict[str, int]:
+        """Число заданий по статусам."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(rows)
+        return counts
+
+    def pending(self) -> int:
+        """Задания, которые еще будут выполняться (в очереди и в работе)."""
+        counts = self.counts()
+        return counts[QUEUED] + counts[RUNNING]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
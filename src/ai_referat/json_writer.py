@@ -1,34 +1,144 @@
+import gzip
 import json
-from typing import Optional, Union
+import os
+import secrets
+from typing import Any, Dict, Optional, Tuple, Union
 
 from ai_referat.models import Essay
 
+try:
+    import orjson
+except ImportError:  # необязательная зависимость
+    orjson = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Права временного файла, как у open(path, "w"): 0666 с учетом umask
+# (mkstemp создал бы 0600, и новый файл стал бы доступен только владельцу)
+TEMP_FILE_MODE = 0o666
+
+
+def dumps_json(essay: Union[Essay, dict], pretty: bool = True) -> bytes:
+    """
+    Сериализует Essay или словарь в UTF-8 JSON.
+
+    Essay сериализуется через model_dump_json (pydantic-core, без
+    промежуточного dict), словарь — через orjson, если он установлен.
+    """
+    if isinstance(essay, Essay):
+        return essay.model_dump_json(indent=4 if pretty else None).encode("utf-8")
+
+    if orjson is not None and not pretty:
+        return orjson.dumps(essay)
+
+    if pretty:
+        return json.dumps(essay, ensure_ascii=False, indent=4).encode("utf-8")
+    return json.dumps(essay, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _create_temp(directory: str, name: str) -> Tuple[int, str]:
+    """Создает уникальный временный файл в directory; возвращает (fd, путь)."""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    while True:
+        tmp_path = os.path.join(directory, f".tmp-{secrets.token_hex(6)}{name}")
+        try:
+            return os.open(tmp_path, flags, TEMP_FILE_MODE), tmp_path
+        except FileExistsError:
+            continue
+
+
+def write_atomic(path: str, data: bytes, fsync: bool = False) -> None:
+    """
+    Пишет во временный файл рядом с path и атомарно переименовывает его.
+
+    :param fsync: сбросить данные на диск до переименования (защита и от
+                  сбоя питания, но заметно медленнее на больших пакетах)
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = _create_temp(directory, os.path.basename(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            # Перезаписываемый файл сохраняет свои права
+            try:
+                mode = os.stat(path).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = None
+            if mode is not None and hasattr(os, "fchmod"):
+                os.fchmod(f.fileno(), mode)
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        # При любой ошибке недописанный файл не должен остаться на диске
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
 
 def save_json(
     essay: Union[Essay, dict],
     json_path: Optional[str] = None,
-    return_json: bool = False
+    return_json: bool = False,
+    pretty: bool = True,
+    compress: Optional[bool] = None,
+    fsync: bool = False
 ) -> Optional[str]:
     """
     Сохраняет объект Essay или словарь в JSON.
 
+    Файл записывается атомарно: сначала во временный файл, затем
+    переименовывается, поэтому сбой во время записи не оставит
+    обрезанный JSON.
+
     :param essay: экземпляр Essay или dict
     :param json_path: путь для сохранения файла JSON
     :param return_json: если True, возвращает строку JSON
+    :param pretty: с отступами (по умолчанию) или компактно
+    :param compress: сжать gzip; по умолчанию — если путь оканчивается на .gz
+    :param fsync: дождаться записи на диск перед переименованием
     :return: JSON строка (если return_json=True) или None
     """
-    # Преобразуем Pydantic модель в dict
-    data: dict = essay.dict() if isinstance(essay, Essay) else essay
-
-    # Сериализация в JSON
-    json_str: str = json.dumps(data, ensure_ascii=False, indent=4)
+    data = dumps_json(essay, pretty=pretty)
 
     # Сохраняем в файл, если указан путь
     if json_path:
-        with open(json_path, "w", encoding="utf-8") as f:
-            f.write(json_str)
+        if compress is None:
+            compress = json_path.endswith(".gz")
+        write_atomic(json_path, gzip.compress(data, compresslevel=6) if compress else data, fsync=fsync)
 
     if return_json:
-        return json_str
+        return data.decode("utf-8")
 
     return None
+
+
+def read_json_bytes(json_path: str) -> bytes:
+    """Читает JSON файл, распаковывая gzip при необходимости."""
+    with open(json_path, "rb") as f:
+        data = f.read()
+    if data[:2] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+    return data
+
+
+def loads_json(data: Union[bytes, str]) -> Any:
+    """Разбирает JSON через orjson, если он установлен."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_json_dict(json_path: str) -> Dict[str, Any]:
+    """Загружает JSON реферата как словарь."""
+    return loads_json(read_json_bytes(json_path))
+
+
+def load_json(json_path: str) -> Essay:
+    """Загружает Essay из JSON (в том числе сжатого gzip)."""
+    # Разбор в dict и model_validate быстрее model_validate_json
+    # на длинных кириллических строках
+    return Essay.model_validate(load_json_dict(json_path))
@@ -0,0 +1,154 @@
+"""
+Ленивое представление сохраненного реферата.
+
+Для аналитики по корпусу чаще всего нужны тема, план и метаданные, а
+тексты глав занимают почти весь объем JSON. LazyEssay при первом
+обращении к заголовку декодирует только значения topic, language, plan и
+metadata (json.raw_decode с найденной позиции ключа, без разбора
+текстов) и не держит сырой JSON в памяти. Полный Essay загружается
+только при обращении к разделам.
+
+Пример:
+    essay = LazyEssay.from_file("./results/json/essay.json")
+    essay.metadata.author      # читаются только заголовочные поля
+    essay.chapters[0].text     # здесь загружается весь реферат
+"""
+import json
+import re
+from typing import Any, Callable, List, Optional, Tuple
+
+from ai_referat.json_writer import loads_json, read_json_bytes
+from ai_referat.models import (Chapter, Conclusion, Essay, EssayMetadata,
+                               EssayPlan, Introduction, References)
+
+HEADER_FIELDS = ("topic", "language", "plan", "metadata")
+HEADER_CHUNK = 8192
+
+# Ключ верхнего уровня: внутри строк кавычки экранированы, поэтому
+# "<ключ>": встречается в JSON реферата только как ключ
+KEY_PATTERNS = {name: re.compile(rb'"' + name.encode() + rb'"\s*:\s*') for name in HEADER_FIELDS}
+
+_decoder = json.JSONDecoder()
+
+
+def decode_field(raw: bytes, name: str) -> Any:
+    """
+    Декодирует значение одного ключа верхнего уровня, не разбирая остальной JSON.
+
+    Значение читается кусками растущего размера, так что длинные тексты
+    после него не декодируются. None, если ключа нет.
+    """
+    pattern = KEY_PATTERNS[name]
+    match = None
+    if name == "metadata":
+        # metadata сериализуется последним — сначала ищем с конца
+        start = raw.rfind(b'"metadata"')
+        if start >= 0:
+            match = pattern.match(raw, start)
+    if match is None:
+        match = pattern.search(raw)
+    if match is None:
+        return None
+
+    pos, size = match.end(), HEADER_CHUNK
+    while True:
+        chunk = raw[pos:pos + size]
+        try:
+            # Обрезанный посередине символ UTF-8 в конце куска отбрасывается
+            return _decoder.raw_decode(chunk.decode("utf-8", errors="ignore"))[0]
+        except json.JSONDecodeError:
+            if pos + size >= len(raw):
+                raise
+            size *= 4
+
+
+class LazyEssay:
+    """Реферат, который загружает тексты разделов только по требованию."""
+
+    def __init__(self, loader: Callable[[], bytes]):
+        """
+        :param loader: возвращает JSON реферата (bytes); вызывается при
+                       первом чтении заголовка и при полной загрузке
+        """
+        self._loader = loader
+        self._header: Optional[Tuple[str, str, EssayPlan, EssayMetadata]] = None
+        self._essay: Optional[Essay] = None
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "LazyEssay":
+        return cls(lambda: raw)
+
+    @classmethod
+    def from_file(cls, json_path: str) -> "LazyEssay":
+        return cls(lambda: read_json_bytes(json_path))
+
+    # ---------------- Заголовок ----------------
+    def _load_header(self) -> Tuple[str, str, EssayPlan, EssayMetadata]:
+        if self._header is None:
+            if self._essay is not None:
+                essay = self._essay
+                self._header = (essay.topic, essay.language, essay.plan, essay.metadata)
+            else:
+                raw = self._loader()
+                plan = decode_field(raw, "plan")
+                metadata = decode_field(raw, "metadata")
+                self._header = (
+                    decode_field(raw, "topic"),
+                    decode_field(raw, "language"),
+                    EssayPlan.model_validate(plan) if plan is not None else EssayPlan(),
+                    EssayMetadata.model_validate(metadata) if metadata is not None else EssayMetadata(),
+                )
+        return self._header
+
+    @property
+    def topic(self) -> str:
+        return self._load_header()[0]
+
+    @property
+    def language(self) -> str:
+        return self._load_header()[1]
+
+    @property
+    def plan(self) -> EssayPlan:
+        return self._load_header()[2]
+
+    @property
+    def metadata(self) -> EssayMetadata:
+        return self._load_header()[3]
+
+    # ---------------- Разделы ----------------
+    @property
+    def loaded(self) -> bool:
+        """Загружен ли реферат целиком."""
+        return self._essay is not None
+
+    def to_essay(self) -> Essay:
+        """Полный Essay."""
+        if self._essay is None:
+            self._essay = Essay.model_validate(loads_json(self._loader()))
+        return self._essay
+
+    @property
+    def introduction(self) -> Introduction:
+        return self.to_essay().introduction
+
+    @property
+    def chapters(self) -> List[Chapter]:
+        return self.to_essay().chapters
+
+    @property
+    def conclusion(self) -> Conclusion:
+        return self.to_essay().conclusion
+
+    @property
+    def references(self) -> References:
+        return self.to_essay().references
+
+    def unload(self) -> None:
+        """Освобождает тексты разделов; заголовок остается."""
+        if self._essay is not None:
+            self._load_header()
+            self._essay = None
+
+    def __repr__(self) -> str:
+        return f"LazyEssay(topic={self.topic!r}, loaded={self.loaded})"
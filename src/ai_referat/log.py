@@ -0,0 +1,167 @@
+"""
+Структурированное логирование ai_referat.
+
+Модули пишут записи через log(logger, level, message, **fields): поля
+(essay_id, section, provider, attempt, latency, ...) попадают в запись
+атрибутом fields, а поля из log_context() добавляются автоматически — в
+том числе в задачах asyncio, созданных внутри контекста.
+
+Как библиотека ai_referat молчит: у логгера "ai_referat" только
+NullHandler. configure_logging() подключает QueueHandler: запись из
+горячего цикла лишь кладется в очередь, а форматирование и вывод в поток
+или файл выполняет фоновый поток QueueListener.
+
+Пример:
+    configure_logging("INFO", fmt="json")
+    with log_context(essay_id="42"):
+        log(logger, logging.INFO, "Ответ получен", section="chapter", latency=1.2)
+    # {"ts": ..., "level": "INFO", "logger": "ai_referat.client", "message": "Ответ получен",
+    #  "essay_id": "42", "section": "chapter", "latency": 1.2}
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, TextIO, Union
+
+LOGGER_NAME = "ai_referat"
+FIELDS_ATTR = "fields"
+FORMATS = ("text", "json")
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_package_logger = logging.getLogger(LOGGER_NAME)
+_package_logger.addHandler(logging.NullHandler())
+
+_context: ContextVar[Dict[str, Any]] = ContextVar("ai_referat_log_context", default={})
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_atexit_registered = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Логгер модуля в дереве LOGGER_NAME.
+
+    При запуске `python -m ai_referat.service` __name__ модуля — "__main__",
+    такой логгер вне дерева и configure_logging его записей не видит;
+    вместо него берется настоящее имя модуля из __spec__.
+    """
+    if name == "__main__":
+        spec = getattr(sys.modules.get("__main__"), "__spec__", None)
+        name = spec.name if spec is not None and spec.name.startswith(LOGGER_NAME + ".") else LOGGER_NAME
+    return logging.getLogger(name)
+
+
+def log(logger: logging.Logger, level: int, message: str, **fields: Any) -> None:
+    """Запись с полями; при выключенном уровне стоит одну проверку."""
+    if not logger.isEnabledFor(level):
+        return
+    context = _context.get()
+    if context:
+        fields = {**context, **fields}
+    logger.log(level, message, extra={FIELDS_ATTR: fields}, stacklevel=2)
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[Dict[str, Any]]:
+    """Поля, добавляемые ко всем записям внутри блока."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield _context.get()
+    finally:
+        _context.reset(token)
+
+
+@contextmanager
+def essay_context(essay_id: Optional[str] = None) -> Iterator[str]:
+    """essay_id для записей генерации реферата; заданный снаружи (задание сервиса) сохраняется."""
+    current = _context.get().get("essay_id")
+    if current is not None:
+        yield current
+        return
+    with log_context(essay_id=essay_id or uuid.uuid4().hex[:12]) as context:
+        yield context["essay_id"]
+
+
+# ---------------- Форматирование ----------------
+class JsonFormatter(logging.Formatter):
+    """Одна JSON строка на запись."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update(getattr(record, FIELDS_ATTR, None) or {})
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Читаемая строка: время, уровень, логгер, сообщение и поля key=value."""
+
+    def __init__(self, fmt: str = TEXT_FORMAT):
+        super().__init__(fmt)
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, FIELDS_ATTR, None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items() if value is not None)
+        return line
+
+
+# ---------------- Настройка ----------------
+def configure_logging(
+    level: Union[int, str] = logging.INFO,
+    fmt: str = "text",
+    stream: Optional[TextIO] = None,
+    path: Optional[str] = None
+) -> logging.handlers.QueueListener:
+    """
+    Включает вывод логов ai_referat через очередь.
+
+    :param fmt: "text" или "json" (JSON Lines)
+    :param stream: поток вывода (по умолчанию stderr)
+    :param path: файл вместо потока
+    """
+    global _listener, _queue_handler, _atexit_registered
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат логов: {fmt}, ожидается один из {FORMATS}")
+    stop_logging()
+
+    handler = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    records = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(records)
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    _package_logger.addHandler(_queue_handler)
+    _package_logger.setLevel(level)
+    _listener.start()
+
+    if not _atexit_registered:
+        # Дописать очередь до выхода из процесса
+        atexit.register(stop_logging)
+        _atexit_registered = True
+    return _listener
+
+
+def stop_logging() -> None:
+    """Выводит оставшиеся записи и отключает обработчик очереди."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        _package_logger.removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
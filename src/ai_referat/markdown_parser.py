@@ -0,0 +1,136 @@
+"""
+Однопроходный разбор Markdown из ответов LLM.
+
+Текст разбирается построчно на блоки (абзацы, заголовки, маркированные
+и нумерованные списки), а строки блоков — на фрагменты с жирным и
+курсивным начертанием. Все регулярные выражения компилируются один раз
+при импорте.
+"""
+import re
+from typing import Iterator, List, NamedTuple, Optional
+
+HEADING_PATTERN = re.compile(r"(#{1,6})\s+(.*?)(?:\s+#+)?\s*$")
+BULLET_PATTERN = re.compile(r"\s*[-*+•]\s+(.*)$")
+NUMBERED_PATTERN = re.compile(r"\s*(\d{1,3})[.)]\s+(.*)$")
+RULE_PATTERN = re.compile(r"\s*(?:[-*_]\s*){3,}$")
+
+# Управляющие символы, недопустимые в XML 1.0 (кроме \t, \n, \r): python-docx
+# такие строки не принимает, а Word не открывает document.xml с ними
+XML_INVALID_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+# Одна альтернатива на каждый вид выделения; порядок важен: *** раньше ** раньше *
+INLINE_PATTERN = re.compile(
+    r"\*\*\*(?P<bi>.+?)\*\*\*"
+    r"|\*\*(?P<b>.+?)\*\*"
+    r"|__(?P<b2>.+?)__"
+    r"|\*(?P<i>[^\s*](?:.*?[^\s*])?)\*"
+    r"|(?<!\w)_(?P<i2>[^\s_](?:.*?[^\s_])?)_(?!\w)"
+    r"|`(?P<code>[^`]+)`"
+)
+
+PARAGRAPH = "paragraph"
+HEADING = "heading"
+BULLET = "bullet"
+NUMBERED = "numbered"
+
+
+# --- Фрагмент текста с начертанием ---
+class Span(NamedTuple):
+    text: str
+    bold: bool = False
+    italic: bool = False
+
+
+# --- Блок документа ---
+class Block(NamedTuple):
+    kind: str
+    spans: List[Span]
+    level: int = 0
+    number: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(span.text for span in self.spans)
+
+
+def parse_inline(text: str) -> List[Span]:
+    """Разбивает строку на фрагменты по **жирному**, *курсиву* и `коду`."""
+    if "*" not in text and "_" not in text and "`" not in text:
+        return [Span(text)]
+
+    spans: List[Span] = []
+    pos = 0
+    for match in INLINE_PATTERN.finditer(text):
+        start = match.start()
+        if start > pos:
+            spans.append(Span(text[pos:start]))
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "bi":
+            spans.append(Span(value, bold=True, italic=True))
+        elif kind in ("b", "b2"):
+            spans.append(Span(value, bold=True))
+        elif kind in ("i", "i2"):
+            spans.append(Span(value, italic=True))
+        else:
+            spans.append(Span(value))
+        pos = match.end()
+    if pos < len(text):
+        spans.append(Span(text[pos:]))
+    return spans
+
+
+def clean_text(text: str) -> str:
+    """Текст без символов, недопустимых в XML (их часто оставляют ответы моделей)."""
+    return XML_INVALID_CHARS.sub("", text)
+
+
+def iter_blocks(text: str) -> Iterator[Block]:
+    """
+    Разбирает Markdown на блоки за один проход по строкам.
+
+    Каждая непустая строка становится отдельным блоком: ответы моделей
+    разделяют абзацы переводом строки, а короткие абзацы Word верстает
+    быстрее одного огромного. Недопустимые в XML символы удаляются.
+    """
+    for raw in clean_text(text).splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+
+        first = line[0]
+        if first == "#":
+            match = HEADING_PATTERN.match(line)
+            if match:
+                yield Block(HEADING, parse_inline(match.group(2)), level=len(match.group(1)))
+                continue
+        elif first in "-*+•_":
+            if RULE_PATTERN.match(line):
+                continue
+            match = BULLET_PATTERN.match(line)
+            if match:
+                yield Block(BULLET, parse_inline(match.group(1)))
+                continue
+        elif first.isdigit():
+            match = NUMBERED_PATTERN.match(line)
+            if match:
+                yield Block(NUMBERED, parse_inline(match.group(2)), number=match.group(1))
+                continue
+
+        yield Block(PARAGRAPH, parse_inline(line))
+
+
+def parse_markdown(text: str) -> List[Block]:
+    """Список блоков Markdown текста (см. iter_blocks)."""
+    return list(iter_blocks(text))
+
+
+def strip_markdown(text: str) -> str:
+    """Текст без Markdown разметки: по строке на блок."""
+    lines = []
+    for block in iter_blocks(text):
+        if block.kind == NUMBERED:
+            lines.append(f"{block.number}. {block.text}")
+        else:
+            lines.append(block.text)
+    return "\n".join(lines)
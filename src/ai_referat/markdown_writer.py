@@ -0,0 +1,87 @@
+"""
+Markdown экспорт реферата из EssayDocument.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from ai_referat.document_tree import (PLAN_TITLE, REFERENCES_TITLE,
+                                     TITLE_PAGE_HEADER, TITLE_PAGE_MARK,
+                                     EssayDocument, Section, build_document)
+from ai_referat.markdown_parser import BULLET, HEADING, NUMBERED, Block, Span
+from ai_referat.models import Essay, EssayMetadata
+
+
+def _spans(spans: Iterable[Span]) -> str:
+    parts = []
+    for span in spans:
+        marker = "*" * ((2 if span.bold else 0) + (1 if span.italic else 0))
+        parts.append(f"{marker}{span.text}{marker}")
+    return "".join(parts)
+
+
+def _blocks(blocks: Iterable[Block], out: List[str]) -> None:
+    for block in blocks:
+        if block.kind == BULLET:
+            out.append(f"- {_spans(block.spans)}")
+        elif block.kind == NUMBERED:
+            out.append(f"{block.number}. {_spans(block.spans)}")
+        elif block.kind == HEADING:
+            out.append(f"\n#### {_spans(block.spans)}\n")
+        else:
+            out.append(f"\n{_spans(block.spans)}\n")
+
+
+def _section(section: Section, out: List[str]) -> None:
+    out.append(f"\n{'#' * (section.level + 1)} {section.title}\n")
+    _blocks(section.blocks, out)
+    for subsection in section.subsections:
+        _section(subsection, out)
+
+
+def render_markdown(
+    json_data: Optional[Union[Dict[str, Any], Essay, EssayDocument]] = None,
+    json_path: Optional[str] = None,
+    metadata: Optional[Union[Dict[str, Any], EssayMetadata]] = None,
+    title_page: bool = True
+) -> str:
+    """Возвращает Markdown реферата."""
+    tree = build_document(json_data, json_path, metadata)
+    out: List[str] = []
+
+    # --- Титульный лист ---
+    if title_page:
+        for line in TITLE_PAGE_HEADER:
+            if line.strip():
+                out.append(f"{line.strip()}  ")
+        out.append(f"**{TITLE_PAGE_MARK}**  ")
+        for line in tree.title_page:
+            out.append(f"{line.text}  ")
+        out.append("\n---\n")
+
+    # --- Тема и план ---
+    out.append(f"# {tree.topic}\n")
+    out.append(f"## {PLAN_TITLE}\n")
+    for entry in tree.plan:
+        out.append(f"- {entry.title}")
+        for sub in entry.subchapters:
+            out.append(f"  - {sub}")
+
+    # --- Введение, главы, заключение ---
+    for section in tree.sections:
+        _section(section, out)
+
+    # --- Литература ---
+    out.append(f"\n## {REFERENCES_TITLE}\n")
+    _blocks(tree.references, out)
+
+    return "\n".join(out).strip() + "\n"
+
+
+def create_markdown_file(
+    md_path: str,
+    json_data: Optional[Union[Dict[str, Any], Essay, EssayDocument]] = None,
+    json_path: Optional[str] = None,
+    metadata: Optional[Union[Dict[str, Any], EssayMetadata]] = None
+) -> None:
+    """Сохраняет реферат в Markdown файл."""
+    with open(md_path, "w", encoding="utf-8") as f:
+        f.write(render_markdown(json_data, json_path, metadata))
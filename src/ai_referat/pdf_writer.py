@@ -0,0 +1,194 @@
+"""
+PDF экспорт реферата из EssayDocument.
+
+Работает локально через reportlab (необязательная зависимость:
+pip install reportlab). Для кириллицы нужен TrueType шрифт: путь
+передается аргументом font_path или через PDF_FONT_PATH, иначе ищутся
+Times New Roman и DejaVu Serif в стандартных каталогах.
+"""
+import importlib.util
+import os
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Union
+from xml.sax.saxutils import escape
+
+from ai_referat.config import FONT_SIZE as CFG_FONT_SIZE
+from ai_referat.config import PDF_FONT_PATH as CFG_PDF_FONT_PATH
+from ai_referat.document_tree import (PLAN_TITLE, REFERENCES_TITLE,
+                                     TITLE_PAGE_HEADER, TITLE_PAGE_MARK,
+                                     EssayDocument, Section, build_document)
+from ai_referat.markdown_parser import BULLET, HEADING, NUMBERED, Block, Span
+from ai_referat.models import Essay, EssayMetadata
+
+FONT_CANDIDATES = [
+    "C:/Windows/Fonts/times.ttf",
+    "/Library/Fonts/Times New Roman.ttf",
+    "/System/Library/Fonts/Supplemental/Times New Roman.ttf",
+    "/usr/share/fonts/truetype/msttcorefonts/Times_New_Roman.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSerif.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSerif.ttf",
+    "/usr/share/fonts/TTF/DejaVuSerif.ttf",
+]
+
+# Суффиксы файлов начертаний: DejaVuSerif-Bold.ttf, timesbd.ttf и т.п.
+VARIANT_SUFFIXES = {
+    "bold": ("-Bold", "bd", " Bold"),
+    "italic": ("-Italic", "i", " Italic"),
+    "boldItalic": ("-BoldItalic", "bi", " Bold Italic"),
+}
+
+
+def _require_reportlab() -> None:
+    if importlib.util.find_spec("reportlab") is None:
+        raise RuntimeError("Для экспорта в PDF установите reportlab: pip install reportlab")
+
+
+def find_font(font_path: Optional[str] = None) -> str:
+    """Путь к TTF шрифту с кириллицей."""
+    for path in [font_path, CFG_PDF_FONT_PATH, *FONT_CANDIDATES]:
+        if path and os.path.isfile(path):
+            return path
+    raise RuntimeError(
+        "Не найден TrueType шрифт с кириллицей. Передайте font_path или задайте PDF_FONT_PATH"
+    )
+
+
+@lru_cache(maxsize=None)
+def _register_font(font_path: str) -> str:
+    """Регистрирует шрифт и его начертания в reportlab один раз на процесс."""
+    from reportlab.lib.fonts import addMapping
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    base, ext = os.path.splitext(font_path)
+    family = "Essay-" + os.path.basename(base)
+    pdfmetrics.registerFont(TTFont(family, font_path))
+
+    names = {"normal": family}
+    for variant, suffixes in VARIANT_SUFFIXES.items():
+        names[variant] = family
+        for suffix in suffixes:
+            variant_path = base + suffix + ext
+            if os.path.isfile(variant_path):
+                names[variant] = f"{family}-{variant}"
+                pdfmetrics.registerFont(TTFont(names[variant], variant_path))
+                break
+
+    addMapping(family, 0, 0, names["normal"])
+    addMapping(family, 1, 0, names["bold"])
+    addMapping(family, 0, 1, names["italic"])
+    addMapping(family, 1, 1, names["boldItalic"])
+    return family
+
+
+def _spans(spans: Iterable[Span]) -> str:
+    parts = []
+    for span in spans:
+        text = escape(span.text)
+        if span.italic:
+            text = f"<i>{text}</i>"
+        if span.bold:
+            text = f"<b>{text}</b>"
+        parts.append(text)
+    return "".join(parts)
+
+
+def _styles(family: str, content_size: int) -> Dict[str, Any]:
+    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_RIGHT
+    from reportlab.lib.styles import ParagraphStyle
+
+    heading_size = max(content_size + 3, 17)
+    body = ParagraphStyle("Body", fontName=family, fontSize=content_size, leading=content_size * 1.3,
+                          alignment=TA_JUSTIFY, spaceAfter=content_size * 0.7)
+    heading = ParagraphStyle("Heading", parent=body, fontSize=heading_size, leading=heading_size * 1.3,
+                             alignment=0, spaceBefore=heading_size * 0.6, spaceAfter=heading_size * 0.3)
+    return {
+        "body": body,
+        "bullet": ParagraphStyle("Bullet", parent=body, leftIndent=18, bulletIndent=4, spaceAfter=2),
+        "heading": heading,
+        "heading_center": ParagraphStyle("HeadingCenter", parent=heading, alignment=TA_CENTER),
+        "center": ParagraphStyle("Center", parent=body, alignment=TA_CENTER),
+        "right": ParagraphStyle("Right", parent=body, alignment=TA_RIGHT),
+        "mark": ParagraphStyle("Mark", parent=body, fontSize=100, leading=110, alignment=TA_CENTER),
+    }
+
+
+def _blocks(blocks: Iterable[Block], styles: Dict[str, Any], story: List[Any]) -> None:
+    from reportlab.platypus import Paragraph
+
+    for block in blocks:
+        text = _spans(block.spans)
+        if block.kind == BULLET:
+            story.append(Paragraph(text, styles["bullet"], bulletText="•"))
+        elif block.kind == NUMBERED:
+            story.append(Paragraph(text, styles["bullet"], bulletText=f"{block.number}."))
+        elif block.kind == HEADING:
+            story.append(Paragraph(f"<b>{text}</b>", styles["heading"]))
+        else:
+            story.append(Paragraph(text, styles["body"]))
+
+
+def _section(section: Section, styles: Dict[str, Any], story: List[Any]) -> None:
+    from reportlab.platypus import PageBreak, Paragraph
+
+    if section.page_break:
+        story.append(PageBreak())
+    style = styles["heading_center"] if section.centered else styles["heading"]
+    story.append(Paragraph(f"<b>{escape(section.title)}</b>", style))
+    _blocks(section.blocks, styles, story)
+    for subsection in section.subsections:
+        _section(subsection, styles, story)
+
+
+def create_pdf_file(
+    pdf_path: str,
+    json_data: Optional[Union[Dict[str, Any], Essay, EssayDocument]] = None,
+    json_path: Optional[str] = None,
+    metadata: Optional[Union[Dict[str, Any], EssayMetadata]] = None,
+    font_path: Optional[str] = None,
+    content_size: int = CFG_FONT_SIZE
+) -> None:
+    """Сохраняет реферат в PDF файл."""
+    _require_reportlab()
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer
+
+    tree = build_document(json_data, json_path, metadata)
+    styles = _styles(_register_font(find_font(font_path)), content_size)
+    story: List[Any] = []
+
+    # --- Титульный лист ---
+    for line in TITLE_PAGE_HEADER:
+        if line.strip():
+            story.append(Paragraph(escape(line.strip()), styles["center"]))
+        else:
+            story.append(Spacer(1, content_size))
+    story.append(Spacer(1, content_size * 3))
+    story.append(Paragraph(f"<b>{escape(TITLE_PAGE_MARK)}</b>", styles["mark"]))
+    for line in tree.title_page:
+        story.append(Paragraph(escape(line.text), styles[line.align]))
+
+    # --- Тема и план ---
+    story.append(PageBreak())
+    story.append(Paragraph(escape(tree.topic), styles["heading_center"]))
+    story.append(Paragraph(f"<b>{escape(PLAN_TITLE)}</b>", styles["heading_center"]))
+    for entry in tree.plan:
+        story.append(Paragraph(f"<b>{escape(entry.title)}</b>", styles["body"]))
+        for sub in entry.subchapters:
+            story.append(Paragraph(escape(sub), styles["bullet"], bulletText="•"))
+
+    # --- Введение, главы, заключение ---
+    for section in tree.sections:
+        _section(section, styles, story)
+
+    # --- Литература ---
+    story.append(PageBreak())
+    story.append(Paragraph(f"<b>{escape(REFERENCES_TITLE)}</b>", styles["heading_center"]))
+    _blocks(tree.references, styles, story)
+
+    doc = SimpleDocTemplate(
+        pdf_path, pagesize=A4, title=tree.topic, author=tree.metadata.get("author", ""),
+        leftMargin=3 * cm, rightMargin=1.5 * cm, topMargin=2 * cm, bottomMargin=2 * cm
+    )
+    doc.build(story)
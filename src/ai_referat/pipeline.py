@@ -1,25 +1,42 @@
 # ai_referat/pipeline.py
 import asyncio
-from typing import Optional
+import logging
+import os
+import time
+from concurrent.futures import Executor
+from typing import AsyncIterator, Callable, Optional, Set
 
 from ai_referat.client import AIClientAsync, AIClientSync
-from ai_referat.config import FONT as CFG_FONT
-from ai_referat.config import FONT_SIZE as CFG_FONT_SIZE
+from ai_referat.build_manifest import (BuildManifest, save_outputs, write_docx_output,
+                                       write_json_output)
+from ai_referat.budget import (CHAPTER, CONCLUSION, INTRODUCTION, OUTLINE, PLAN,
+                               REFERENCES, SECTION_SHARE, SUBCHAPTER,
+                               TokenBudget)
+from ai_referat.chunking import CHUNKED_KINDS, join_parts, parts_count, split_outline
+from ai_referat.config import CHUNK_PAGES as CFG_CHUNK_PAGES
 from ai_referat.config import LANGUAGE as CFG_LANGUAGE
 from ai_referat.config import MAX_CHAPTERS as CFG_MAX_CHAPTERS
 from ai_referat.config import MAX_CHARS_PER_PAGE as CFG_CHARS_PER_PAGE
 from ai_referat.config import MAX_PAGES as CFG_MAX_PAGES
 from ai_referat.config import MAX_RETRIES
 from ai_referat.config import MAX_SUBCHAPTERS as CFG_MAX_SUBCHAPTERS
-from ai_referat.config import MIN_LENGTH
 from ai_referat.config import MIN_PAGES as CFG_MIN_PAGES
-from ai_referat.docx_writer import create_docx_file
-from ai_referat.json_writer import save_json
+from ai_referat.essay_store import EssayStore
+from ai_referat.events import (EssayDone, EssayEvent, PlanReady, SectionCompleted,
+                               SectionRetry, SectionStarted, emit, event_sink,
+                               listening)
+from ai_referat.json_writer import dumps_json, load_json
+from ai_referat.log import essay_context, get_logger, log
 from ai_referat.models import (Chapter, Conclusion, Essay, EssayMetadata,
                                Introduction, References, Subchapter)
 from ai_referat.parser import parse_plan
 from ai_referat.prompts import EssayPrompts
 from ai_referat.rules import RulesManager
+from ai_referat.router import ModelRouter
+from ai_referat.topic_index import TopicIndex, TopicMatch
+from ai_referat.validators import ValidatorChain
+
+logger = get_logger(__name__)
 
 
 # -------------------------------------------------------
@@ -44,6 +61,15 @@ class _BaseReferatManager:
         chars_per_page: int = CFG_CHARS_PER_PAGE,
         json_path: Optional[str] = None,
         docx_path: Optional[str] = None,
+        essay_store: Optional[EssayStore] = None,
+        token_budget: Optional[TokenBudget] = None,
+        topic_index: Optional[TopicIndex] = None,
+        reuse_sections: bool = False,
+        validators: Optional[ValidatorChain] = None,
+        router: Optional[ModelRouter] = None,
+        manifest: Optional[BuildManifest] = None,
+        chunk_pages: float = CFG_CHUNK_PAGES,
+        on_progress: Optional[Callable[[str, Optional[str], int, int], None]] = None,
         api_key: Optional[str] = None,
         model: str = "gpt-4",
         base_url: Optional[str] = None,
@@ -82,10 +108,31 @@ class _BaseReferatManager:
 
         self.max_chapters = max_chapters
         self.max_subchapters = max_subchapters
+        self.budget = token_budget or TokenBudget.from_rules(
+            self.rules_manager, max_chapters=max_chapters, max_subchapters=max_subchapters
+        )
+        self.validators = validators if validators is not None else ValidatorChain()
+        # Модель (и провайдер) для каждого вида раздела; None — модель клиента
+        self.router = router
+        # Главы длиннее chunk_pages страниц пишутся частями (0 — одним запросом)
+        self.chunk_pages = chunk_pages
 
         self.essay: Optional[Essay] = None
         self.default_json_path = json_path
         self.default_docx_path = docx_path
+        self.essay_store = essay_store
+        # Манифест сборки: неизменившиеся JSON и DOCX не перезаписываются
+        self.manifest = manifest
+
+        # Повторное использование плана (и разделов) похожей темы
+        self.topic_index = topic_index
+        self.reuse_sections = reuse_sections
+        self.reused_from: Optional[TopicMatch] = None
+
+        # Ход генерации: on_progress(kind, title, готово, всего) после каждого раздела
+        self.on_progress = on_progress
+        self._progress_done = 0
+        self._progress_total = 0
 
         self.api_key = api_key
         self.model = model
@@ -93,91 +140,304 @@ class _BaseReferatManager:
 
         self.client = None
 
+    def _call_options(self, kind: str, title: Optional[str] = None, parts: int = 1) -> dict:
+        """max_tokens, min_length и проверки ответа для запроса раздела (или его части)."""
+        options = self.budget.for_section(kind, parts).as_kwargs()
+        options["validator"] = self.validators.bind(kind, self.language, title)
+        options["section"] = kind
+        return options
+
+    def _routed_options(self, kind: str, title: Optional[str] = None, parts: int = 1):
+        """Параметры запроса раздела с моделью из роутера и сам маршрут (или None)."""
+        options = self._call_options(kind, title, parts)
+        route = self.router.route(kind) if self.router is not None else None
+        if route is not None:
+            options.update(route.as_kwargs())
+        return options, route
+
+    def _parts(self, kind: str) -> int:
+        if kind not in CHUNKED_KINDS:
+            return 1
+        return parts_count(self.budget.max_pages * SECTION_SHARE[kind], self.chunk_pages)
+
+    def _part_prompts(self, kind: str, title: str, outline) -> list:
+        low, high = self.budget.char_range(kind, len(outline))
+        return [self.prompts.part(title, outline, i, (low + high) // 2) for i in range(len(outline))]
+
+    def _record_latency(self, kind: str, route, start: float) -> None:
+        if route is not None:
+            self.router.record(kind, route.model, time.perf_counter() - start)
+
+    def _start_progress(self, plan, reused: bool = False) -> None:
+        # План, введение, заключение, литература и все главы с подглавами
+        self._progress_total = 4 + sum(1 + len(ch.subchapters) for ch in plan.chapters)
+        self._progress_done = 0
+        self._progress(PLAN)
+        self._emit(PlanReady(plan=plan, total=self._progress_total, reused=reused))
+
+    def _progress(self, kind: str, title: Optional[str] = None, text: Optional[str] = None) -> None:
+        self._progress_done += 1
+        log(logger, logging.DEBUG, "Раздел готов", section=kind, title=title,
+            done=self._progress_done, total=self._progress_total)
+        if self.on_progress is not None:
+            self.on_progress(kind, title, self._progress_done, self._progress_total)
+        # Для плана — событие PlanReady
+        if kind != PLAN and listening():
+            self._emit(SectionCompleted(kind=kind, title=title, text=text or "",
+                                        done=self._progress_done, total=self._progress_total))
+
+    def _emit(self, event: EssayEvent) -> None:
+        emit(event)
+
+    def _started(self, kind: str, title: Optional[str] = None) -> None:
+        if listening():
+            self._emit(SectionStarted(kind=kind, title=title))
+
+    def _retry_callback(self, kind: str, title: Optional[str]) -> Optional[Callable[[int, str], None]]:
+        """on_retry клиента: событие SectionRetry, если кто-то слушает события."""
+        if not listening():
+            return None
+        return lambda attempt, reason: self._emit(SectionRetry(kind=kind, title=title, attempt=attempt, reason=reason))
+
+    def _find_similar_topic(self) -> Optional[TopicMatch]:
+        """Похожая тема из индекса, план которой можно взять вместо генерации."""
+        self.reused_from = self.topic_index.query(self.topic) if self.topic_index is not None else None
+        return self.reused_from
+
+    def _reused_content(self):
+        """Разделы реферата похожей темы (reuse_sections=True) или None."""
+        match = self.reused_from
+        if not self.reuse_sections or match is None or not match.essay_path:
+            return None
+        if not os.path.exists(match.essay_path):
+            return None
+        essay = load_json(match.essay_path)
+        return essay.introduction, essay.chapters, essay.conclusion, essay.references
+
+    def _store_results(self, essay: Essay) -> None:
+        if self.essay_store is not None:
+            self.essay_store.append(essay)
+
+    def _index_results(self, essay: Essay, json_path: Optional[str]) -> None:
+        if self.topic_index is not None:
+            self.topic_index.add(essay.topic, essay.plan, essay_path=os.path.abspath(json_path) if json_path else None)
+
     def _save_results(self, essay: Essay, json_path: Optional[str], docx_path: Optional[str]):
+        self._store_results(essay)
+        self._index_results(essay, json_path)
+        # Одна сериализация на JSON файл и хеш DOCX
+        data = dumps_json(essay) if json_path or self.manifest is not None else None
         if json_path:
-            save_json(essay, json_path=json_path)
+            write_json_output(essay, json_path, manifest=self.manifest, data=data)
         if docx_path:
-            create_docx_file(
-                docx_path=docx_path,
-                json_data=essay.dict(),
-                discipline=self.metadata.discipline,
-                department=self.metadata.department,
-                topic_name=self.metadata.topic_name,
-                author=self.metadata.author,
-                group=self.metadata.group,
-                checked_by=self.metadata.checked_by,
-                year=self.metadata.year,
-                city=self.metadata.city,
-                content_font=CFG_FONT,
-                content_size=CFG_FONT_SIZE,
-            )
+            write_docx_output(essay, docx_path, metadata=self.metadata, manifest=self.manifest, data=data)
+        if self.manifest is not None:
+            self.manifest.save()
+
+
+def _log_save_error(task: "asyncio.Task") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        error = task.exception()
+        log(logger, logging.ERROR, "Ошибка фоновой записи результатов", error=str(error),
+            error_type=type(error).__name__)
+
 
 # -------------------------------------------------------
 # Асинхронный менеджер
 # -------------------------------------------------------
 class AIReferatManagerAsync(_BaseReferatManager):
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self,
+        *args,
+        save_executor: Optional[Executor] = None,
+        background_save: bool = False,
+        **kwargs
+    ):
+        """
+        :param save_executor: пул для записи JSON и DOCX (None — пул потоков цикла)
+        :param background_save: generate_essay возвращает Essay, не дожидаясь
+                                записи файлов; дождаться — wait_saved()
+        """
         super().__init__(*args, **kwargs)
+        self.save_executor = save_executor
+        self.background_save = background_save
+        # Незавершенные (и завершившиеся ошибкой) фоновые записи для wait_saved
+        self._save_tasks: Set[asyncio.Task] = set()
         self.client = AIClientAsync(
             model=self.model,
             api_key=self.api_key,
             base_url=self.base_url
         )
 
+    async def _ask(self, kind: str, prompt: str, title: Optional[str] = None, parts: int = 1) -> str:
+        options, route = self._routed_options(kind, title, parts)
+        on_retry = self._retry_callback(kind, title)
+        if on_retry is not None:
+            options["on_retry"] = on_retry
+        start = time.perf_counter()
+        text = await self.client.get_response_async(prompt, "", max_retries=MAX_RETRIES, **options)
+        self._record_latency(kind, route, start)
+        return text
+
+    async def _ask_long(self, kind: str, prompt: str, title: str) -> str:
+        """Раздел одним запросом или, если он длинный, по частям одновременно."""
+        self._started(kind, title)
+        parts = self._parts(kind)
+        if parts == 1:
+            return await self._ask(kind, prompt, title)
+        outline = split_outline(await self._ask(OUTLINE, self.prompts.outline(title, parts), title, parts), parts)
+        texts = await asyncio.gather(*[
+            self._ask(kind, part_prompt, point, parts)
+            for part_prompt, point in zip(self._part_prompts(kind, title, outline), outline)
+        ])
+        return join_parts(texts, outline)
+
     async def generate_plan(self):
         prompt = self.prompts.plan()
-        raw_plan = await self.client.get_response_async(content=prompt, rules="", min_length=MIN_LENGTH, max_retries=MAX_RETRIES)
+        raw_plan = await self._ask(PLAN, prompt)
         plan = parse_plan(raw_plan)
         return plan
 
     async def generate_content(self, plan):
         async def gen_intro():
-            text = await self.client.get_response_async(self.prompts.intro(), "", min_length=MIN_LENGTH, max_retries=MAX_RETRIES)
+            text = await self._ask_long(INTRODUCTION, self.prompts.intro(), plan.introduction)
+            self._progress(INTRODUCTION, plan.introduction, text)
             return Introduction(text=text)
 
         async def gen_conclusion():
-            text = await self.client.get_response_async(self.prompts.conclusion(), "", min_length=MIN_LENGTH, max_retries=MAX_RETRIES)
+            text = await self._ask_long(CONCLUSION, self.prompts.conclusion(), plan.conclusion)
+            self._progress(CONCLUSION, plan.conclusion, text)
             return Conclusion(text=text)
 
         async def gen_references():
-            text = await self.client.get_response_async(self.prompts.references(), "", min_length=MIN_LENGTH, max_retries=MAX_RETRIES)
+            self._started(REFERENCES)
+            text = await self._ask(REFERENCES, self.prompts.references())
+            self._progress(REFERENCES, text=text)
             items = [line.strip() for line in text.split("\n") if line.strip()]
             return References(items=items)
 
+        async def gen_subchapter(plan_chapter, sub):
+            text = await self._ask_long(SUBCHAPTER, self.prompts.subchapter(plan_chapter.title, sub), sub)
+            self._progress(SUBCHAPTER, sub, text)
+            return text
+
         async def gen_chapter(plan_chapter):
-            chap_text = await self.client.get_response_async(self.prompts.chapter(plan_chapter.title), "", min_length=MIN_LENGTH, max_retries=MAX_RETRIES)
+            chap_text = await self._ask_long(CHAPTER, self.prompts.chapter(plan_chapter.title), plan_chapter.title)
+            self._progress(CHAPTER, plan_chapter.title, chap_text)
             subchapters = []
             if plan_chapter.subchapters:
                 sub_texts = await asyncio.gather(*[
-                    self.client.get_response_async(self.prompts.subchapter(plan_chapter.title, sub), "", min_length=MIN_LENGTH, max_retries=MAX_RETRIES)
+                    gen_subchapter(plan_chapter, sub)
                     for sub in plan_chapter.subchapters
                 ])
                 subchapters = [Subchapter(title=sub, text=sub_texts[i]) for i, sub in enumerate(plan_chapter.subchapters)]
             return Chapter(title=plan_chapter.title, text=chap_text, subchapters=subchapters)
 
-        chapters = await asyncio.gather(*[gen_chapter(ch) for ch in plan.chapters])
-        introduction, conclusion, references = await asyncio.gather(gen_intro(), gen_conclusion(), gen_references())
+        # Введение, заключение и литература не зависят от текста глав: все разделы сразу
+        introduction, conclusion, references, *chapters = await asyncio.gather(
+            gen_intro(), gen_conclusion(), gen_references(), *[gen_chapter(ch) for ch in plan.chapters]
+        )
         return introduction, chapters, conclusion, references
 
     async def generate_essay(self, json_path: Optional[str] = None, docx_path: Optional[str] = None):
-        json_path = json_path or self.default_json_path
-        docx_path = docx_path or self.default_docx_path
-        plan = await self.generate_plan()
-        intro, chapters, conclusion, references = await self.generate_content(plan)
-        self.essay = Essay(
-            topic=self.topic,
-            language=self.language,
-            plan=plan,
-            introduction=intro,
-            chapters=chapters,
-            conclusion=conclusion,
-            references=references,
-            metadata=self.metadata,
-            json_path=json_path,
-            docx_path=docx_path,
-        )
-        self._save_results(self.essay, json_path, docx_path)
-        return self.essay
+        with essay_context():
+            start = time.perf_counter()
+            log(logger, logging.INFO, "Генерация реферата", topic=self.topic)
+            json_path = json_path or self.default_json_path
+            docx_path = docx_path or self.default_docx_path
+            match = self._find_similar_topic()
+            plan = match.plan if match else await self.generate_plan()
+            self._start_progress(plan, reused=match is not None)
+            intro, chapters, conclusion, references = self._reused_content() or await self.generate_content(plan)
+            self.essay = Essay(
+                topic=self.topic,
+                language=self.language,
+                plan=plan,
+                introduction=intro,
+                chapters=chapters,
+                conclusion=conclusion,
+                references=references,
+                metadata=self.metadata,
+                json_path=json_path,
+                docx_path=docx_path,
+            )
+            save = self._save_results_async(self.essay, json_path, docx_path)
+            if self.background_save:
+                task = asyncio.create_task(save)
+                self._save_tasks.add(task)
+                task.add_done_callback(self._save_done)
+            else:
+                await save
+            log(logger, logging.INFO, "Реферат готов", topic=self.topic, sections=self._progress_done,
+                latency=round(time.perf_counter() - start, 3), reused_plan=match is not None)
+            return self.essay
+
+    async def _save_results_async(self, essay: Essay, json_path: Optional[str], docx_path: Optional[str]):
+        """_save_results без блокировки цикла: JSON и DOCX пишутся одновременно в save_executor."""
+        # Индекс тем не потокобезопасен — обновляется в цикле, он быстрый
+        self._index_results(essay, json_path)
+        loop = asyncio.get_running_loop()
+        # EssayStore потокобезопасен, но в процесс его не передать — всегда пул потоков
+        store = loop.run_in_executor(None, self._store_results, essay)
+        try:
+            await save_outputs(essay, json_path, docx_path, metadata=self.metadata, manifest=self.manifest,
+                               executor=self.save_executor)
+        finally:
+            await store
+
+    def _save_done(self, task: "asyncio.Task") -> None:
+        _log_save_error(task)
+        # Ошибка остается до wait_saved, успешная запись больше не нужна
+        if task.cancelled() or task.exception() is None:
+            self._save_tasks.discard(task)
+
+    async def generate_essay_stream(
+        self, json_path: Optional[str] = None, docx_path: Optional[str] = None
+    ) -> AsyncIterator[EssayEvent]:
+        """
+        generate_essay, отдающий события по ходу генерации: PlanReady,
+        SectionStarted, SectionCompleted (с текстом), SectionRetry и в конце
+        EssayDone. Ошибка генерации пробрасывается из итератора; если
+        перестать читать события (break), генерация отменяется.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def run() -> Essay:
+            # Получатель виден только этой задаче и ее подзадачам
+            event_sink.set(queue.put_nowait)
+            return await self.generate_essay(json_path, docx_path)
+
+        start = time.perf_counter()
+        task = asyncio.create_task(run())
+        # None — конец событий: задача завершилась (успешно или с ошибкой)
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+            essay = await task
+            yield EssayDone(essay=essay, seconds=round(time.perf_counter() - start, 3))
+        finally:
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    async def wait_saved(self) -> None:
+        """
+        Дождаться всех фоновых записей результатов (background_save).
+        Все записи доводятся до конца, затем пробрасывается первая ошибка.
+        """
+        tasks = list(self._save_tasks)
+        self._save_tasks.difference_update(tasks)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
 
 # -------------------------------------------------------
 # Синхронный менеджер
@@ -191,34 +451,54 @@ class AIReferatManagerSync(_BaseReferatManager):
             base_url=self.base_url
         )
 
+    def _ask(self, kind: str, prompt: str, title: Optional[str] = None, parts: int = 1) -> str:
+        options, route = self._routed_options(kind, title, parts)
+        start = time.perf_counter()
+        text = self.client.get_response_sync(prompt, "", max_retries=MAX_RETRIES, **options)
+        self._record_latency(kind, route, start)
+        return text
+
+    def _ask_long(self, kind: str, prompt: str, title: str) -> str:
+        """Раздел одним запросом или, если он длинный, по частям (по очереди)."""
+        self._started(kind, title)
+        parts = self._parts(kind)
+        if parts == 1:
+            return self._ask(kind, prompt, title)
+        outline = split_outline(self._ask(OUTLINE, self.prompts.outline(title, parts), title, parts), parts)
+        texts = [
+            self._ask(kind, part_prompt, point, parts)
+            for part_prompt, point in zip(self._part_prompts(kind, title, outline), outline)
+        ]
+        return join_parts(texts, outline)
+
     def generate_plan(self):
         prompt = self.prompts.plan()
-        raw_plan = self.client.get_response_sync(content=prompt, rules="", min_length=MIN_LENGTH, max_retries=MAX_RETRIES)
+        raw_plan = self._ask(PLAN, prompt)
         plan = parse_plan(raw_plan)
         return plan
 
     def generate_content(self, plan):
         def gen_intro():
-            text = self.client.get_response_sync(self.prompts.intro(), "", min_length=MIN_LENGTH, max_retries=MAX_RETRIES)
+            text = self._ask_long(INTRODUCTION, self.prompts.intro(), plan.introduction)
+            self._progress(INTRODUCTION, plan.introduction, text)
             return Introduction(text=text)
 
         def gen_conclusion():
-            text = self.client.get_response_sync(self.prompts.conclusion(), "", min_length=MIN_LENGTH, max_retries=MAX_RETRIES)
+            text = self._ask_long(CONCLUSION, self.prompts.conclusion(), plan.conclusion)
+            self._progress(CONCLUSION, plan.conclusion, text)
             return Conclusion(text=text)
 
         def gen_references():
-            text = self.client.get_response_sync(self.prompts.references(), "", min_length=MIN_LENGTH, max_retries=MAX_RETRIES)
+            self._started(REFERENCES)
+            text = self._ask(REFERENCES, self.prompts.references())
+            self._progress(REFERENCES, text=text)
             items = [line.strip() for line in text.split("\n") if line.strip()]
             return References(items=items)
 
         def gen_chapter(plan_chapter):
             # Генерация текста для самой главы
-            chap_text = self.client.get_response_sync(
-                self.prompts.chapter(plan_chapter.title),
-                "",
-                min_length=MIN_LENGTH,
-                max_retries=MAX_RETRIES
-            )
+            chap_text = self._ask_long(CHAPTER, self.prompts.chapter(plan_chapter.title), plan_chapter.title)
+            self._progress(CHAPTER, plan_chapter.title, chap_text)
 
             subchapters = []
             if plan_chapter.subchapters:
@@ -226,13 +506,8 @@ class AIReferatManagerSync(_BaseReferatManager):
 
                 # Перебор подглав
                 for sub in plan_chapter.subchapters:
-                    print(f"▶ Генерация подглавы: {sub} ...")
-                    text = self.client.get_response_sync(
-                        self.prompts.subchapter(plan_chapter.title, sub),
-                        "",
-                        min_length=MIN_LENGTH,
-                        max_retries=MAX_RETRIES
-                    )
+                    text = self._ask_long(SUBCHAPTER, self.prompts.subchapter(plan_chapter.title, sub), sub)
+                    self._progress(SUBCHAPTER, sub, text)
                     sub_results.append(text)
 
                 # Создаём список подглав
@@ -248,11 +523,7 @@ class AIReferatManagerSync(_BaseReferatManager):
             )
 
 
-        chapters = []
-        for i, ch in enumerate(plan.chapters):
-            chapter = gen_chapter(ch)
-            chapters.append(chapter)
-            print(f"Глава {i + 1}/{len(plan.chapters)} готова: {chapter.title}")
+        chapters = [gen_chapter(ch) for ch in plan.chapters]
 
         intro = gen_intro()
         conclusion = gen_conclusion()
@@ -260,21 +531,28 @@ class AIReferatManagerSync(_BaseReferatManager):
         return intro, chapters, conclusion, references
 
     def generate_essay(self, json_path: Optional[str] = None, docx_path: Optional[str] = None):
-        json_path = json_path or self.default_json_path
-        docx_path = docx_path or self.default_docx_path
-        plan = self.generate_plan()
-        intro, chapters, conclusion, references = self.generate_content(plan)
-        self.essay = Essay(
-            topic=self.topic,
-            language=self.language,
-            plan=plan,
-            introduction=intro,
-            chapters=chapters,
-            conclusion=conclusion,
-            references=references,
-            metadata=self.metadata,
-            json_path=json_path,
-            docx_path=docx_path,
-        )
-        self._save_results(self.essay, json_path, docx_path)
-        return self.essay
+        with essay_context():
+            start = time.perf_counter()
+            log(logger, logging.INFO, "Генерация реферата", topic=self.topic)
+            json_path = json_path or self.default_json_path
+            docx_path = docx_path or self.default_docx_path
+            match = self._find_similar_topic()
+            plan = match.plan if match else self.generate_plan()
+            self._start_progress(plan, reused=match is not None)
+            intro, chapters, conclusion, references = self._reused_content() or self.generate_content(plan)
+            self.essay = Essay(
+                topic=self.topic,
+                language=self.language,
+                plan=plan,
+                introduction=intro,
+                chapters=chapters,
+                conclusion=conclusion,
+                references=references,
+                metadata=self.metadata,
+                json_path=json_path,
+                docx_path=docx_path,
+            )
+            self._save_results(self.essay, json_path, docx_path)
+            log(logger, logging.INFO, "Реферат готов", topic=self.topic, sections=self._progress_done,
+                latency=round(time.perf_counter() - start, 3), reused_plan=match is not None)
+            return self.essay
@@ -0,0 +1,119 @@
+"""
+Профилирование запусков: cProfile, tracemalloc и семплирующий профайлер.
+
+    with profiled("cprofile", "run.prof"):
+        main()
+
+- cprofile    — файл pstats (snakeviz, python -m pstats) и топ функций в stderr;
+- tracemalloc — текстовый отчет: пик памяти и строки с наибольшими аллокациями;
+- sample      — стеки главного потока раз в interval секунд в «свернутом»
+                формате (flamegraph.pl, speedscope); почти не замедляет
+                программу и видит время ожидания I/O.
+"""
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+PROFILERS = ("cprofile", "tracemalloc", "sample")
+DEFAULT_EXTENSIONS = {"cprofile": "prof", "tracemalloc": "txt", "sample": "folded"}
+TOP_LINES = 25
+TRACEMALLOC_FRAMES = 10
+SAMPLE_INTERVAL = 0.005
+
+
+def default_output(mode: str, name: str = "ai-referat") -> str:
+    return f"{name}.{DEFAULT_EXTENSIONS[mode]}"
+
+
+class StackSampler:
+    """Семплирует стек потока в фоновом потоке и считает одинаковые стеки."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write_folded(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profiled(mode: Optional[str], output: Optional[str] = None) -> Iterator[None]:
+    """Профилирует блок; mode=None — без профилирования."""
+    if mode is None:
+        yield
+        return
+    if mode not in PROFILERS:
+        raise ValueError(f"Неизвестный профайлер: {mode}, ожидается один из {PROFILERS}")
+    output = output or default_output(mode)
+    start = time.perf_counter()
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(output)
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(TOP_LINES)
+            print(stream.getvalue(), file=sys.stderr)
+
+    elif mode == "tracemalloc":
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(output, "w", encoding="utf-8") as f:
+                f.write(f"Текущая память: {current / 2 ** 20:.1f} MiB, пик: {peak / 2 ** 20:.1f} MiB\n\n")
+                for stat in snapshot.statistics("lineno")[:TOP_LINES * 2]:
+                    f.write(f"{stat}\n")
+            print(f"tracemalloc: пик {peak / 2 ** 20:.1f} MiB", file=sys.stderr)
+
+    else:
+        sampler = StackSampler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            sampler.write_folded(output)
+            print(f"sample: {sampler.samples} семплов", file=sys.stderr)
+
+    print(f"Профиль ({mode}, {time.perf_counter() - start:.2f} c): {output}", file=sys.stderr)
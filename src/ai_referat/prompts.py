@@ -1,3 +1,6 @@
+from typing import List
+
+
 class EssayPrompts:
     def __init__(
         self,
@@ -60,6 +63,35 @@ class EssayPrompts:
 #Не надо записывать номер название главы и подглавы - только контент текст.  
 #"""
 
+    def outline(self, section_title: str, parts: int) -> str:
+        return f"""
+Составь краткий план раздела "{section_title}" для реферата на тему "{self.topic}" на {self.language}.
+Ровно {parts} пунктов в порядке изложения, каждый с новой строки: "1. Пункт".
+Ответ — только пункты, без комментариев и пояснений.
+"""
+
+    def part(self, section_title: str, outline: List[str], index: int, chars: int) -> str:
+        points = "\n".join(f"{i + 1}. {point}" for i, point in enumerate(outline))
+        if index == 0:
+            start = "Начни с короткой вводной мысли ко всему разделу."
+        else:
+            start = f'Не пиши вступление: текст продолжает часть "{outline[index - 1]}".'
+        if index == len(outline) - 1:
+            end = "Закончи раздел коротким выводом."
+        else:
+            end = f'Не делай выводов: дальше идет часть "{outline[index + 1]}".'
+        return f"""
+Напиши часть {index + 1} из {len(outline)} раздела "{section_title}" для реферата на тему "{self.topic}" на {self.language}.
+План раздела:
+{points}
+
+Эта часть раскрывает только пункт {index + 1}: "{outline[index]}". {start} {end}
+Не пиши заголовок и номер части. Объем части — около {chars} символов
+(правило об объеме главы ниже относится ко всему разделу).
+
+{self.rules}
+"""
+
     def conclusion(self) -> str:
         return f"""
 Составь заключение для реферата на тему "{self.topic}" на {self.language}.
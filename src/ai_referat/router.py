@@ -0,0 +1,189 @@
+"""
+Выбор модели для каждого вида раздела.
+
+План и список литературы — короткие ответы, для них хватает маленькой
+быстрой модели; главы и подглавы пишет более сильная. ModelRouter
+хранит маршрут (модель, провайдер) на вид раздела и задержки ответов:
+если p95 задержки модели маршрута за последние window_seconds выше
+latency_target, запросы уходят на запасную (более быструю) модель, пока
+старые замеры не выйдут из окна.
+
+Один роутер можно разделять между менеджерами (сервис, пакетная
+генерация) — тогда p95 считается по всему трафику процесса.
+
+Пример:
+    router = ModelRouter.tiered("gpt-4o-mini", "gpt-4o", latency_target=40)
+    manager = AIReferatManagerAsync(topic="История HTML", router=router)
+
+    # или по разделам: вид=модель[,fallback=модель][,p95=секунды][,provider=имя]
+    router = ModelRouter.from_specs(["plan=gpt-4o-mini", "chapter=gpt-4o,fallback=gpt-4o-mini,p95=30"])
+"""
+import argparse
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from ai_referat.budget import (CHAPTER, CONCLUSION, INTRODUCTION, OUTLINE, PLAN,
+                               REFERENCES, SUBCHAPTER)
+
+SECTION_KINDS = (PLAN, INTRODUCTION, CHAPTER, SUBCHAPTER, CONCLUSION, REFERENCES, OUTLINE)
+# Короткие ответы, не зависящие от объема реферата
+SHORT_SECTIONS = (PLAN, REFERENCES, OUTLINE)
+
+LATENCY_WINDOW_SECONDS = 300.0
+LATENCY_MAX_SAMPLES = 200
+# Меньше замеров — p95 не считается и запасная модель не включается
+LATENCY_MIN_SAMPLES = 5
+
+
+class ModelRoute(NamedTuple):
+    model: str
+    provider: Optional[str] = None
+    fallback: Optional[str] = None
+    latency_target: Optional[float] = None
+
+    def as_kwargs(self) -> Dict[str, str]:
+        """Параметры запроса клиента: model и, если задан, provider."""
+        kwargs = {"model": self.model}
+        if self.provider:
+            kwargs["provider"] = self.provider
+        return kwargs
+
+
+def parse_route(spec: str) -> Tuple[str, ModelRoute]:
+    """'chapter=gpt-4o,fallback=gpt-4o-mini,p95=30,provider=openai' -> (вид, маршрут)."""
+    head, *options = [part.strip() for part in spec.split(",")]
+    kind, sep, model = head.partition("=")
+    if not sep or not model or kind not in SECTION_KINDS:
+        raise ValueError(f"Неверный маршрут: {spec!r}, ожидается вид=модель, вид один из {SECTION_KINDS}")
+    fields = {}
+    for option in options:
+        key, sep, value = option.partition("=")
+        if not sep or key not in ("fallback", "p95", "provider"):
+            raise ValueError(f"Неверный параметр маршрута {option!r} в {spec!r}")
+        fields[key] = value
+    route = ModelRoute(
+        model=model,
+        provider=fields.get("provider") or None,
+        fallback=fields.get("fallback") or None,
+        latency_target=float(fields["p95"]) if "p95" in fields else None,
+    )
+    return kind, route
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль q (0..1) по ближайшему рангу."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        routes: Optional[Dict[str, ModelRoute]] = None,
+        window_seconds: float = LATENCY_WINDOW_SECONDS,
+        max_samples: int = LATENCY_MAX_SAMPLES,
+        min_samples: int = LATENCY_MIN_SAMPLES
+    ):
+        """
+        :param routes: вид раздела -> маршрут; для остальных видов — модель менеджера
+        :param window_seconds: окно замеров задержки для p95
+        :param min_samples: минимум замеров в окне для перехода на запасную модель
+        """
+        for kind in routes or {}:
+            if kind not in SECTION_KINDS:
+                raise ValueError(f"Неизвестный вид раздела: {kind}, ожидается один из {SECTION_KINDS}")
+        self.routes = dict(routes or {})
+        self.window_seconds = window_seconds
+        self.max_samples = max_samples
+        self.min_samples = min_samples
+        # (вид, модель) -> (время, задержка): p95 главы и плана одной модели несравнимы
+        self._latencies: Dict[Tuple[str, str], Deque[Tuple[float, float]]] = {}
+        self.fallbacks = 0
+
+    @classmethod
+    def tiered(
+        cls,
+        fast_model: str,
+        strong_model: str,
+        latency_target: Optional[float] = None,
+        provider: Optional[str] = None,
+        **kwargs
+    ) -> "ModelRouter":
+        """Быстрая модель для планов и литературы, сильная (с запасной быстрой) — для остального."""
+        routes = {}
+        for kind in SECTION_KINDS:
+            if kind in SHORT_SECTIONS:
+                routes[kind] = ModelRoute(fast_model, provider)
+            else:
+                routes[kind] = ModelRoute(strong_model, provider, fast_model if latency_target else None, latency_target)
+        return cls(routes, **kwargs)
+
+    @classmethod
+    def from_specs(cls, specs: Iterable[str], **kwargs) -> "ModelRouter":
+        return cls(dict(parse_route(spec) for spec in specs), **kwargs)
+
+    def _samples(self, kind: str, model: str) -> Deque[Tuple[float, float]]:
+        samples = self._latencies.get((kind, model))
+        if samples is None:
+            samples = self._latencies[(kind, model)] = deque(maxlen=self.max_samples)
+        # Устаревшие замеры выходят из окна — так модель после перегрузки снова получает запросы
+        horizon = time.monotonic() - self.window_seconds
+        while samples and samples[0][0] < horizon:
+            samples.popleft()
+        return samples
+
+    def p95(self, kind: str, model: str) -> Optional[float]:
+        samples = self._samples(kind, model)
+        if len(samples) < self.min_samples:
+            return None
+        return percentile([latency for _, latency in samples], 0.95)
+
+    def route(self, kind: str) -> Optional[ModelRoute]:
+        """Маршрут запроса раздела; None — вид не настроен, запрос идет на модель клиента."""
+        route = self.routes.get(kind)
+        if route is None:
+            return None
+        if route.fallback and route.latency_target is not None:
+            p95 = self.p95(kind, route.model)
+            if p95 is not None and p95 > route.latency_target:
+                self.fallbacks += 1
+                return ModelRoute(route.fallback, route.provider)
+        return route
+
+    def record(self, kind: str, model: str, latency: float) -> None:
+        """Задержка ответа раздела (с учетом повторов)."""
+        self._samples(kind, model).append((time.monotonic(), latency))
+
+    def stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """p95 и число замеров по "вид:модель"."""
+        result = {}
+        for kind, model in list(self._latencies):
+            samples = self._samples(kind, model)
+            result[f"{kind}:{model}"] = {
+                "samples": len(samples),
+                "p95": percentile([latency for _, latency in samples], 0.95) if samples else None,
+            }
+        return result
+
+
+# ---------------- Командная строка ----------------
+def add_router_arguments(parser) -> None:
+    """--route и --fast-model/--latency-target для парсера или группы аргументов."""
+    parser.add_argument("--route", action="append", default=[], metavar="ВИД=МОДЕЛЬ[,fallback=М][,p95=С][,provider=П]",
+                        help=f"Модель для вида раздела ({', '.join(SECTION_KINDS)}); можно повторять")
+    parser.add_argument("--fast-model", default=None,
+                        help="Быстрая модель для плана и литературы; --model пишет остальные разделы")
+    parser.add_argument("--latency-target", type=float, default=None,
+                        help="p95 задержки раздела (с), выше которой разделы идут на --fast-model")
+
+
+def router_from_args(args: argparse.Namespace) -> Optional[ModelRouter]:
+    """Роутер из аргументов add_router_arguments; None — одна модель на все разделы."""
+    if not args.route and not args.fast_model:
+        return None
+    router = ModelRouter.tiered(args.fast_model, args.model, args.latency_target) if args.fast_model else ModelRouter()
+    # Явные --route важнее быстрой/сильной схемы
+    router.routes.update(parse_route(spec) for spec in args.route)
+    return router
@@ -0,0 +1,188 @@
+"""
+Контентно-адресуемое хранилище текстов разделов.
+
+Тексты введения, глав, подглав и заключения сохраняются один раз под
+своим sha256 (objects/ab/cdef..., сжатие zlib), а реферат — манифестом
+(manifests/<имя>.json): тот же JSON Essay, в котором поле text каждого
+раздела заменено на text_ref с хешем. Перегенерации и копии с
+совпадающими разделами не дублируют тексты, а сравнение версий сводится
+к сравнению хешей.
+
+Тексты, на которые не ссылается ни один манифест, удаляет gc().
+
+Пример:
+    store = SectionStore("./results/sections")
+    store.save(essay, "history-html-v2")
+    store.diff("history-html-v1", "history-html-v2")
+    store.gc()
+"""
+import hashlib
+import os
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple
+
+from ai_referat.json_writer import dumps_json, load_json, loads_json, write_atomic
+from ai_referat.models import Essay
+
+OBJECTS_DIR = "objects"
+MANIFESTS_DIR = "manifests"
+REF_KEY = "text_ref"
+# Объекты моложе этого срока gc не трогает: их манифест может еще писаться
+GC_GRACE_SECONDS = 3600
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# --- Изменившийся раздел при сравнении версий ---
+class SectionChange(NamedTuple):
+    path: str
+    old: str
+    new: str
+
+
+# --- Итоги сборки мусора ---
+class GCResult(NamedTuple):
+    removed: int
+    freed_bytes: int
+    kept: int
+
+
+def _section_nodes(data: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Узлы с текстом раздела: (путь, словарь с text/text_ref)."""
+    yield "introduction", data["introduction"]
+    for i, chapter in enumerate(data.get("chapters", ())):
+        yield f"chapters[{i}]", chapter
+        for j, sub in enumerate(chapter.get("subchapters", ())):
+            yield f"chapters[{i}].subchapters[{j}]", sub
+    yield "conclusion", data["conclusion"]
+
+
+class SectionStore:
+    def __init__(self, root: str, compress_level: int = 6):
+        self.root = root
+        self.compress_level = compress_level
+        os.makedirs(os.path.join(root, OBJECTS_DIR), exist_ok=True)
+        os.makedirs(os.path.join(root, MANIFESTS_DIR), exist_ok=True)
+
+    # ---------------- Тексты ----------------
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, OBJECTS_DIR, digest[:2], digest[2:])
+
+    def put_text(self, text: str) -> str:
+        """Сохраняет текст (если его еще нет) и возвращает хеш."""
+        digest = text_digest(text)
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            # Обновляем mtime, чтобы параллельный gc не удалил объект до записи манифеста
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_atomic(path, zlib.compress(text.encode("utf-8"), self.compress_level))
+        return digest
+
+    def get_text(self, digest: str) -> str:
+        with open(self._object_path(digest), "rb") as f:
+            return zlib.decompress(f.read()).decode("utf-8")
+
+    def iter_objects(self) -> Iterator[str]:
+        objects = os.path.join(self.root, OBJECTS_DIR)
+        for prefix in os.listdir(objects):
+            directory = os.path.join(objects, prefix)
+            for rest in os.listdir(directory):
+                if not rest.startswith(".tmp-"):
+                    yield prefix + rest
+
+    # ---------------- Манифесты ----------------
+    def _manifest_path(self, name: str) -> str:
+        return os.path.join(self.root, MANIFESTS_DIR, f"{name}.json")
+
+    def save(self, essay: Essay, name: str) -> str:
+        """Сохраняет реферат: тексты — объектами, сам реферат — манифестом."""
+        data = essay.model_dump()
+        for _, node in _section_nodes(data):
+            node[REF_KEY] = self.put_text(node.pop("text"))
+        path = self._manifest_path(name)
+        write_atomic(path, dumps_json(data))
+        return path
+
+    def manifest(self, name: str) -> Dict[str, Any]:
+        with open(self._manifest_path(name), "rb") as f:
+            return loads_json(f.read())
+
+    def load(self, name: str) -> Essay:
+        data = self.manifest(name)
+        for _, node in _section_nodes(data):
+            node["text"] = self.get_text(node.pop(REF_KEY))
+        return Essay.model_validate(data)
+
+    def names(self) -> List[str]:
+        return sorted(
+            name[:-len(".json")] for name in os.listdir(os.path.join(self.root, MANIFESTS_DIR))
+            if name.endswith(".json")
+        )
+
+    def delete(self, name: str) -> None:
+        """Удаляет манифест; тексты освобождает следующий gc()."""
+        os.unlink(self._manifest_path(name))
+
+    def import_json_files(self, paths: Iterable[str]) -> List[str]:
+        """Переносит JSON рефераты в хранилище; имя манифеста — имя файла."""
+        names = []
+        for path in paths:
+            name = os.path.basename(path)
+            # essay.v1.json.gz -> essay.v1: точки внутри имени различают версии
+            if name.endswith(".gz"):
+                name = name[:-len(".gz")]
+            name = os.path.splitext(name)[0]
+            self.save(load_json(path), name)
+            names.append(name)
+        return names
+
+    # ---------------- Сравнение версий ----------------
+    def section_refs(self, name: str) -> Dict[str, str]:
+        """Хеши разделов реферата по путям (introduction, chapters[0], ...)."""
+        return {path: node[REF_KEY] for path, node in _section_nodes(self.manifest(name))}
+
+    def diff(self, old_name: str, new_name: str) -> List[SectionChange]:
+        """Разделы, тексты которых отличаются; тексты при этом не читаются."""
+        old, new = self.section_refs(old_name), self.section_refs(new_name)
+        return [
+            SectionChange(path, old.get(path, ""), new.get(path, ""))
+            for path in sorted(old.keys() | new.keys())
+            if old.get(path) != new.get(path)
+        ]
+
+    # ---------------- Сборка мусора ----------------
+    def referenced(self) -> Set[str]:
+        refs: Set[str] = set()
+        for name in self.names():
+            refs.update(self.section_refs(name).values())
+        return refs
+
+    def gc(self, grace_seconds: float = GC_GRACE_SECONDS, dry_run: bool = False) -> GCResult:
+        """
+        Удаляет тексты, на которые не ссылается ни один манифест.
+
+        :param grace_seconds: не трогать объекты моложе этого срока
+        :param dry_run: только посчитать
+        """
+        refs = self.referenced()
+        deadline = time.time() - grace_seconds
+        removed = freed = kept = 0
+        for digest in list(self.iter_objects()):
+            if digest in refs:
+                kept += 1
+                continue
+            path = self._object_path(digest)
+            stat = os.stat(path)
+            if stat.st_mtime > deadline:
+                kept += 1
+                continue
+            if not dry_run:
+                os.unlink(path)
+            removed += 1
+            freed += stat.st_size
+        return GCResult(removed, freed, kept)
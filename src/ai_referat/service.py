@@ -0,0 +1,488 @@
+"""
+HTTP сервис генерации рефератов на aiohttp.
+
+Задания выполняются в одном event loop: запрос ставит задание в очередь
+и сразу возвращает его id, а генерация идет в фоне. Одновременно пишется
+не больше max_jobs рефератов; число запросов к каждому провайдеру
+дополнительно подстраивают AIMD ограничители клиентов. Клиенты общие для
+всех заданий с одинаковыми моделью, ключом и адресом API. JSON и DOCX
+записываются в пуле процессов, не блокируя event loop.
+
+Эндпоинты:
+    POST   /jobs                 — новое задание (JSON с полями JobRequest)
+    GET    /jobs                 — список заданий
+    GET    /jobs/{id}            — статус и прогресс
+    GET    /jobs/{id}/events     — прогресс в виде Server-Sent Events
+    GET    /jobs/{id}/result.json, /jobs/{id}/result.docx — результат
+    DELETE /jobs/{id}            — отмена
+    GET    /metrics              — метрики в текстовом формате Prometheus
+    GET    /health
+
+Пример:
+    python -m ai_referat.service --port 8080 --max-jobs 8
+    curl -X POST localhost:8080/jobs -d '{"topic": "История HTML"}'
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+from pydantic import BaseModel, Field, ValidationError
+
+from ai_referat import pipeline, pipeline_g4f
+from ai_referat.client import AIClientAsync
+from ai_referat.client_g4f import AIClientAsync as AIClientAsyncFree
+from ai_referat.build_manifest import BuildManifest, write_docx_output, write_json_output
+from ai_referat.concurrency import limiter_stats
+from ai_referat.config import AI_API_KEY, AI_BASE_URL, AI_MODEL
+from ai_referat.config import CHUNK_PAGES as CFG_CHUNK_PAGES
+from ai_referat.config import LANGUAGE as CFG_LANGUAGE
+from ai_referat.config import MAX_CHAPTERS as CFG_MAX_CHAPTERS
+from ai_referat.config import MAX_CHARS_PER_PAGE as CFG_CHARS_PER_PAGE
+from ai_referat.config import MAX_PAGES as CFG_MAX_PAGES
+from ai_referat.config import MAX_SUBCHAPTERS as CFG_MAX_SUBCHAPTERS
+from ai_referat.config import MIN_PAGES as CFG_MIN_PAGES
+from ai_referat.config import RESULTS_DOCX_DIR, RESULTS_JSON_DIR
+from ai_referat.json_writer import dumps_json
+from ai_referat.log import FORMATS as LOG_FORMATS
+from ai_referat.log import configure_logging, get_logger, log, log_context
+from ai_referat.models import Essay
+from ai_referat.router import ModelRouter, add_router_arguments, router_from_args
+
+logger = get_logger(__name__)
+
+# --- Статусы задания ---
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Провайдер -> (асинхронный менеджер, асинхронный клиент)
+PROVIDERS = {
+    "openai": (pipeline.AIReferatManagerAsync, AIClientAsync),
+    "g4f": (pipeline_g4f.AIReferatManagerAsync, AIClientAsyncFree),
+}
+# Пауза между комментариями keep-alive в SSE
+SSE_PING_SECONDS = 15.0
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+# --- Параметры задания ---
+class JobRequest(BaseModel):
+    topic: str = Field(..., min_length=1, description="Тема реферата")
+    language: str = Field(CFG_LANGUAGE, description="Язык реферата")
+    author: str = Field("Автор", description="Автор")
+    group: str = Field("Группа", description="Группа")
+    discipline: str = Field("Дисциплина", description="Дисциплина")
+    department: str = Field("Кафедра", description="Кафедра")
+    checked_by: str = Field("", description="Проверил")
+    year: str = Field("2024", description="Год")
+    city: str = Field("Бишкек", description="Город")
+    max_chapters: int = Field(CFG_MAX_CHAPTERS, ge=1, le=20, description="Максимум глав")
+    max_subchapters: int = Field(CFG_MAX_SUBCHAPTERS, ge=0, le=20, description="Максимум подглав")
+    min_pages: int = Field(CFG_MIN_PAGES, ge=1, description="Минимум страниц")
+    max_pages: int = Field(CFG_MAX_PAGES, ge=1, description="Максимум страниц")
+    chars_per_page: int = Field(CFG_CHARS_PER_PAGE, ge=100, description="Символов на странице")
+    chunk_pages: float = Field(CFG_CHUNK_PAGES, ge=0, description="Страниц на часть длинной главы (0 — не делить)")
+    docx: bool = Field(True, description="Создавать DOCX")
+
+
+def write_outputs(
+    essay: Essay,
+    json_path: str,
+    docx_path: Optional[str],
+    manifest: Optional[BuildManifest] = None
+) -> None:
+    """
+    Запись результатов задания (выполняется в пуле процессов).
+
+    :param manifest: пропускать неизменившиеся файлы; только для пула
+                     потоков — в дочерний процесс манифест не передать
+    """
+    data = dumps_json(essay)
+    write_json_output(essay, json_path, manifest=manifest, data=data)
+    if docx_path:
+        write_docx_output(essay, docx_path, manifest=manifest, data=data)
+
+
+class Job:
+    def __init__(self, job_id: str, request: JobRequest):
+        self.id = job_id
+        self.request = request
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.done = 0
+        self.total = 0
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.json_path: Optional[str] = None
+        self.docx_path: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+        self.events: List[Dict[str, Any]] = []
+        self._changed = asyncio.Event()
+
+    # ---------------- События ----------------
+    def emit(self, event: str, **data) -> None:
+        self.events.append({"event": event, **data})
+        # Будим всех подписчиков SSE и заводим новое событие для следующих
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_change(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def set_status(self, status: str, error: Optional[str] = None) -> None:
+        self.status = status
+        self.error = error
+        now = time.time()
+        if status == RUNNING:
+            self.started = now
+        elif status in FINISHED:
+            self.finished = now
+        self.emit("status", status=status, error=error)
+
+    def on_progress(self, kind: str, title: Optional[str], done: int, total: int) -> None:
+        self.done, self.total = done, total
+        self.emit("section", kind=kind, title=title, done=done, total=total)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "topic": self.request.topic,
+            "status": self.status,
+            "error": self.error,
+            "progress": {"done": self.done, "total": self.total},
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "links": {
+                "self": f"/jobs/{self.id}",
+                "events": f"/jobs/{self.id}/events",
+                "json": f"/jobs/{self.id}/result.json" if self.json_path else None,
+                "docx": f"/jobs/{self.id}/result.docx" if self.docx_path else None,
+            },
+        }
+
+
+class EssayService:
+    def __init__(
+        self,
+        provider: str = "openai",
+        model: str = AI_MODEL,
+        api_key: Optional[str] = AI_API_KEY or None,
+        base_url: Optional[str] = AI_BASE_URL or None,
+        max_jobs: int = 4,
+        json_dir: str = RESULTS_JSON_DIR,
+        docx_dir: str = RESULTS_DOCX_DIR,
+        executor: Optional[Executor] = None,
+        render_workers: int = 2,
+        max_finished: int = 1000,
+        router: Optional[ModelRouter] = None
+    ):
+        """
+        :param max_jobs: рефератов, генерируемых одновременно
+        :param executor: пул для записи JSON/DOCX (по умолчанию ProcessPoolExecutor)
+        :param max_finished: сколько завершенных заданий хранить в памяти
+        :param router: модели по видам разделов, общий для всех заданий (p95 по всему трафику)
+        """
+        if provider not in PROVIDERS:
+            raise ValueError(f"Неизвестный провайдер: {provider}")
+        self.manager_class, self.client_class = PROVIDERS[provider]
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.json_dir = json_dir
+        self.docx_dir = docx_dir
+        self.max_jobs = max_jobs
+        self.max_finished = max_finished
+        self.router = router
+        self.executor = executor or ProcessPoolExecutor(max_workers=render_workers)
+
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._slots = asyncio.Semaphore(max_jobs)
+        self._clients: Dict[Tuple[str, Optional[str], Optional[str]], Any] = {}
+        self.submitted = 0
+        self.sections = 0
+        self.job_seconds = 0.0
+        self.jobs_finished = 0
+
+        os.makedirs(json_dir, exist_ok=True)
+        os.makedirs(docx_dir, exist_ok=True)
+
+    # ---------------- Задания ----------------
+    def client(self):
+        """Общий клиент для модели, ключа и адреса API."""
+        key = (self.model, self.api_key, self.base_url)
+        if key not in self._clients:
+            self._clients[key] = self.client_class(model=self.model, api_key=self.api_key, base_url=self.base_url)
+        return self._clients[key]
+
+    def submit(self, request: JobRequest) -> Job:
+        job = Job(uuid.uuid4().hex, request)
+        self.jobs[job.id] = job
+        self.submitted += 1
+        self._evict()
+        job.emit("status", status=QUEUED, error=None)
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def cancel(self, job: Job) -> bool:
+        if job.status in FINISHED or job.task is None:
+            return False
+        return job.task.cancel()
+
+    def _evict(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self.jobs[job_id]
+
+    def _make_manager(self, job: Job):
+        params = job.request.model_dump(exclude={"docx"})
+        manager = self.manager_class(
+            model=self.model, api_key=self.api_key, base_url=self.base_url,
+            router=self.router, on_progress=job.on_progress, **params
+        )
+        manager.client = self.client()
+        return manager
+
+    async def _run(self, job: Job) -> None:
+        with log_context(essay_id=job.id):
+            await self._run_job(job)
+
+    async def _run_job(self, job: Job) -> None:
+        try:
+            async with self._slots:
+                job.set_status(RUNNING)
+                manager = self._make_manager(job)
+                # Пути не передаются менеджеру: запись идет в пуле процессов ниже
+                essay = await manager.generate_essay()
+                self.sections += job.total
+
+                json_path = os.path.join(self.json_dir, f"{job.id}.json")
+                docx_path = os.path.join(self.docx_dir, f"{job.id}.docx") if job.request.docx else None
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self.executor, write_outputs, essay, json_path, docx_path)
+                job.json_path, job.docx_path = json_path, docx_path
+                job.set_status(DONE)
+        except asyncio.CancelledError:
+            job.set_status(CANCELLED)
+            log(logger, logging.INFO, "Задание отменено")
+        except Exception as e:
+            job.set_status(FAILED, error=str(e))
+            log(logger, logging.ERROR, "Задание завершилось ошибкой", error=str(e), error_type=type(e).__name__)
+        finally:
+            if job.started is not None and job.finished is not None:
+                self.job_seconds += job.finished - job.started
+                self.jobs_finished += 1
+
+    # ---------------- Метрики ----------------
+    def metrics(self) -> str:
+        counts = {status: 0 for status in (QUEUED, RUNNING) + FINISHED}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        lines = [
+            "# TYPE ai_referat_jobs gauge",
+            *(f'ai_referat_jobs{{status="{status}"}} {count}' for status, count in counts.items()),
+            "# TYPE ai_referat_jobs_submitted_total counter",
+            f"ai_referat_jobs_submitted_total {self.submitted}",
+            "# TYPE ai_referat_sections_total counter",
+            f"ai_referat_sections_total {self.sections}",
+            "# TYPE ai_referat_job_seconds summary",
+            f"ai_referat_job_seconds_sum {self.job_seconds:.3f}",
+            f"ai_referat_job_seconds_count {self.jobs_finished}",
+            "# TYPE ai_referat_max_jobs gauge",
+            f"ai_referat_max_jobs {self.max_jobs}",
+        ]
+        stats = limiter_stats()
+        for name, kind in (("limit", "gauge"), ("in_flight", "gauge"), ("waiting", "gauge"),
+                           ("successes", "counter"), ("overloads", "counter")):
+            metric = f"ai_referat_limiter_{name}" + ("_total" if kind == "counter" else "")
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.extend(f'{metric}{{key="{key}"}} {getattr(value, name):g}' for key, value in stats.items())
+        if self.router is not None:
+            lines.append("# TYPE ai_referat_section_latency_p95_seconds gauge")
+            for key, value in self.router.stats().items():
+                kind, _, model = key.partition(":")
+                if value["p95"] is not None:
+                    lines.append(f'ai_referat_section_latency_p95_seconds{{section="{kind}",model="{model}"}} {value["p95"]:.3f}')
+            lines.append("# TYPE ai_referat_model_fallbacks_total counter")
+            lines.append(f"ai_referat_model_fallbacks_total {self.router.fallbacks}")
+        return "\n".join(lines) + "\n"
+
+    async def close(self) -> None:
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.executor.shutdown(wait=False)
+
+
+# ---------------- HTTP ----------------
+SERVICE_KEY = web.AppKey("service", EssayService)
+
+
+def _json_error(status: int, message: str, **extra) -> web.Response:
+    return web.json_response({"error": message, **extra}, status=status)
+
+
+def _get_job(request: web.Request) -> Job:
+    job = request.app[SERVICE_KEY].jobs.get(request.match_info["job_id"])
+    if job is None:
+        raise web.HTTPNotFound(text=json.dumps({"error": "задание не найдено"}), content_type="application/json")
+    return job
+
+
+async def handle_submit(request: web.Request) -> web.Response:
+    try:
+        job_request = JobRequest.model_validate(await request.json())
+    except json.JSONDecodeError:
+        return _json_error(400, "тело запроса должно быть JSON")
+    except ValidationError as e:
+        return _json_error(400, "неверные параметры", details=json.loads(e.json()))
+    job = request.app[SERVICE_KEY].submit(job_request)
+    return web.json_response(job.info(), status=202)
+
+
+async def handle_list(request: web.Request) -> web.Response:
+    return web.json_response([job.info() for job in request.app[SERVICE_KEY].jobs.values()])
+
+
+async def handle_status(request: web.Request) -> web.Response:
+    return web.json_response(_get_job(request).info())
+
+
+async def handle_cancel(request: web.Request) -> web.Response:
+    job = _get_job(request)
+    if not request.app[SERVICE_KEY].cancel(job):
+        return _json_error(409, "задание уже завершено")
+    return web.json_response(job.info(), status=202)
+
+
+async def handle_events(request: web.Request) -> web.StreamResponse:
+    job = _get_job(request)
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    await response.prepare(request)
+    sent = 0
+    while True:
+        # Сначала уже накопленные события, затем новые по мере появления
+        while sent < len(job.events):
+            event = job.events[sent]
+            sent += 1
+            payload = json.dumps(event, ensure_ascii=False)
+            await response.write(f"id: {sent}\nevent: {event['event']}\ndata: {payload}\n\n".encode("utf-8"))
+        if job.status in FINISHED:
+            break
+        await job.wait_change(SSE_PING_SECONDS)
+        if sent == len(job.events):
+            await response.write(b": ping\n\n")
+    await response.write_eof()
+    return response
+
+
+async def _result_file(request: web.Request, path_attr: str, content_type: str, ext: str) -> web.StreamResponse:
+    job = _get_job(request)
+    path = getattr(job, path_attr)
+    if job.status != DONE:
+        return _json_error(409, f"задание в статусе {job.status}")
+    if not path or not os.path.exists(path):
+        return _json_error(404, "файл результата отсутствует")
+    return web.FileResponse(path, headers={
+        "Content-Type": content_type,
+        "Content-Disposition": f'attachment; filename="{job.id}.{ext}"',
+    })
+
+
+async def handle_result_json(request: web.Request) -> web.StreamResponse:
+    return await _result_file(request, "json_path", "application/json", "json")
+
+
+async def handle_result_docx(request: web.Request) -> web.StreamResponse:
+    return await _result_file(request, "docx_path", DOCX_CONTENT_TYPE, "docx")
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=request.app[SERVICE_KEY].metrics(), content_type="text/plain", charset="utf-8")
+
+
+async def handle_health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+def create_app(service_factory=EssayService, **service_kwargs) -> web.Application:
+    """
+    Приложение aiohttp. Сервис создается при старте приложения, уже внутри
+    event loop (service_factory(**service_kwargs)).
+    """
+    app = web.Application()
+
+    async def on_startup(app: web.Application) -> None:
+        app[SERVICE_KEY] = service_factory(**service_kwargs)
+
+    async def on_cleanup(app: web.Application) -> None:
+        await app[SERVICE_KEY].close()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/jobs", handle_submit)
+    app.router.add_get("/jobs", handle_list)
+    app.router.add_get("/jobs/{job_id}", handle_status)
+    app.router.add_delete("/jobs/{job_id}", handle_cancel)
+    app.router.add_get("/jobs/{job_id}/events", handle_events)
+    app.router.add_get("/jobs/{job_id}/result.json", handle_result_json)
+    app.router.add_get("/jobs/{job_id}/result.docx", handle_result_docx)
+    app.router.add_get("/metrics", handle_metrics)
+    app.router.add_get("/health", handle_health)
+    return app
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="HTTP сервис генерации рефератов")
+    parser.add_argument("--host", default="127.0.0.1", help="Адрес (по умолчанию 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Порт (по умолчанию 8080)")
+    parser.add_argument("--provider", choices=sorted(PROVIDERS), default="openai", help="Клиент модели")
+    parser.add_argument("--model", default=AI_MODEL, help="Модель")
+    add_router_arguments(parser)
+    parser.add_argument("--max-jobs", type=int, default=4, help="Рефератов одновременно")
+    parser.add_argument("--render-workers", type=int, default=2, help="Процессов для записи DOCX")
+    parser.add_argument("--json-dir", default=RESULTS_JSON_DIR, help="Каталог JSON результатов")
+    parser.add_argument("--docx-dir", default=RESULTS_DOCX_DIR, help="Каталог DOCX результатов")
+    parser.add_argument("--log-level", default="INFO", help="Уровень логов (DEBUG, INFO, WARNING, ...)")
+    parser.add_argument("--log-format", choices=LOG_FORMATS, default="text", help="Формат логов")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_arg_parser().parse_args(argv)
+    configure_logging(args.log_level, fmt=args.log_format)
+    app = create_app(
+        provider=args.provider,
+        model=args.model,
+        router=router_from_args(args),
+        max_jobs=args.max_jobs,
+        render_workers=args.render_workers,
+        json_dir=args.json_dir,
+        docx_dir=args.docx_dir,
+    )
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Локальный OpenAI-совместимый сервер-заглушка для нагрузочных тестов.
+
+Отвечает на POST /v1/chat/completions как OpenAI API, но без модели:
+на запрос плана — план в формате parse_plan (и пункты для плана
+длинного раздела), на остальные — русский
+текст длиной около max_tokens. Через StubConfig в ответы вносятся сбои:
+
+- latency/jitter     — логнормальная задержка (медиана latency, сигма jitter);
+- chars_per_second   — скорость «генерации»: длинный ответ идет дольше;
+- rate_limit         — доля ответов 429 с заголовком Retry-After;
+- capacity           — предел одновременных запросов, сверх него тоже 429;
+- timeout_rate/hang  — доля запросов, которые «висят» hang секунд;
+- short_rate         — доля слишком коротких ответов (клиент их повторит).
+
+GET /stats — счетчики по исходам, POST /reset — обнулить их,
+GET/POST /config — текущие параметры сбоев (можно менять на ходу).
+
+Запуск:
+    python -m ai_referat.stub_server --port 8999 --latency 0.5 --rate-limit 0.05
+    AI_BASE_URL=http://127.0.0.1:8999/v1 AI_API_KEY=stub ai-referat generate "История HTML"
+"""
+import argparse
+import asyncio
+import math
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from typing import List, Optional
+
+from aiohttp import web
+from pydantic import BaseModel, Field, ValidationError
+
+DEFAULT_PORT = 8999
+# Символов ответа на токен max_tokens: русский текст, с запасом вниз (как в TokenBudget)
+CHARS_PER_TOKEN = 2.0
+DEFAULT_CHARS = 2000
+SHORT_CHARS = 40
+PLAN_MARKER = "Составь план"
+# План длинного раздела (EssayPrompts.outline)
+OUTLINE_POINTS = re.compile(r"Ровно (\d+) пунктов")
+
+# --- Исходы запросов (ключи /stats) ---
+OK = "ok"
+RATE_LIMITED = "rate_limited"
+OVER_CAPACITY = "over_capacity"
+HUNG = "hung"
+SHORT = "short"
+BAD_REQUEST = "bad_request"
+OUTCOMES = (OK, RATE_LIMITED, OVER_CAPACITY, HUNG, SHORT, BAD_REQUEST)
+
+
+class StubConfig(BaseModel):
+    latency: float = Field(0.2, ge=0, description="Медиана задержки ответа, с")
+    jitter: float = Field(0.5, ge=0, description="Сигма логнормального разброса задержки")
+    chars: int = Field(0, ge=0, description="Длина ответа; 0 — по max_tokens запроса")
+    chars_per_second: float = Field(0.0, ge=0, description="Скорость генерации ответа; 0 — мгновенно")
+    rate_limit: float = Field(0.0, ge=0, le=1, description="Доля ответов 429")
+    retry_after: float = Field(1.0, ge=0, description="Retry-After ответа 429, с")
+    capacity: int = Field(0, ge=0, description="Одновременных запросов, сверх — 429; 0 — без предела")
+    timeout_rate: float = Field(0.0, ge=0, le=1, description="Доля «зависающих» запросов")
+    hang: float = Field(30.0, ge=0, description="Сколько висит зависший запрос, с")
+    short_rate: float = Field(0.0, ge=0, le=1, description="Доля коротких ответов")
+    seed: Optional[int] = None
+
+
+# ---------------- Ответы ----------------
+def plan_text(prompt: str) -> str:
+    """План по пределам глав и подглав из запроса плана."""
+    chapters = re.search(r"до (\d+) глав", prompt)
+    subchapters = re.search(r"до (\d+) подглав", prompt)
+    lines = ["Введение"]
+    for i in range(1, int(chapters.group(1)) + 1 if chapters else 4):
+        lines.append(f"Глава {i}: Раздел номер {i}")
+        for j in range(1, int(subchapters.group(1)) + 1 if subchapters else 3):
+            lines.append(f"{i}.{j}: Вопрос {i}.{j}")
+    lines += ["Заключение", "Использованные литературы"]
+    return "\n".join(lines)
+
+
+def outline_text(points: int) -> str:
+    return "\n".join(f"{i}. Аспект раздела номер {i}" for i in range(1, points + 1))
+
+
+def section_text(chars: int) -> str:
+    """Русский текст без повторяющихся предложений (проходит check_repetition)."""
+    sentences = []
+    size = 0
+    i = 0
+    while size < chars:
+        i += 1
+        sentence = f"Это предложение номер {i} описывает отдельный аспект темы и приводит пример {i * 7}."
+        sentences.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(sentences)[:max(chars, 1)]
+
+
+def completion(model: str, text: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": math.ceil(len(text) / CHARS_PER_TOKEN),
+                  "total_tokens": math.ceil(len(text) / CHARS_PER_TOKEN)},
+    }
+
+
+def _error(status: int, message: str, kind: str, headers: Optional[dict] = None) -> web.Response:
+    body = {"error": {"message": message, "type": kind, "code": status}}
+    return web.json_response(body, status=status, headers=headers)
+
+
+# ---------------- Сервер ----------------
+class StubServer:
+    def __init__(self, config: Optional[StubConfig] = None):
+        self.config = config or StubConfig()
+        self.random = random.Random(self.config.seed)
+        self.stats: Counter = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = time.monotonic()
+
+    def reset(self) -> None:
+        self.stats.clear()
+        self.max_in_flight = self.in_flight
+        self.started = time.monotonic()
+
+    def stats_dict(self) -> dict:
+        return {
+            "requests": sum(self.stats.values()),
+            **{outcome: self.stats[outcome] for outcome in OUTCOMES},
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "uptime": round(time.monotonic() - self.started, 3),
+        }
+
+    def _latency(self) -> float:
+        config = self.config
+        if config.latency <= 0:
+            return 0.0
+        return config.latency * math.exp(self.random.gauss(0, config.jitter)) if config.jitter else config.latency
+
+    async def handle_completions(self, request: web.Request) -> web.StreamResponse:
+        config = self.config
+        try:
+            body = await request.json()
+            messages = body["messages"]
+            prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self.stats[BAD_REQUEST] += 1
+            return _error(400, "Неверный запрос", "invalid_request_error")
+
+        if config.capacity and self.in_flight >= config.capacity:
+            self.stats[OVER_CAPACITY] += 1
+            return _error(429, "Сервер перегружен", "rate_limit_exceeded", {"Retry-After": f"{config.retry_after:g}"})
+        if self.random.random() < config.rate_limit:
+            self.stats[RATE_LIMITED] += 1
+            return _error(429, "Rate limit reached", "rate_limit_exceeded", {"Retry-After": f"{config.retry_after:g}"})
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.random.random() < config.timeout_rate:
+                self.stats[HUNG] += 1
+                await asyncio.sleep(config.hang)
+                return _error(504, "Превышено время ожидания", "timeout")
+
+            delay = self._latency()
+            outline = OUTLINE_POINTS.search(prompt)
+            if PLAN_MARKER in prompt:
+                text = plan_text(prompt)
+                self.stats[OK] += 1
+            elif outline:
+                text = outline_text(int(outline.group(1)))
+                self.stats[OK] += 1
+            elif self.random.random() < config.short_rate:
+                text = section_text(SHORT_CHARS)
+                self.stats[SHORT] += 1
+            else:
+                max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+                chars = config.chars or (int(max_tokens * CHARS_PER_TOKEN) if max_tokens else DEFAULT_CHARS)
+                text = section_text(chars)
+                self.stats[OK] += 1
+            if config.chars_per_second:
+                delay += len(text) / config.chars_per_second
+            await asyncio.sleep(delay)
+            return web.json_response(completion(body.get("model", "stub"), text))
+        finally:
+            self.in_flight -= 1
+
+    async def handle_models(self, request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats_dict())
+
+    async def handle_reset(self, request: web.Request) -> web.Response:
+        self.reset()
+        return web.json_response(self.stats_dict())
+
+    async def handle_config(self, request: web.Request) -> web.Response:
+        if request.method == "POST":
+            try:
+                update = await request.json()
+                self.config = StubConfig.model_validate({**self.config.model_dump(), **update})
+            except (ValueError, TypeError, ValidationError) as e:
+                return _error(400, str(e), "invalid_request_error")
+            if update.get("seed") is not None:
+                self.random.seed(self.config.seed)
+        return web.json_response(self.config.model_dump())
+
+
+def create_stub_app(config: Optional[StubConfig] = None) -> web.Application:
+    stub = StubServer(config)
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", stub.handle_completions)
+    app.router.add_get("/v1/models", stub.handle_models)
+    app.router.add_get("/stats", stub.handle_stats)
+    app.router.add_post("/reset", stub.handle_reset)
+    app.router.add_get("/config", stub.handle_config)
+    app.router.add_post("/config", stub.handle_config)
+    return app
+
+
+def run_stub(host: str = "127.0.0.1", port: int = DEFAULT_PORT, config: Optional[StubConfig] = None) -> None:
+    web.run_app(create_stub_app(config), host=host, port=port, print=None, access_log=None)
+
+
+# ---------------- CLI ----------------
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    """Параметры сбоев StubConfig."""
+    defaults = StubConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="Медиана задержки ответа, с")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter, help="Сигма логнормального разброса")
+    parser.add_argument("--chars", type=int, default=defaults.chars, help="Длина ответа (0 — по max_tokens)")
+    parser.add_argument("--chars-per-second", type=float, default=defaults.chars_per_second,
+                        help="Скорость генерации ответа, символов/с (0 — мгновенно)")
+    parser.add_argument("--rate-limit", type=float, default=defaults.rate_limit, help="Доля ответов 429")
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after, help="Retry-After для 429, с")
+    parser.add_argument("--capacity", type=int, default=defaults.capacity, help="Одновременных запросов (0 — без предела)")
+    parser.add_argument("--timeout-rate", type=float, default=defaults.timeout_rate, help="Доля зависающих запросов")
+    parser.add_argument("--hang", type=float, default=defaults.hang, help="Сколько висит зависший запрос, с")
+    parser.add_argument("--short-rate", type=float, default=defaults.short_rate, help="Доля коротких ответов")
+    parser.add_argument("--seed", type=int, default=None, help="Seed генератора сбоев")
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig.model_validate({name: getattr(args, name) for name in StubConfig.model_fields})
+
+
+def build_arg_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(description="OpenAI-совместимая заглушка для нагрузочных тестов")
+    parser.add_argument("--host", default="127.0.0.1", help="Адрес (по умолчанию 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Порт (по умолчанию {DEFAULT_PORT})")
+    add_stub_arguments(parser)
+    return parser
+
+
+def run_from_args(args: argparse.Namespace) -> int:
+    print(f"Заглушка OpenAI API: http://{args.host}:{args.port}/v1")
+    run_stub(args.host, args.port, config_from_args(args))
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    return run_from_args(build_arg_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Локальный индекс похожих тем для повторного использования планов.
+
+Тема нормализуется (регистр, кавычки и пунктуация, служебные слова),
+слова усекаются до основы, и множество основ служит шинглами. По ним
+строится MinHash-сигнатура; LSH по полосам сигнатуры быстро отбирает
+кандидатов, а точное сходство Жаккара по шинглам решает, достаточно ли
+тема близка, чтобы взять план (и, по желанию, разделы) готового реферата.
+
+Пример:
+    index = TopicIndex("./results/topics.jsonl", threshold=0.65)
+    index.add("История HTML", plan, essay_path="./results/json/html.json")
+    match = index.query("История языка HTML")
+    if match:
+        plan = match.plan
+"""
+import json
+import os
+import random
+import re
+import zlib
+from collections import defaultdict
+from typing import (Any, Dict, FrozenSet, List, NamedTuple, Optional, Set,
+                    Tuple, Union)
+
+from ai_referat.config import TOPIC_SIMILARITY
+from ai_referat.models import EssayPlan
+
+STEM_LENGTH = 5
+STOP_WORDS = frozenset({
+    "в", "во", "на", "и", "или", "о", "об", "по", "с", "со", "к", "ко", "для", "как", "из", "от", "до",
+    "при", "а", "но", "же", "тема", "реферат",
+    "the", "of", "in", "on", "and", "or", "a", "an", "to", "for",
+})
+MERSENNE_PRIME = (1 << 61) - 1
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def topic_shingles(topic: str) -> FrozenSet[str]:
+    """Основы значимых слов темы: «История языка HTML» -> {истор, языка, html}."""
+    words = WORD_PATTERN.findall(topic.casefold().replace("ё", "е"))
+    return frozenset(word[:STEM_LENGTH] for word in words if word not in STOP_WORDS)
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """MinHash на семействе хешей (a*x + b) mod p с фиксированным seed."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rnd = random.Random(seed)
+        self.params = [(rnd.randrange(1, MERSENNE_PRIME), rnd.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)]
+
+    def signature(self, shingles: Set[str]) -> Tuple[int, ...]:
+        # crc32 стабилен между процессами, в отличие от hash()
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles] or [0]
+        return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self.params)
+
+
+# --- Найденная похожая тема ---
+class TopicMatch(NamedTuple):
+    topic: str
+    similarity: float
+    plan: EssayPlan
+    essay_path: Optional[str]
+
+
+class _Entry(NamedTuple):
+    topic: str
+    shingles: FrozenSet[str]
+    plan: Dict[str, Any]
+    essay_path: Optional[str]
+
+
+class TopicIndex:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        threshold: float = TOPIC_SIMILARITY,
+        num_perm: int = 64,
+        bands: int = 16
+    ):
+        """
+        :param path: JSONL файл индекса (None — только в памяти)
+        :param threshold: минимальное сходство Жаккара для повторного использования
+        :param bands: число полос LSH; num_perm должно делиться на bands
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm должно делиться на bands")
+        self.path = path
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+
+        self._entries: List[_Entry] = []
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+        self._load()
+
+    # ---------------- Служебные методы ----------------
+    def _band_keys(self, shingles: Set[str]):
+        signature = self.hasher.signature(shingles)
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def _insert(self, entry: _Entry) -> None:
+        position = len(self._entries)
+        self._entries.append(entry)
+        for key in self._band_keys(entry.shingles):
+            self._buckets[key].append(position)
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # недописанная строка после сбоя
+                data = json.loads(line)
+                self._insert(_Entry(data["topic"], topic_shingles(data["topic"]), data["plan"], data.get("essay_path")))
+
+    # ---------------- Публичные методы ----------------
+    def add(self, topic: str, plan: Union[EssayPlan, Dict[str, Any]], essay_path: Optional[str] = None) -> None:
+        """Запоминает план (и путь к готовому реферату) для темы."""
+        plan_data = plan.model_dump() if isinstance(plan, EssayPlan) else plan
+        self._insert(_Entry(topic, topic_shingles(topic), plan_data, essay_path))
+        if self.path:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                record = {"topic": topic, "plan": plan_data, "essay_path": essay_path}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def similar(self, topic: str, limit: int = 5, threshold: Optional[float] = None) -> List[TopicMatch]:
+        """Похожие темы по убыванию сходства."""
+        threshold = self.threshold if threshold is None else threshold
+        shingles = topic_shingles(topic)
+        candidates: Set[int] = set()
+        for key in self._band_keys(shingles):
+            candidates.update(self._buckets.get(key, ()))
+
+        # Более поздние записи той же темы важнее
+        best: Dict[FrozenSet[str], Tuple[float, int]] = {}
+        for position in candidates:
+            entry = self._entries[position]
+            score = jaccard(shingles, entry.shingles)
+            if score >= threshold and best.get(entry.shingles, (0.0, -1))[1] < position:
+                best[entry.shingles] = (score, position)
+
+        ranked = sorted(best.values(), key=lambda item: (-item[0], -item[1]))[:limit]
+        return [
+            TopicMatch(
+                topic=self._entries[position].topic,
+                similarity=score,
+                plan=EssayPlan.model_validate(self._entries[position].plan),
+                essay_path=self._entries[position].essay_path,
+            )
+            for score, position in ranked
+        ]
+
+    def query(self, topic: str) -> Optional[TopicMatch]:
+        """Самая похожая тема не ниже порога или None."""
+        matches = self.similar(topic, limit=1)
+        return matches[0] if matches else None
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,202 @@
+"""
+Быстрые локальные проверки ответа модели перед тем, как принять раздел.
+
+Валидатор — функция (text, context) -> text: возвращает текст (возможно,
+очищенный) или бросает ResponseRejected с причиной. ValidatorChain
+применяет валидаторы по очереди; клиенты вызывают цепочку в цикле
+повторов, поэтому отклоненный ответ перезапрашивается только для
+этого раздела.
+
+Все проверки — предкомпилированные регулярные выражения и подсчеты по
+ограниченному фрагменту текста, они занимают микросекунды.
+"""
+import re
+import string
+from functools import partial
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from ai_referat.budget import (CHAPTER, CONCLUSION, INTRODUCTION, OUTLINE, PLAN,
+                               REFERENCES, SUBCHAPTER)
+
+
+class ResponseRejected(ValueError):
+    """Ответ модели не прошел проверку."""
+
+
+# --- Что проверяем ---
+class ValidationContext(NamedTuple):
+    kind: str
+    language: str
+    title: Optional[str] = None
+
+
+Validator = Callable[[str, ValidationContext], str]
+
+# Разделы с заголовком, который модель любит повторять первой строкой
+TITLED_KINDS = (INTRODUCTION, CHAPTER, SUBCHAPTER, CONCLUSION)
+
+# --- Письменность языка ---
+CYRILLIC_LANGUAGES = ("рус", "russian", "кыргыз", "киргиз", "kyrgyz", "казах", "kazakh", "украин", "ukrain",
+                      "белорус", "belarus", "болгар", "bulgar", "таджик", "tajik", "монгол", "mongol")
+LATIN_LANGUAGES = ("англ", "english", "узбек", "uzbek", "немец", "german", "француз", "french",
+                   "испан", "spanish", "турец", "turkish", "итальян", "italian", "польск", "polish")
+
+
+# Буквы считаются по байтам UTF-8 через bytes.translate (в C, без regex):
+# кириллица U+0400–U+04FF — ведущие байты D0–D3, латиница — ASCII буквы и
+# ведущие байты C3–C9 (U+00C0–U+024F). Все буквы — ASCII буквы и ведущие
+# байты не-ASCII символов, кроме C2 и E2 (пунктуация: «», —, …).
+def _delete_all_but(keep) -> bytes:
+    return bytes(b for b in range(256) if b not in keep)
+
+
+ASCII_LETTER_BYTES = set(string.ascii_letters.encode("ascii"))
+SCRIPT_DELETE = {
+    "cyrillic": _delete_all_but({0xD0, 0xD1, 0xD2, 0xD3}),
+    "latin": _delete_all_but(ASCII_LETTER_BYTES | set(range(0xC3, 0xCA))),
+}
+LETTERS_DELETE = _delete_all_but(ASCII_LETTER_BYTES | (set(range(0xC3, 0xF5)) - {0xE2}))
+SCRIPT_SAMPLE = 4000
+MIN_SCRIPT_SHARE = 0.6
+
+# --- Отказы и служебные фразы ---
+REFUSAL_PATTERN = re.compile(
+    r"^\W*(извините|к сожалению,? я не (могу|смогу)|я не (могу|смогу) (помочь|выполнить|написать)|"
+    r"как (языковая модель|ии|искусственный интеллект)|i['’]?m sorry|i am sorry|i can(no|')t|"
+    r"as an ai|sorry,? but)",
+    re.IGNORECASE
+)
+REFUSAL_SAMPLE = 300
+BOILERPLATE_TAIL = 500
+# Первая строка-вступление: «Конечно! Вот раздел ...:», «Sure, here is ...»
+LEADING_BOILERPLATE = re.compile(
+    r"^\W*(конечно|разумеется|хорошо|вот (текст|раздел|введение|заключение|глава|подглава|план)|"
+    r"sure|certainly|here is|here's)\b[^\n]{0,200}(\n|$)",
+    re.IGNORECASE
+)
+# Последняя строка-предложение помощи: «Если нужно, могу ...», «Надеюсь, ...»
+TRAILING_BOILERPLATE = re.compile(
+    r"(\n|^)[^\S\n]*\W*(если (нужно|хотите|потребуется)|надеюсь|могу (также|еще|ещё|помочь)|"
+    r"let me know|i hope|if you (need|want|would like))[^\n]{0,300}\s*$",
+    re.IGNORECASE
+)
+
+# --- Повтор заголовка ---
+HEADING_DECORATION = re.compile(r"^[\s#*_>«»\"'“”]+|[\s#*_«»\"'“”:.]+$")
+HEADING_NUMBER = re.compile(r"^(глава\s+\d+[.:]?|\d+(\.\d+)*[.:]?)\s*", re.IGNORECASE)
+MAX_HEADING_LINE = 200
+
+# --- Повторы ---
+SENTENCE_ENDS = ("!", "?", "…", "\n")
+MIN_SENTENCES = 6
+MAX_REPETITION = 0.3
+
+
+def expected_script(language: str) -> Optional[str]:
+    name = language.casefold()
+    if any(stem in name for stem in CYRILLIC_LANGUAGES):
+        return "cyrillic"
+    if any(stem in name for stem in LATIN_LANGUAGES):
+        return "latin"
+    return None
+
+
+def check_script(text: str, context: ValidationContext) -> str:
+    """Буквы нужной письменности должны преобладать (латинские термины допустимы)."""
+    script = expected_script(context.language)
+    if script is None:
+        return text
+    sample = text[:SCRIPT_SAMPLE].encode("utf-8")
+    letters = len(sample.translate(None, LETTERS_DELETE))
+    if letters:
+        share = len(sample.translate(None, SCRIPT_DELETE[script])) / letters
+        if share < MIN_SCRIPT_SHARE:
+            raise ResponseRejected(f"текст не на языке «{context.language}» ({share:.0%} букв нужной письменности)")
+    return text
+
+
+def check_refusal(text: str, context: ValidationContext) -> str:
+    """Отклоняет отказы и убирает вступления и предложения помощи по краям."""
+    if REFUSAL_PATTERN.match(text[:REFUSAL_SAMPLE].strip()):
+        raise ResponseRejected("модель отказалась отвечать")
+    cleaned = LEADING_BOILERPLATE.sub("", text.lstrip(), count=1)
+    # Предложение помощи ищем только в конце ответа
+    split = max(len(cleaned) - BOILERPLATE_TAIL, 0)
+    cleaned = cleaned[:split] + TRAILING_BOILERPLATE.sub("", cleaned[split:], count=1)
+    return cleaned.strip() if cleaned.strip() else text
+
+
+def _heading_key(line: str) -> str:
+    line = HEADING_DECORATION.sub("", line)
+    return " ".join(HEADING_NUMBER.sub("", line).casefold().split())
+
+
+def strip_duplicate_heading(text: str, context: ValidationContext) -> str:
+    """Убирает первую строку, если она повторяет заголовок раздела."""
+    if context.kind not in TITLED_KINDS or not context.title:
+        return text
+    text = text.lstrip()
+    first, sep, rest = text.partition("\n")
+    if len(first) > MAX_HEADING_LINE:
+        return text
+    key = _heading_key(first)
+    if key and key in (_heading_key(context.title), " ".join(context.title.casefold().split())):
+        return rest.lstrip()
+    return text
+
+
+def check_repetition(text: str, context: ValidationContext) -> str:
+    """Отклоняет «зацикленные» ответы с большой долей повторяющихся предложений."""
+    if context.kind == PLAN:
+        return text
+    # Грубое деление на предложения через str.replace/split — в разы быстрее regex
+    text_key = text.casefold()
+    for end in SENTENCE_ENDS:
+        text_key = text_key.replace(end, ".")
+    sentences = [s for s in text_key.split(".") if s.strip()]
+    if len(sentences) >= MIN_SENTENCES:
+        repetition = 1 - len(set(sentences)) / len(sentences)
+        if repetition > MAX_REPETITION:
+            raise ResponseRejected(f"повторяется {repetition:.0%} предложений")
+    return text
+
+
+DEFAULT_VALIDATORS: List[Validator] = [check_refusal, strip_duplicate_heading, check_script, check_repetition]
+# Виды разделов, к которым проверка не применяется. В списке литературы
+# законно много латиницы (иностранные источники) и повторов («И. И.», «М.»,
+# «с.»); план и пункты длинного раздела — короткие строки-названия
+DEFAULT_SKIP_KINDS: Dict[Validator, Tuple[str, ...]] = {
+    check_script: (PLAN, OUTLINE, REFERENCES),
+    check_repetition: (PLAN, REFERENCES),
+}
+
+
+class ValidatorChain:
+    def __init__(
+        self,
+        validators: Optional[Iterable[Validator]] = None,
+        skip_kinds: Optional[Dict[Validator, Iterable[str]]] = None
+    ):
+        """
+        :param skip_kinds: валидатор -> виды разделов, для которых он не вызывается
+                           (по умолчанию DEFAULT_SKIP_KINDS)
+        """
+        self.validators: List[Validator] = list(DEFAULT_VALIDATORS if validators is None else validators)
+        skip_kinds = DEFAULT_SKIP_KINDS if skip_kinds is None else skip_kinds
+        self.skip_kinds: Dict[Validator, Tuple[str, ...]] = {v: tuple(kinds) for v, kinds in skip_kinds.items()}
+
+    def add(self, validator: Validator, skip_kinds: Iterable[str] = ()) -> "ValidatorChain":
+        self.validators.append(validator)
+        if skip_kinds:
+            self.skip_kinds[validator] = tuple(skip_kinds)
+        return self
+
+    def __call__(self, text: str, context: ValidationContext) -> str:
+        for validator in self.validators:
+            if context.kind not in self.skip_kinds.get(validator, ()):
+                text = validator(text, context)
+        return text
+
+    def bind(self, kind: str, language: str, title: Optional[str] = None) -> Callable[[str], str]:
+        """Проверка для одного запроса: text -> text (для параметра validator клиентов)."""
+        return partial(self, context=ValidationContext(kind, language, title))
@@ -0,0 +1,370 @@
+"""
+Пул процессов-воркеров, выполняющих задания из JobQueue.
+
+Каждый процесс — Worker со своим event loop: он берет из очереди до
+concurrency заданий, генерирует рефераты асинхронным менеджером и
+продлевает аренду заданий heartbeat'ом. Упавший процесс WorkerPool
+перезапускает, а его задания после истечения аренды достаются другим
+воркерам. Очередь может лежать на общем диске: воркеры разных машин
+работают с одним файлом.
+
+Пример:
+    python -m ai_referat.worker_pool put topics.txt --queue ./results/queue.db
+    python -m ai_referat.worker_pool run --queue ./results/queue.db --workers 8 --concurrency 4
+    python -m ai_referat.worker_pool status --queue ./results/queue.db
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from pydantic import ValidationError
+
+from ai_referat.config import AI_API_KEY, AI_BASE_URL, AI_MODEL
+from ai_referat.config import RESULTS_DOCX_DIR, RESULTS_JSON_DIR
+from ai_referat.job_queue import JobQueue, QueuedJob
+from ai_referat.log import FORMATS as LOG_FORMATS
+from ai_referat.log import configure_logging, get_logger, log, log_context
+from ai_referat.router import ModelRouter, add_router_arguments, router_from_args
+from ai_referat.service import PROVIDERS, JobRequest, write_outputs
+
+logger = get_logger(__name__)
+
+DEFAULT_QUEUE_PATH = "./results/queue.db"
+
+
+class Worker:
+    def __init__(
+        self,
+        queue_path: str = DEFAULT_QUEUE_PATH,
+        worker_id: Optional[str] = None,
+        concurrency: int = 2,
+        provider: str = "openai",
+        model: str = AI_MODEL,
+        api_key: Optional[str] = AI_API_KEY or None,
+        base_url: Optional[str] = AI_BASE_URL or None,
+        json_dir: str = RESULTS_JSON_DIR,
+        docx_dir: str = RESULTS_DOCX_DIR,
+        lease_seconds: float = 120.0,
+        poll_interval: float = 1.0,
+        exit_when_empty: bool = False,
+        router: Optional[ModelRouter] = None
+    ):
+        """
+        :param concurrency: рефератов одновременно в этом процессе
+        :param lease_seconds: срок аренды; heartbeat раз в треть срока
+        :param exit_when_empty: завершиться, когда в очереди не останется заданий
+        :param router: модели по видам разделов; у каждого процесса своя копия и свой p95
+        """
+        if provider not in PROVIDERS:
+            raise ValueError(f"Неизвестный провайдер: {provider}")
+        self.queue_path = queue_path
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency
+        self.manager_class, self.client_class = PROVIDERS[provider]
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.json_dir = json_dir
+        self.docx_dir = docx_dir
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.exit_when_empty = exit_when_empty
+        self.router = router
+
+        self.completed = 0
+        self.failed = 0
+        self.queue: Optional[JobQueue] = None
+        self.client = None
+        self._stop: Optional[asyncio.Event] = None
+        self._lost: Set[str] = set()
+
+    def stop(self) -> None:
+        """Перестать брать задания; текущие возвращаются в очередь."""
+        if self._stop is not None:
+            self._stop.set()
+
+    # ---------------- Задание ----------------
+    async def _heartbeat(self, job: QueuedJob, task: asyncio.Task) -> None:
+        # Аренда выдана при claim, незадолго до запуска heartbeat
+        renewed = time.monotonic()
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            started = time.monotonic()
+            try:
+                owned = await asyncio.to_thread(self.queue.heartbeat, job.id, self.worker_id)
+            except Exception as e:
+                # Например, database is locked: аренда еще действует, пробуем снова
+                log(logger, logging.WARNING, "Аренда не продлена", error=str(e), error_type=type(e).__name__)
+                if time.monotonic() - renewed < self.lease_seconds:
+                    continue
+                # Аренда истекла, задание может взять другой воркер
+                owned = False
+            if not owned:
+                # Аренду забрал другой воркер: дальше работать бессмысленно
+                self._lost.add(job.id)
+                task.cancel()
+                return
+            renewed = started
+
+    async def _process(self, job: QueuedJob) -> None:
+        with log_context(essay_id=job.id, worker=self.worker_id, attempt=job.attempts):
+            await self._process_job(job)
+
+    async def _process_job(self, job: QueuedJob) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job, asyncio.current_task()))
+        try:
+            request = JobRequest.model_validate(job.payload)
+            manager = self.manager_class(
+                model=self.model, api_key=self.api_key, base_url=self.base_url, router=self.router,
+                **request.model_dump(exclude={"docx"})
+            )
+            manager.client = self.client
+            essay = await manager.generate_essay()
+
+            json_path = os.path.join(self.json_dir, f"{job.id}.json")
+            docx_path = os.path.join(self.docx_dir, f"{job.id}.docx") if request.docx else None
+            await asyncio.to_thread(write_outputs, essay, json_path, docx_path)
+            result = {"json_path": json_path, "docx_path": docx_path}
+            await asyncio.to_thread(self.queue.complete, job.id, self.worker_id, result)
+            self.completed += 1
+        except asyncio.CancelledError:
+            if job.id in self._lost:
+                log(logger, logging.WARNING, "Аренда задания потеряна")
+            else:
+                log(logger, logging.INFO, "Задание возвращено в очередь")
+                await asyncio.to_thread(self.queue.release, job.id, self.worker_id)
+        except ValidationError as e:
+            # Повтор не поможет: параметры задания неверны
+            self.failed += 1
+            log(logger, logging.ERROR, "Неверные параметры задания", error=str(e))
+            await asyncio.to_thread(self.queue.fail, job.id, self.worker_id, str(e), False)
+        except Exception as e:
+            self.failed += 1
+            log(logger, logging.ERROR, "Задание завершилось ошибкой", max_attempts=job.max_attempts, error=str(e),
+                error_type=type(e).__name__)
+            await asyncio.to_thread(self.queue.fail, job.id, self.worker_id, str(e))
+        finally:
+            heartbeat.cancel()
+            self._lost.discard(job.id)
+
+    # ---------------- Цикл ----------------
+    async def run(self) -> None:
+        self._stop = asyncio.Event()
+        self.queue = JobQueue(self.queue_path, lease_seconds=self.lease_seconds)
+        # Один клиент на процесс: общий пул соединений и AIMD ограничитель
+        self.client = self.client_class(model=self.model, api_key=self.api_key, base_url=self.base_url)
+        os.makedirs(self.json_dir, exist_ok=True)
+        os.makedirs(self.docx_dir, exist_ok=True)
+
+        tasks: Set[asyncio.Task] = set()
+        try:
+            while not self._stop.is_set():
+                timeout = None
+                if len(tasks) < self.concurrency:
+                    job = await asyncio.to_thread(self.queue.claim, self.worker_id)
+                    if job is not None:
+                        tasks.add(asyncio.create_task(self._process(job)))
+                        continue
+                    if self.exit_when_empty and not tasks and await asyncio.to_thread(self.queue.pending) == 0:
+                        break
+                    timeout = self.poll_interval
+                # Ждем завершения задания, остановки или (при пустой очереди) следующего опроса
+                waiters = tasks | {asyncio.create_task(self._stop.wait())}
+                done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for waiter in waiters - tasks:
+                    waiter.cancel()
+                tasks -= done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.queue.close()
+
+
+def _worker_main(worker_kwargs: Dict[str, Any], log_options: Optional[Dict[str, Any]] = None) -> None:
+    if log_options is not None:
+        configure_logging(**log_options)
+    worker = Worker(**worker_kwargs)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run()
+
+    asyncio.run(main())
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        queue_path: str = DEFAULT_QUEUE_PATH,
+        workers: Optional[int] = None,
+        log_options: Optional[Dict[str, Any]] = None,
+        **worker_kwargs
+    ):
+        """
+        :param workers: число процессов (по умолчанию — по числу ядер)
+        :param log_options: параметры configure_logging для процессов-воркеров (None — без логов)
+        :param worker_kwargs: параметры Worker (concurrency, provider, model, ...)
+        """
+        self.queue_path = queue_path
+        self.workers = workers or os.cpu_count() or 1
+        self.worker_kwargs = worker_kwargs
+        self.log_options = log_options
+        self.processes: List[multiprocessing.Process] = []
+        self.restarts = 0
+        self._stopping = False
+        # По слоту процесса: время запуска, подряд быстрых падений, когда перезапускать
+        self._started: List[float] = []
+        self._crashes: List[int] = []
+        self._restart_at: List[Optional[float]] = []
+
+    def _spawn(self, index: int) -> multiprocessing.Process:
+        kwargs = dict(self.worker_kwargs, queue_path=self.queue_path)
+        process = multiprocessing.Process(target=_worker_main, args=(kwargs, self.log_options), name=f"ai-referat-worker-{index}")
+        process.start()
+        self._started[index] = time.monotonic()
+        return process
+
+    def start(self) -> None:
+        # Схема создается один раз до запуска воркеров
+        JobQueue(self.queue_path).close()
+        self._started = [0.0] * self.workers
+        self._crashes = [0] * self.workers
+        self._restart_at = [None] * self.workers
+        self.processes = [self._spawn(i) for i in range(self.workers)]
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """SIGTERM воркерам: они возвращают текущие задания в очередь и выходят."""
+        self._stopping = True
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join(timeout)
+
+    def supervise(self, poll_interval: float = 1.0, max_backoff: float = 60.0, max_crashes: int = 10) -> None:
+        """
+        Перезапускает упавшие процессы, пока воркеры не завершатся штатно.
+
+        :param max_backoff: предельная пауза перед перезапуском; процесс, снова упавший
+            быстрее этого срока, перезапускается с паузой 1, 2, 4, ... сек
+        :param max_crashes: после стольких быстрых падений подряд процесс не перезапускается
+        """
+        while not self._stopping:
+            alive = False
+            now = time.monotonic()
+            for i, process in enumerate(self.processes):
+                if process.is_alive():
+                    alive = True
+                elif process.exitcode not in (0, None) and not self._stopping and self._crashes[i] <= max_crashes:
+                    if self._restart_at[i] is None:
+                        # Проработал дольше max_backoff — падение не при запуске, счет сначала
+                        crashes = self._crashes[i] + 1 if now - self._started[i] < max_backoff else 1
+                        self._crashes[i] = crashes
+                        if crashes > max_crashes:
+                            log(logger, logging.ERROR, "Воркер падает при запуске, перезапуски прекращены",
+                                worker=process.name, exitcode=process.exitcode, crashes=max_crashes)
+                            continue
+                        delay = min(2.0 ** (crashes - 2), max_backoff) if crashes > 1 else 0.0
+                        self._restart_at[i] = now + delay
+                        log(logger, logging.ERROR, "Воркер упал, перезапуск", worker=process.name,
+                            exitcode=process.exitcode, delay=delay)
+                    alive = True
+                    if now >= self._restart_at[i]:
+                        self._restart_at[i] = None
+                        self.processes[i] = self._spawn(i)
+                        self.restarts += 1
+            if not alive:
+                return
+            time.sleep(poll_interval)
+
+    def run(self) -> None:
+        self.start()
+        try:
+            self.supervise()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+# ---------------- CLI ----------------
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Очередь заданий и пул воркеров генерации рефератов")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help=f"Файл очереди (по умолчанию {DEFAULT_QUEUE_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    put = commands.add_parser("put", help="Поставить темы в очередь")
+    put.add_argument("topics", help="Файл с темами, по одной на строку")
+    put.add_argument("--language", default=None, help="Язык рефератов")
+    put.add_argument("--max-attempts", type=int, default=None, help="Попыток на задание")
+    put.add_argument("--no-docx", action="store_true", help="Только JSON")
+
+    run = commands.add_parser("run", help="Запустить пул воркеров")
+    run.add_argument("-w", "--workers", type=int, default=None, help="Процессов (по умолчанию — по числу ядер)")
+    run.add_argument("-c", "--concurrency", type=int, default=2, help="Рефератов одновременно в процессе")
+    run.add_argument("--provider", choices=sorted(PROVIDERS), default="openai", help="Клиент модели")
+    run.add_argument("--model", default=AI_MODEL, help="Модель")
+    add_router_arguments(run)
+    run.add_argument("--lease", type=float, default=120.0, help="Срок аренды задания, сек")
+    run.add_argument("--json-dir", default=RESULTS_JSON_DIR, help="Каталог JSON результатов")
+    run.add_argument("--docx-dir", default=RESULTS_DOCX_DIR, help="Каталог DOCX результатов")
+    run.add_argument("--exit-when-empty", action="store_true", help="Завершиться, когда очередь опустеет")
+    run.add_argument("--log-level", default="INFO", help="Уровень логов (DEBUG, INFO, WARNING, ...)")
+    run.add_argument("--log-format", choices=LOG_FORMATS, default="text", help="Формат логов")
+
+    commands.add_parser("status", help="Число заданий по статусам")
+    return parser
+
+
+def run_from_args(args: argparse.Namespace) -> int:
+    if args.command == "put":
+        with open(args.topics, "r", encoding="utf-8") as f:
+            topics = [line.strip() for line in f if line.strip()]
+        payloads = []
+        for topic in topics:
+            payload = {"topic": topic, "docx": not args.no_docx}
+            if args.language:
+                payload["language"] = args.language
+            payloads.append(payload)
+        with JobQueue(args.queue) as queue:
+            queue.put_many(payloads, max_attempts=args.max_attempts)
+        print(f"В очередь поставлено заданий: {len(payloads)}")
+    elif args.command == "run":
+        log_options = {"level": args.log_level, "fmt": args.log_format}
+        configure_logging(**log_options)
+        pool = WorkerPool(
+            args.queue,
+            log_options=log_options,
+            workers=args.workers,
+            concurrency=args.concurrency,
+            provider=args.provider,
+            model=args.model,
+            router=router_from_args(args),
+            lease_seconds=args.lease,
+            json_dir=args.json_dir,
+            docx_dir=args.docx_dir,
+            exit_when_empty=args.exit_when_empty,
+        )
+        pool.run()
+    else:
+        with JobQueue(args.queue) as queue:
+            for status, count in queue.counts().items():
+                print(f"{status}: {count}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    return run_from_args(build_arg_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())